@@ -0,0 +1,66 @@
+"""Compares the ORM and Core read paths of AsyncSQLAlchemyConnector on large pages.
+
+    python -m benchmarks.alchemy_read_path --pages 1000 10000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import Column, Float, Integer, String, insert
+from sqlalchemy.orm import DeclarativeBase
+
+from razorbill.connectors.alchemy.connector import AsyncSQLAlchemyConnector
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Item(Base):
+    __tablename__ = "items"
+
+    id = Column(Integer, primary_key=True)
+    code = Column(String, nullable=False)
+    region = Column(String, nullable=False)
+    score = Column(Float, nullable=False)
+    note = Column(String)
+
+
+async def measure(connector: AsyncSQLAlchemyConnector, page: int, repeats: int) -> float:
+    await connector.get_many(skip=0, limit=page)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        await connector.get_many(skip=0, limit=page)
+    return page * repeats / (time.perf_counter() - started)
+
+
+async def main(pages: list[int], repeats: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        db_url = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        core = AsyncSQLAlchemyConnector(Item, db_url=db_url)
+        orm = AsyncSQLAlchemyConnector(Item, db_url=db_url, core_reads=False)
+
+        async with core.session_maker.kw["bind"].begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            await connection.execute(insert(Item), [
+                {"code": f"code-{i}", "region": f"region-{i % 50}", "score": i / 7, "note": "x" * 40}
+                for i in range(max(pages))
+            ])
+
+        print(f"rows/s, {repeats} get_many calls per page size")
+        print(f"{'page':<10}{'orm':>12}{'core':>12}{'speedup':>10}")
+        for page in pages:
+            orm_rate = await measure(orm, page, repeats)
+            core_rate = await measure(core, page, repeats)
+            print(f"{page:<10}{orm_rate:>12.0f}{core_rate:>12.0f}{core_rate / orm_rate:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.pages, args.repeats))
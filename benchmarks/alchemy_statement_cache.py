@@ -0,0 +1,82 @@
+"""Measures the CPU the statement cache of AsyncSQLAlchemyConnector saves per request.
+
+    python -m benchmarks.alchemy_statement_cache --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy.orm import DeclarativeBase
+
+from razorbill.connectors.alchemy.connector import AsyncSQLAlchemyConnector
+from razorbill.connectors.alchemy.select import build_select_statement, statement_cache
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Item(Base):
+    __tablename__ = "items"
+
+    id = Column(Integer, primary_key=True)
+    code = Column(String, nullable=False)
+    region = Column(String, nullable=False)
+    parent_id = Column(Integer, ForeignKey("items.id"))
+
+
+def build(requests: int, cached: bool) -> float:
+    started = time.process_time()
+    for i in range(requests):
+        if not cached:
+            statement_cache.clear()
+        build_select_statement(
+            Item, skip=i % 100, limit=20,
+            filters={"region": f"region-{i % 50}", "parent_id": i % 7}, sort=("code", False)
+        )
+    return (time.process_time() - started) / requests * 1e6
+
+
+async def query(connector: AsyncSQLAlchemyConnector, requests: int, cached: bool) -> float:
+    started = time.process_time()
+    for i in range(requests):
+        if not cached:
+            statement_cache.clear()
+        await connector.get_many(
+            skip=0, limit=20, filters={"region": f"region-{i % 50}"}, sorting=("code", False)
+        )
+    return (time.process_time() - started) / requests * 1e6
+
+
+async def main(requests: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        connector = AsyncSQLAlchemyConnector(Item, db_url=f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}")
+        async with connector.session_maker.kw["bind"].begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        for i in range(1000):
+            await connector.create_one({"code": f"code-{i}", "region": f"region-{i % 50}"})
+
+        results = {
+            "build, us": (build(requests, False), build(requests, True)),
+            "get_many, us": (
+                await query(connector, requests // 10, False),
+                await query(connector, requests // 10, True),
+            ),
+        }
+
+    print(f"CPU per request, {requests} statement builds, {requests // 10} queries")
+    print(f"{'':<14}{'uncached':>12}{'cached':>12}{'saved':>12}")
+    for metric, (uncached, cached) in results.items():
+        print(f"{metric:<14}{uncached:>12.1f}{cached:>12.1f}{uncached - cached:>12.1f}")
+    print(statement_cache.info())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests))
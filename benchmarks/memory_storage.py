@@ -0,0 +1,81 @@
+"""Compares the dict and columnar storages of MemoryConnector.
+
+    python -m benchmarks.memory_storage --rows 1000000
+"""
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from pydantic import BaseModel
+
+from razorbill.connectors.memory import MemoryConnector
+
+
+class LookupSchema(BaseModel):
+    id: int
+    code: str
+    region: str
+    score: float
+    active: bool
+    parent_id: int | None = None
+
+
+def make_row(i: int) -> dict:
+    return {
+        "code": f"code-{i}",
+        "region": f"region-{i % 50}",
+        "score": i / 7,
+        "active": i % 3 == 0,
+        "parent_id": i % 1000 or None,
+    }
+
+
+async def run(storage: str, rows: int, queries: int) -> dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+
+    connector = MemoryConnector(LookupSchema, storage=storage)
+    for i in range(rows):
+        await connector.create_one(make_row(i))
+
+    insert_time = time.perf_counter() - started
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for i in range(queries):
+        await connector.count({"region": f"region-{i % 50}", "active": True})
+    count_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(queries):
+        await connector.get_many(skip=0, limit=20, filters={"parent_id": i % 1000 or None})
+    get_many_time = time.perf_counter() - started
+
+    return {
+        "memory, MB": memory / 2 ** 20,
+        "inserts/s": rows / insert_time,
+        "count/s": queries / count_time,
+        "get_many/s": queries / get_many_time,
+    }
+
+
+async def main(rows: int, queries: int) -> None:
+    results = {storage: await run(storage, rows, queries) for storage in ("dict", "columnar")}
+
+    print(f"{rows} rows, {queries} queries per operation")
+    print(f"{'':<12}" + "".join(f"{storage:>14}" for storage in results))
+    for metric in results["dict"]:
+        print(f"{metric:<12}" + "".join(f"{result[metric]:>14.1f}" for result in results.values()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.queries))
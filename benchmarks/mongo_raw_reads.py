@@ -0,0 +1,70 @@
+"""Compares Beanie documents and raw Motor dicts on the get_many path of AsyncMongoConnector.
+
+Needs a running MongoDB, the collection is dropped and filled on every run. With --mock the
+collection lives in mongomock-motor instead: its own query cost dominates then, so the speedup is
+smaller than with a server.
+
+    python -m benchmarks.mongo_raw_reads --url mongodb://localhost:27017/razorbill_bench --pages 100 1000 10000
+"""
+import argparse
+import asyncio
+import time
+
+from pydantic import BaseModel
+
+from razorbill.connectors.mongo import client
+from razorbill.connectors.mongo.client import close_clients, init_mongo
+from razorbill.connectors.mongo.mongo import AsyncMongoConnector
+
+
+class BenchItem(BaseModel):
+    code: str
+    region: str
+    score: float
+    note: str | None = None
+
+
+async def measure(connector: AsyncMongoConnector, page: int, repeats: int) -> float:
+    await connector.get_many(skip=0, limit=page)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        await connector.get_many(skip=0, limit=page)
+    return page * repeats / (time.perf_counter() - started)
+
+
+async def main(url: str, pages: list[int], repeats: int) -> None:
+    beanie = AsyncMongoConnector(url, BenchItem)
+    raw = AsyncMongoConnector(url, BenchItem, raw_reads=True)
+    await init_mongo()
+
+    collection = beanie.document_schema.get_motor_collection()
+    await collection.drop()
+    await collection.insert_many([
+        {"code": f"code-{i}", "region": f"region-{i % 50}", "score": i / 7, "note": "x" * 40}
+        for i in range(max(pages))
+    ])
+
+    print(f"rows/s, {repeats} get_many calls per page size")
+    print(f"{'page':<10}{'beanie':>12}{'raw':>12}{'speedup':>10}")
+    for page in pages:
+        beanie_rate = await measure(beanie, page, repeats)
+        raw_rate = await measure(raw, page, repeats)
+        print(f"{page:<10}{beanie_rate:>12.0f}{raw_rate:>12.0f}{raw_rate / beanie_rate:>9.1f}x")
+
+    await collection.drop()
+    close_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="mongodb://localhost:27017/razorbill_bench")
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--mock", action="store_true", help="use mongomock-motor instead of a server")
+    args = parser.parse_args()
+
+    if args.mock:
+        from mongomock_motor import AsyncMongoMockClient
+        client.AsyncIOMotorClient = AsyncMongoMockClient
+
+    asyncio.run(main(args.url, args.pages, args.repeats))
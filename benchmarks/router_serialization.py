@@ -0,0 +1,65 @@
+"""Compares the requests/s of Router list endpoints with and without trusted_responses.
+
+    python -m benchmarks.router_serialization --pages 10 100 1000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from pydantic import BaseModel
+
+from razorbill.connectors.memory import MemoryConnector
+from razorbill.crud import CRUD
+from razorbill.router import Router
+
+
+class ItemSchema(BaseModel):
+    id: int
+    code: str
+    region: str
+    score: float
+    active: bool
+    note: str | None = None
+
+
+async def measure(app: FastAPI, page: int, requests: int) -> float:
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        params = {"limit": page}
+        await client.get("/item_schema/", params=params)
+        started = time.perf_counter()
+        for _ in range(requests):
+            response = await client.get("/item_schema/", params=params)
+            response.raise_for_status()
+        return requests / (time.perf_counter() - started)
+
+
+async def main(pages: list[int], requests: int) -> None:
+    connector = MemoryConnector(ItemSchema)
+    for i in range(max(pages)):
+        await connector.create_one({
+            "code": f"code-{i}", "region": f"region-{i % 50}", "score": i / 7, "active": i % 3 == 0, "note": None
+        })
+
+    crud = CRUD(connector)
+    apps = {}
+    for trusted in (False, True):
+        app = FastAPI()
+        app.include_router(Router(crud, items_per_query=max(pages), trusted_responses=trusted))
+        apps["trusted" if trusted else "default"] = app
+
+    print(f"{requests} requests per page size, requests/s")
+    print(f"{'page':>8}" + "".join(f"{name:>12}" for name in apps) + f"{'speedup':>10}")
+    for page in pages:
+        default, trusted = [await measure(app, page, requests) for app in apps.values()]
+        print(f"{page:>8}{default:>12.1f}{trusted:>12.1f}{trusted / default:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.pages, args.requests))
@@ -1,46 +1,83 @@
-from typing import Any, Type, TypeVar
+from typing import Any, Type
+
+from fastapi import FastAPI
+from sqlalchemy.orm import sessionmaker
 
 from razorbill.crud import CRUD
 from razorbill.router import Router
-from razorbill.connectors.base import BaseConnector
+from razorbill.utils import build_path_elements
+from razorbill.connectors.alchemy._types import AlchemyModel
+from razorbill.connectors.alchemy.connector import AsyncSQLAlchemyConnector
+from razorbill.connectors.alchemy.engine import get_engine, get_session_maker
+
+
+ResourceConfig = (
+    Type[AlchemyModel] |
+    tuple[Type[AlchemyModel], Type[AlchemyModel] | None] |
+    tuple[Type[AlchemyModel], Type[AlchemyModel] | None, dict[str, Any]]
+)
 
 
 class Resource:
-    pass
+    def __init__(self, connector: AsyncSQLAlchemyConnector, crud: CRUD, router: Router):
+        self.connector = connector
+        self.crud = crud
+        self.router = router
+
+
+def build(
+        configs: list[ResourceConfig],
+        db_url: str | None = None,
+        session_maker: sessionmaker | None = None,
+        app: FastAPI | None = None,
+        counter_cache: bool = False,
+        **engine_kwargs
+) -> dict[str, Resource]:
+    """Builds a connector, a CRUD and a router for every model, all on one engine and session maker.
+
+    A config is a model, or a (model, parent model) or (model, parent model, router kwargs) tuple.
+    Parents missing from the configs get a resource with default router options. Resources are
+    returned by model name and, when `app` is given, their routers are included into it.
+    With `counter_cache` the CRUD of every nested resource keeps counts per parent.
+    """
+    if session_maker is None:
+        if db_url is None:
+            raise ValueError("At least one of two arguments is required: ('db_url', 'session_maker')")
+        session_maker = get_session_maker(get_engine(db_url, **engine_kwargs))
 
+    parsed: dict[str, tuple[Type[AlchemyModel], Type[AlchemyModel] | None, dict[str, Any]]] = {}
+    for config in configs:
+        if not isinstance(config, tuple):
+            config = (config,)
+        model, parent_model, router_kwargs = config + (None, {})[len(config) - 1:]
+        parsed[model.__name__] = (model, parent_model, router_kwargs)
 
-def build(connector: Type[BaseConnector], parent_crud: CRUD|None = None, **router_kwargs):
-    crud = CRUD(connector)
-    router = Router(crud, parent_crud=parent_crud, **router_kwargs)
-    
-    res
-    
-    # resources = {}
-    # parent_model_name = None
+    resources: dict[str, Resource] = {}
 
-    # for model, parent_model, kwargs in configs:
-    #     model_name = model.__name__
+    def build_resource(model: Type[AlchemyModel]) -> Resource:
+        resource = resources.get(model.__name__)
+        if resource is not None:
+            return resource
 
-    #     if parent_model is not None:
-    #         parent_model_name = parent_model.__name__
-    #         parent_resource = resources.get(parent_model_name)
+        _, parent_model, router_kwargs = parsed.get(model.__name__, (model, None, {}))
+        parent_crud, parent_tag = None, None
+        if parent_model is not None:
+            parent_crud = build_resource(parent_model).crud
+            parent_tag = build_path_elements(parent_model.__name__)[0]
 
-    #         if parent_resource is None:
-    #             parent_connector = AsyncSQLAlchemyConnector(str(db_config.DATABASE_URL), parent_model)
-    #             parent_crud = CRUD(parent_connector)
-    #             parent_router = APIRouter(parent_crud)
+        connector = AsyncSQLAlchemyConnector(model, session_maker=session_maker)
+        crud = CRUD(connector, counter_cache=parent_tag if counter_cache else None)
+        router = Router(crud, parent_crud=parent_crud, **router_kwargs)
 
-    #             resources[parent_model_name] = Box(crud=parent_crud, router=parent_router)
+        resource = Resource(connector, crud, router)
+        resources[model.__name__] = resource
+        return resource
 
-    #     connector = AsyncSQLAlchemyConnector(str(db_config.DATABASE_URL), model)
-    #     parent_resource = resources.get(parent_model_name)
-    #     if parent_resource is None:
-    #         parent_crud = None
-    #     else:
-    #         parent_crud = parent_resource.crud
-    #     crud = CRUD(connector)
-    #     router = APIRouter(crud, parent_crud=parent_crud, **kwargs)
+    for model, _, _ in parsed.values():
+        build_resource(model)
 
-    #     resources[model_name] = Box(crud=crud, router=router)
+    if app is not None:
+        for resource in resources.values():
+            app.include_router(resource.router)
 
-    # return Box(resources)
+    return resources
@@ -1,23 +1,37 @@
-from typing import Any, Type
+from typing import Any, AsyncIterator, Type
 
 from loguru import logger
 from pydantic import BaseModel
 
 import sqlalchemy
+from sqlalchemy import inspect
 from sqlalchemy.future import select
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import and_, func, update, delete
+from sqlalchemy.orm import MANYTOONE, sessionmaker
+from sqlalchemy import PrimaryKeyConstraint, UniqueConstraint, insert, update, delete, func, text
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.engine import Dialect
+from sqlalchemy.engine.default import DefaultDialect
+from sqlalchemy.ext.asyncio import AsyncSession
+from razorbill.connectors.alchemy.engine import get_engine, get_session_maker
 from razorbill.connectors.alchemy.exceptions import AsyncSQLAlchemyConnectorException
 
-from razorbill.connectors.base import BaseConnector
-from razorbill.connectors.alchemy.select import build_select_statement
+from razorbill.connectors.base import BaseConnector, IndexChange
+from razorbill.connectors.alchemy.select import (
+    TOTAL_COUNT_LABEL,
+    build_count_statement,
+    build_exists_statement,
+    build_select_statement,
+    statement_cache,
+)
 from razorbill.connectors.alchemy._types import AlchemyModel
 from razorbill.connectors.alchemy.converter import sqlalchemy_to_pydantic
 from razorbill.connectors.alchemy.utils import object_to_dict
 
 
+# labels of the pre-update values returned next to the updated row
+_OLD_PREFIX = "__old_"
+
+
 class AsyncSQLAlchemyConnector(BaseConnector):
     def __init__(
         self, 
@@ -25,9 +39,11 @@ class AsyncSQLAlchemyConnector(BaseConnector):
         db_url: str|None = None, 
         session_maker: sessionmaker|None = None,
         pk_name: str = "id",
+        core_reads: bool = True,
         **kwargs
     ):
         self.model = model
+        self._core_reads = core_reads
         self._columns = model.__table__.columns
         self._column_names = [column.name for column in self._columns]
         
@@ -35,13 +51,17 @@ class AsyncSQLAlchemyConnector(BaseConnector):
             if db_url is None:
                 raise ValueError("At least one of two arguments is required: ('db_url', 'session_maker')")
             
-            engine = create_async_engine(db_url, **kwargs)
-            self.session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False) # type: ignore
+            self.session_maker = get_session_maker(get_engine(db_url, **kwargs))
         else:
             self.session_maker = session_maker
             
         self._schema = sqlalchemy_to_pydantic(self.model)
         self._pk_name = pk_name
+        self._relations = {
+            key: (next(iter(relationship.local_columns)).name, key, sqlalchemy_to_pydantic(relationship.mapper.class_))
+            for key, relationship in inspect(model).relationships.items()
+            if relationship.direction is MANYTOONE
+        }
 
     @property
     def schema(self) -> Type[BaseModel]:
@@ -55,35 +75,116 @@ class AsyncSQLAlchemyConnector(BaseConnector):
     def type_pk(self) -> Type[int]:
         return int
 
+    @property
+    def statement_cache_info(self) -> dict[str, Any]:
+        """Hits, misses and size of the statement cache shared by every connector of the process"""
+        return statement_cache.info()
+
+    @property
+    def relations(self) -> dict[str, tuple[str, str, Type[BaseModel]]]:
+        return self._relations
+
+
+    async def _dialect(self, session: AsyncSession) -> Dialect:
+        # the dialect knows the server version, and whether it supports RETURNING, once connected
+        connection = await session.connection()
+        return connection.dialect
 
     async def create_one(self, obj: dict[str, Any]) -> dict[str, Any]:
-        sql_model = self.model(**obj)
-        
-        async with self.session_maker.begin() as session: # type: ignore
-            session.add(sql_model)
-            
-            try:
-                created_sql_model = await session.merge(sql_model)
-                result = object_to_dict(created_sql_model)
-                await session.commit()
-                return result
-            
-            except sqlalchemy.exc.IntegrityError as error:
-                raise AsyncSQLAlchemyConnectorException(f"Some of relations objects does not exists: {error}")
+        try:
+            async with self.session_maker.begin() as session: # type: ignore
+                if (await self._dialect(session)).insert_returning:
+                    statement = insert(self.model).values(obj).returning(*self._columns)
+                    result = await session.execute(statement)
+                    return dict(result.mappings().one())
 
+                sql_model = self.model(**obj)
+                session.add(sql_model)
+                await session.flush()
+                return object_to_dict(sql_model)
 
-    async def count(self, filters: dict[str, Any]|None = None) -> int:
-        where = []
-        if filters is not None:
-            where = [getattr(self.model, key) == value for key, value in filters.items()]
+        except sqlalchemy.exc.IntegrityError as error:
+            raise AsyncSQLAlchemyConnectorException(f"Some of relations objects does not exists: {error}")
 
-        statement = select(func.count()).select_from(
-            select(self.model).where(and_(True, *where)).subquery()
-        )
+
+    async def has_index(self, field: str, sorted: bool = False) -> bool:
+        """Whether the primary key, an index or a unique constraint of the table starts with `field`"""
+        table = self.model.__table__
+        # foreign key constraints are left out, PostgreSQL does not index them
+        constraints = [
+            constraint for constraint in table.constraints
+            if isinstance(constraint, (PrimaryKeyConstraint, UniqueConstraint))
+        ]
+        leading = {list(index.columns)[0].name for index in [*table.indexes, *constraints] if index.columns}
+        return field in leading
+
+    async def ensure_index(self, field: str, sorted: bool = False) -> IndexChange | None:
+        """Does not touch the schema: returns the CREATE INDEX statement and the alembic operation to apply"""
+        if await self.has_index(field, sorted):
+            return None
+
+        table = self.model.__table__
+        name = f"ix_{table.name}_{field}"
+        engine = self.session_maker.kw.get("bind")
+        dialect = engine.dialect if engine is not None else DefaultDialect()
+        preparer = dialect.identifier_preparer
+        statement = f"CREATE INDEX {preparer.quote(name)} ON {preparer.format_table(table)} ({preparer.quote(field)})"
+        migration = f"op.create_index({name!r}, {table.name!r}, [{field!r}])"
+        return IndexChange(field, False, statement, migration)
+
+    async def count(self, filters: dict[str, Any]|None = None) -> int:
+        statement, params = build_count_statement(self.model, filters)
         async with self.session_maker.begin() as session:
-            count = await session.scalar(statement)
+            count = await session.scalar(statement, params)
         return count
 
+    async def count_capped(self, filters: dict[str, Any]|None = None, cap: int = 1000) -> int:
+        statement, params = build_count_statement(self.model, filters, capped=True)
+        async with self.session_maker.begin() as session:
+            return await session.scalar(statement, {**params, "cap": int(cap)})
+
+    async def count_by(self, field: str) -> dict[Any, int]:
+        column = self.model.__table__.c[field]
+        statement = select(column, func.count()).where(column.is_not(None)).group_by(column)
+        async with self.session_maker.begin() as session:
+            result = await session.execute(statement)
+            return {value: count for value, count in result.all()}
+
+    async def count_estimated(self, filters: dict[str, Any]|None = None) -> int:
+        """Reads the planner's row estimate of the table on PostgreSQL, counts exactly elsewhere.
+
+        The estimate is refreshed by VACUUM and ANALYZE and covers the whole table, so filtered
+        counts and tables never analyzed yet fall back to the exact count.
+        """
+        if not filters:
+            async with self.session_maker.begin() as session:
+                if (await self._dialect(session)).name == "postgresql":
+                    estimate = await session.scalar(
+                        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+                        {"table": self.model.__table__.fullname}
+                    )
+                    if estimate is not None and estimate >= 0:
+                        return estimate
+        return await self.count(filters)
+
+
+    def _load_fields(self, fields: list[str]|None, populate: list[str]) -> list[str]|None:
+        """Columns to SELECT: the requested ones plus the foreign keys populated parents are loaded by"""
+        if not fields:
+            return None
+        return [key for key in fields if key in self._column_names] + [self._relations[key][0] for key in populate]
+
+    async def _fetch_rows(self, statement: Any, params: dict[str, Any]) -> list[dict[str, Any]]:
+        """Runs a Core select on a bare connection: no session, identity map or ORM instances"""
+        engine = self.session_maker.kw.get("bind")
+        if engine is None:
+            async with self.session_maker.begin() as session:
+                result = await session.execute(statement, params)
+                return [dict(row) for row in result.mappings()]
+
+        async with engine.connect() as connection:
+            result = await connection.execute(statement, params)
+            return [dict(row) for row in result.mappings()]
 
     async def get_many(
         self,
@@ -91,40 +192,153 @@ class AsyncSQLAlchemyConnector(BaseConnector):
         limit: int,
         filters: dict[str, Any]|None = None,
         populate: list[str]|None = None,
-        sorting: tuple[str, bool]|None = None
+        sorting: tuple[str, bool]|None = None,
+        cursor: tuple[Any, Any]|None = None,
+        fields: list[str]|None = None
     ) -> list[dict[str, Any]]:
-        
-        statement = build_select_statement(
+        populate = [key for key in populate or [] if key in self._relations]
+        statement, params = build_select_statement(
             self.model, 
             skip=skip, 
             limit=limit, 
             filters=filters, 
             populate=populate, 
-            sort=sorting
+            sort=sorting,
+            cursor=cursor,
+            pk_name=self._pk_name,
+            fields=self._load_fields(fields, populate),
+            core=self._core_reads and not populate
         )
-        
+
+        if self._core_reads and not populate:
+            return await self._fetch_rows(statement, params)
+
         async with self.session_maker.begin() as session:
-            result = await session.execute(statement)
+            result = await session.execute(statement, params)
             items = result.scalars().all()
-            return [object_to_dict(item) for item in items]
+            return [object_to_dict(item, populate, fields) for item in items]
+
+    async def get_many_with_total(
+        self,
+        skip: int,
+        limit: int,
+        filters: dict[str, Any]|None = None,
+        populate: list[str]|None = None,
+        sorting: tuple[str, bool]|None = None,
+        cursor: tuple[Any, Any]|None = None,
+        fields: list[str]|None = None
+    ) -> tuple[list[dict[str, Any]], int]:
+        """Reads the total with the page through a COUNT(*) OVER () column, in one round trip"""
+        if cursor is not None:
+            # a window over a keyset page counts the rows after the cursor only
+            return await super().get_many_with_total(
+                skip=skip, limit=limit, filters=filters, populate=populate,
+                sorting=sorting, cursor=cursor, fields=fields
+            )
 
-    async def get_one(self, obj_id: int, populate: list[str]|None = None) -> dict[str, Any]|None:
+        populate = [key for key in populate or [] if key in self._relations]
+        core = self._core_reads and not populate
+        statement, params = build_select_statement(
+            self.model,
+            skip=skip,
+            limit=limit,
+            filters=filters,
+            populate=populate,
+            sort=sorting,
+            pk_name=self._pk_name,
+            fields=self._load_fields(fields, populate),
+            core=core,
+            with_total=True
+        )
+
+        total = None
+        if core:
+            items = await self._fetch_rows(statement, params)
+            for item in items:
+                total = item.pop(TOTAL_COUNT_LABEL)
+        else:
+            async with self.session_maker.begin() as session:
+                result = await session.execute(statement, params)
+                items = []
+                for item, total in result.all():
+                    items.append(object_to_dict(item, populate, fields))
+
+        if total is None:
+            # no row carries the total past the last page
+            total = 0 if not skip else await self.count(filters)
+        return items, total
+
+    async def iter_many(
+        self,
+        filters: dict[str, Any]|None = None,
+        sorting: tuple[str, bool]|None = None,
+        fields: list[str]|None = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Streams rows through a server-side cursor, fetching `batch_size` rows at a time"""
+        statement, params = build_select_statement(
+            self.model,
+            filters=filters,
+            sort=sorting,
+            pk_name=self._pk_name,
+            fields=self._load_fields(fields, []),
+            core=True,
+            paginate=False
+        )
+        statement = statement.execution_options(yield_per=batch_size)
+
+        engine = self.session_maker.kw.get("bind")
+        if engine is None:
+            async with self.session_maker.begin() as session:
+                result = await session.stream(statement, params)
+                async for row in result.mappings():
+                    yield dict(row)
+            return
+
+        async with engine.connect() as connection:
+            result = await connection.stream(statement, params)
+            async for row in result.mappings():
+                yield dict(row)
+
+    async def get_one(
+        self,
+        obj_id: int,
+        populate: list[str]|None = None,
+        fields: list[str]|None = None
+    ) -> dict[str, Any]|None:
         try:
             filters = {self._pk_name: int(obj_id)}
         except ValueError:
             return None
-        
-        statement = build_select_statement(
+
+        populate = [key for key in populate or [] if key in self._relations]
+        statement, params = build_select_statement(
             self.model, 
             limit=1, 
             filters=filters, 
-            populate=populate
+            populate=populate,
+            pk_name=self._pk_name,
+            fields=self._load_fields(fields, populate),
+            core=self._core_reads and not populate
         )
-        
+
+        if self._core_reads and not populate:
+            rows = await self._fetch_rows(statement, params)
+            return rows[0] if rows else None
+
         async with self.session_maker.begin() as session:
-            query = await session.execute(statement)
+            query = await session.execute(statement, params)
             item = query.scalars().one_or_none()
-            return object_to_dict(item) if item else None
+            return object_to_dict(item, populate, fields) if item else None
+
+    async def exists(self, obj_id: int) -> bool:
+        try:
+            obj_id = int(obj_id)
+        except ValueError:
+            return False
+
+        statement = build_exists_statement(self.model, self._pk_name)
+        return bool(await self._fetch_rows(statement, {"pk": obj_id}))
 
     async def update_one(self, obj_id: int, obj: dict[str, Any]) -> dict[str, Any] | None:
         pk_column = getattr(self.model, self._pk_name)
@@ -133,57 +347,108 @@ class AsyncSQLAlchemyConnector(BaseConnector):
         except ValueError:
             return None
 
-        # TODO сделать через один запрос и проверить что update session работает и variable_values нормально сохраняется
+        if not obj:
+            return await self.get_one(obj_id)
+
         statement = (
             update(self.model)
             .values(obj)
-            .where(self.model.id == obj_id)
-            .execution_options(synchronize_session="fetch")
+            .where(pk_column == obj_id)
+            .execution_options(synchronize_session=False)
         )
         try:
             async with self.session_maker.begin() as session:
-                await session.execute(statement)
-                await session.commit()
-                updated_obj = await self.get_one(obj_id)
+                if (await self._dialect(session)).update_returning:
+                    result = await session.execute(statement.returning(*self._columns))
+                    updated_obj = result.mappings().one_or_none()
+                    return dict(updated_obj) if updated_obj else None
 
-            return updated_obj if updated_obj else None
+                result = await session.execute(statement)
+                if not result.rowcount:
+                    return None
+                result = await session.execute(select(*self._columns).where(pk_column == obj_id))
+                return dict(result.mappings().one())
 
         except sqlalchemy.exc.IntegrityError as error:
             raise AsyncSQLAlchemyConnectorException(f"Some of relations objects does not exists: {error}")
 
-    # async def update_one(self, obj_id: int, obj: dict[str, Any]) -> dict[str, Any]|None:
-    #     pk_column = getattr(self.model, self._pk_name)
-    #     # TODO этот запрос надо проверить на работоспособность
-    #     statement = (
-    #         update(self.model)
-    #         .returning(self.model)
-    #         .where(self.model.id == int(obj_id))
-    #         .values(obj)
-    #         .execution_options(synchronize_session="fetch")
-    #     )
-    #
-    #     try:
-    #         async with self.session_maker.begin() as session:
-    #             result = await session.execute(statement)
-    #             await session.commit()
-    #             updated_obj = result.first()
-    #         return object_to_dict(updated_obj[0]) if updated_obj else None
-    #     except sqlalchemy.exc.IntegrityError as error:
-    #         raise AsyncSQLAlchemyConnectorException(f"Some of relations objects does not exists: {error}")
-    #
-    #     except sqlalchemy.exc.IntegrityError as error:
-    #         raise AsyncSQLAlchemyConnectorException(f"Some of relations objects does not exists: {error}")
+    async def update_one_with_old(
+        self, obj_id: int, obj: dict[str, Any]
+    ) -> tuple[dict[str, Any] | None, dict[str, Any] | None]:
+        """The row before and after the update, both read in the transaction of the write.
+
+        PostgreSQL returns both from one UPDATE joined with a locked snapshot of the row, other
+        databases lock the row with SELECT ... FOR UPDATE before updating it.
+        """
+        pk_column = getattr(self.model, self._pk_name)
+        try:
+            obj_id = int(obj_id)
+        except ValueError:
+            return None, None
+
+        if not obj:
+            item = await self.get_one(obj_id)
+            return item, item
+
+        try:
+            async with self.session_maker.begin() as session:
+                dialect = await self._dialect(session)
+                if dialect.name == "postgresql":
+                    old = select(*self._columns).where(pk_column == obj_id).with_for_update().subquery("old")
+                    statement = (
+                        update(self.model)
+                        .values(obj)
+                        .where(pk_column == old.c[self._pk_name])
+                        .returning(*self._columns, *[column.label(_OLD_PREFIX + column.name) for column in old.c])
+                        .execution_options(synchronize_session=False)
+                    )
+                    row = (await session.execute(statement)).mappings().one_or_none()
+                    if row is None:
+                        return None, None
+                    names = [column.name for column in self._columns]
+                    return {name: row[_OLD_PREFIX + name] for name in names}, {name: row[name] for name in names}
+
+                result = await session.execute(select(*self._columns).where(pk_column == obj_id).with_for_update())
+                old_obj = result.mappings().one_or_none()
+                if old_obj is None:
+                    return None, None
+
+                statement = (
+                    update(self.model)
+                    .values(obj)
+                    .where(pk_column == obj_id)
+                    .execution_options(synchronize_session=False)
+                )
+                if dialect.update_returning:
+                    result = await session.execute(statement.returning(*self._columns))
+                else:
+                    await session.execute(statement)
+                    result = await session.execute(select(*self._columns).where(pk_column == obj_id))
+                return dict(old_obj), dict(result.mappings().one())
+
+        except sqlalchemy.exc.IntegrityError as error:
+            raise AsyncSQLAlchemyConnectorException(f"Some of relations objects does not exists: {error}")
 
     async def delete_one(self, obj_id: int) -> dict[str, Any]|None:
         pk_column = getattr(self.model, self._pk_name)
+        try:
+            obj_id = int(obj_id)
+        except ValueError:
+            return None
 
-        select_statement = select(self.model).where(pk_column == int(obj_id))
+        statement = delete(self.model).where(pk_column == obj_id).execution_options(synchronize_session=False)
         async with self.session_maker.begin() as session:
-            result = await session.execute(select_statement)
-            obj_to_delete = result.scalar_one_or_none()
+            if (await self._dialect(session)).delete_returning:
+                result = await session.execute(statement.returning(*self._columns))
+                deleted_obj = result.mappings().one_or_none()
+                return dict(deleted_obj) if deleted_obj else None
 
-        if obj_to_delete:
-            delete_statement = delete(self.model).where(pk_column == int(obj_id))
-            async with self.session_maker.begin() as session:
-                _ = await session.execute(delete_statement)
-            return object_to_dict(obj_to_delete)
+            # the row is locked until the delete, in the same transaction
+            result = await session.execute(
+                select(*self._columns).where(pk_column == obj_id).with_for_update()
+            )
+            deleted_obj = result.mappings().one_or_none()
+            if deleted_obj is None:
+                return None
+            await session.execute(statement)
+            return dict(deleted_obj)
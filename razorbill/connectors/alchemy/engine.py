@@ -0,0 +1,42 @@
+from typing import Any
+
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+
+
+_engines: dict[tuple[str, str], AsyncEngine] = {}
+_session_makers: dict[int, sessionmaker] = {}
+
+
+def _engine_key(db_url: str, kwargs: dict[str, Any]) -> tuple[str, str]:
+    # engine options may be unhashable (dicts of connect_args), their repr is stable enough
+    return db_url, repr(sorted(kwargs.items()))
+
+
+def get_engine(db_url: str, **kwargs) -> AsyncEngine:
+    """Returns the engine of the process for this url and options, creating it on first use.
+
+    Connectors of the same database share one engine and so one connection pool.
+    """
+    key = _engine_key(db_url, kwargs)
+    engine = _engines.get(key)
+    if engine is None:
+        engine = create_async_engine(db_url, **kwargs)
+        _engines[key] = engine
+    return engine
+
+
+def get_session_maker(engine: AsyncEngine) -> sessionmaker:
+    session_maker = _session_makers.get(id(engine))
+    if session_maker is None:
+        session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False) # type: ignore
+        _session_makers[id(engine)] = session_maker
+    return session_maker
+
+
+async def dispose_engines() -> None:
+    """Closes the pools of every registered engine, e.g. on application shutdown."""
+    for engine in _engines.values():
+        await engine.dispose()
+    _engines.clear()
+    _session_makers.clear()
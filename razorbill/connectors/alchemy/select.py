@@ -1,42 +1,278 @@
-from typing import Any, Type
-from sqlalchemy import select, desc
+from collections import OrderedDict
+from operator import ge, gt, le, lt
+from typing import Any, Callable, Hashable, Type
+from sqlalchemy import Integer, and_, bindparam, false, func, literal, or_, select
+from sqlalchemy.orm import load_only, selectinload
 from sqlalchemy.inspection import inspect
 
 from razorbill.connectors.alchemy._types import AlchemyModel
+from razorbill.filters import split_filter
+
+
+class StatementCache:
+    """LRU cache of statements by query shape.
+
+    A statement built once is executed again with new bound values, which skips building it in
+    Python and lets SQLAlchemy reuse its compiled form.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._statements: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def get(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        statement = self._statements.get(key)
+        if statement is not None:
+            self.hits += 1
+            self._statements.move_to_end(key)
+            return statement
+
+        self.misses += 1
+        statement = build()
+        self._statements[key] = statement
+        if len(self._statements) > self.maxsize:
+            self._statements.popitem(last=False)
+        return statement
+
+    def info(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._statements),
+            "maxsize": self.maxsize,
+        }
+
+    def clear(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._statements.clear()
+
+
+statement_cache = StatementCache()
+
+TOTAL_COUNT_LABEL = "__total_count"
+
+
+_COMPARISONS = {"gt": gt, "gte": ge, "lt": lt, "lte": le}
+
+
+def _filters_shape(filters: dict[str, Any]) -> tuple[tuple[str, str, str, bool], ...]:
+    # None and isnull compile to IS [NOT] NULL instead of a bound value, so they are part of the shape
+    shape = []
+    for key, value in filters.items():
+        field, operator = split_filter(key)
+        shape.append((key, field, operator, bool(value) if operator == "isnull" else value is None))
+    return tuple(shape)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _filters_params(filters: dict[str, Any]) -> dict[str, Any]:
+    params = {}
+    for key, value in filters.items():
+        operator = split_filter(key)[1]
+        if value is None or operator == "isnull":
+            continue
+        if operator == "prefix":
+            value = _escape_like(value)
+        elif operator == "in":
+            value = list(value)
+        params[f"filter_{key}"] = value
+    return params
+
+
+def _attribute(model: Type[AlchemyModel], key: str, core: bool = False) -> Any:
+    return model.__table__.c[key] if core else getattr(model, key)
+
+
+def build_where(
+        model: Type[AlchemyModel],
+        shape: tuple[tuple[str, str, str, bool], ...],
+        core: bool = False
+) -> list[Any]:
+    where = []
+    for key, field, operator, flag in shape:
+        attr = _attribute(model, field, core)
+        value = bindparam(f"filter_{key}", expanding=operator == "in")
+
+        if operator == "isnull":
+            where.append(attr.is_(None) if flag else attr.is_not(None))
+        elif flag:
+            # a None operand: equality is IS NULL, a comparison with NULL matches nothing
+            where.append(attr.is_(None) if operator == "eq" else false())
+        elif operator == "eq":
+            where.append(attr == value)
+        elif operator == "in":
+            where.append(attr.in_(value))
+        elif operator == "prefix":
+            where.append(attr.like(value, escape="\\"))
+        else:
+            where.append(_COMPARISONS[operator](attr, value))
+    return where
+
+
+def build_count_statement(
+    model: Type[AlchemyModel],
+    filters: dict[str, Any]|None = None,
+    capped: bool = False
+) -> tuple[Any, dict[str, Any]]:
+    """COUNT(*) straight over the table; `capped` counts at most the `cap` parameter rows.
+
+    A capped count stops scanning once `cap` primary keys were found, whatever the table size.
+    """
+    filters = filters or {}
+    shape = _filters_shape(filters)
+
+    def build() -> Any:
+        table = model.__table__
+        where = build_where(model, shape, core=True)
+        if not capped:
+            return select(func.count()).select_from(table).where(*where)
+
+        pk_columns = list(table.primary_key.columns)
+        limited = select(*pk_columns).where(*where).limit(bindparam("cap", type_=Integer)).subquery()
+        return select(func.count()).select_from(limited)
+
+    return statement_cache.get(("count", model, shape, capped), build), _filters_params(filters)
+
+
+def build_exists_statement(model: Type[AlchemyModel], pk_name: str = "id") -> Any:
+    """SELECT 1 ... LIMIT 1 by the `pk` parameter, served by the primary key index alone"""
+    def build() -> Any:
+        pk = _attribute(model, pk_name, core=True)
+        return select(literal(1)).select_from(model.__table__).where(pk == bindparam("pk")).limit(1)
+
+    return statement_cache.get(("exists", model, pk_name), build)
+
 
-    
 def build_select_statement(
-    model: Type[AlchemyModel], 
-    skip: int = 0, 
+    model: Type[AlchemyModel],
+    skip: int = 0,
     limit: int = 10,
     filters: dict[str, Any]|None = None,
     populate: list[str]|None = None,
-    sort: tuple[str, bool]|None = None
-) -> Any:
-    #relations = inspect(model).relationships.items()
-    # key_to_model = {name: rel.mapper.class_ for name, rel in relations}
-    
-    statement = select(model)
-    
-    if filters is not None:
-        where = [getattr(model, key) == value for key, value in filters.items()]
-        statement = statement.where(*where)
-
-    # if populate is not None:
-    #     statement = statement.options(joinedload(User.addresses))
-        
-    #     for key in populate:
-    #         if key.lower() in key_to_model:
-    #             model_to_join = key_to_model[key.lower()]
-    #             statement = statement.join(model_to_join, isouter=True)
+    sort: tuple[str, bool]|None = None,
+    cursor: tuple[Any, Any]|None = None,
+    pk_name: str = "id",
+    fields: list[str]|None = None,
+    core: bool = False,
+    paginate: bool = True,
+    with_total: bool = False
+) -> tuple[Any, dict[str, Any]]:
+    """Returns the statement for the shape of the query and the values to execute it with.
+
+    With `core` it is a plain select of the table columns, which yields rows instead of ORM
+    instances; populate needs the ORM and is ignored then. `with_total` adds a COUNT(*) OVER ()
+    column labelled TOTAL_COUNT_LABEL: the number of rows matching the filters, before the page.
+    """
+    filters = filters or {}
+    shape = _filters_shape(filters)
 
     if sort is not None:
-        if None not in sort:
-            key, is_desc = sort
-            attr = getattr(model, key)
-            if is_desc: 
-                attr = desc(attr)
-            statement = statement.order_by(attr)
-
-    statement = statement.offset(int(skip)).limit(int(limit))
-    return statement
\ No newline at end of file
+        sort = None if None in sort else (sort[0], bool(sort[1]))
+    if cursor is not None and sort is None:
+        # keyset pages follow the primary key unless another order is requested
+        sort = (pk_name, False)
+
+    cursor_shape = None if cursor is None else cursor[0] is None
+    key = (
+        model, pk_name, shape, sort, tuple(populate or ()), tuple(fields or ()),
+        cursor_shape, core, paginate, with_total
+    )
+
+    def build() -> Any:
+        if core:
+            columns = model.__table__.c
+            if fields:
+                columns = [column for column in columns if column.name in fields or column.name == pk_name]
+            statement = select(*columns)
+        else:
+            statement = select(model)
+
+        if with_total:
+            statement = statement.add_columns(func.count().over().label(TOTAL_COUNT_LABEL))
+
+        if fields and not core:
+            # the primary key is always loaded, the rest of the columns are left out of the SELECT
+            statement = statement.options(load_only(*(getattr(model, key) for key in fields)))
+
+        if shape:
+            statement = statement.where(*build_where(model, shape, core))
+
+        if populate and not core:
+            # one extra SELECT ... WHERE pk IN (...) per relationship for the whole page
+            relations = inspect(model).relationships
+            statement = statement.options(
+                *(selectinload(getattr(model, key)) for key in populate if key in relations)
+            )
+
+        if sort is not None:
+            statement = statement.order_by(*build_order(model, sort, pk_name, core))
+
+        if cursor_shape is not None:
+            statement = statement.where(build_keyset_condition(model, sort, cursor_shape, pk_name, core))  # type: ignore
+
+        if not paginate:
+            return statement
+        return statement.offset(bindparam("skip", type_=Integer)).limit(bindparam("limit", type_=Integer))
+
+    params = _filters_params(filters)
+    if paginate:
+        params["skip"] = int(skip)
+        params["limit"] = int(limit)
+    if cursor is not None:
+        value, last_pk = cursor
+        params["cursor_pk"] = last_pk
+        if value is not None and sort[0] != pk_name:  # type: ignore
+            params["cursor_value"] = value
+
+    return statement_cache.get(key, build), params
+
+
+def build_order(model: Type[AlchemyModel], sort: tuple[str, bool], pk_name: str, core: bool = False) -> list[Any]:
+    """Orders by the sort field, then by pk to break ties.
+
+    Nulls come last in ascending order and first in descending, as in MemoryConnector.
+    """
+    key, is_desc = sort
+    pk = _attribute(model, pk_name, core)
+    if key == pk_name:
+        return [pk.desc() if is_desc else pk.asc()]
+
+    attr = _attribute(model, key, core)
+    if is_desc:
+        return [attr.desc().nulls_first(), pk.desc()]
+    return [attr.asc().nulls_last(), pk.asc()]
+
+
+def build_keyset_condition(
+    model: Type[AlchemyModel],
+    sort: tuple[str, bool],
+    value_is_null: bool,
+    pk_name: str,
+    core: bool = False
+) -> Any:
+    """Selects the rows ordered by `build_order` after the cursor_value and cursor_pk parameters"""
+    key, is_desc = sort
+    pk = _attribute(model, pk_name, core)
+    attr = _attribute(model, key, core)
+    last_pk = bindparam("cursor_pk")
+
+    if key == pk_name:
+        return pk < last_pk if is_desc else pk > last_pk
+
+    value = bindparam("cursor_value")
+    if is_desc:
+        if value_is_null:
+            return or_(attr.is_not(None), and_(attr.is_(None), pk < last_pk))
+        return or_(attr < value, and_(attr == value, pk < last_pk))
+
+    if value_is_null:
+        return and_(attr.is_(None), pk > last_pk)
+    return or_(attr > value, and_(attr == value, pk > last_pk), attr.is_(None))
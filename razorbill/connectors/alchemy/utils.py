@@ -3,5 +3,18 @@ from typing import Any, Type
 from sqlalchemy.orm import DeclarativeBase
 
 
-def object_to_dict(obj: Type[DeclarativeBase]) -> dict[str, Any]:
-    return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
\ No newline at end of file
+def object_to_dict(
+    obj: Type[DeclarativeBase],
+    populate: list[str]|None = None,
+    fields: list[str]|None = None
+) -> dict[str, Any]:
+    columns = obj.__table__.columns
+    if fields:
+        # the other columns were not loaded, touching them would emit a query per object
+        columns = [c for c in columns if c.name in fields or c.primary_key]
+    result = {c.name: getattr(obj, c.name) for c in columns}
+    # only relationships loaded by the statement may be touched, lazy loads fail under asyncio
+    for key in populate or []:
+        parent = getattr(obj, key)
+        result[key] = object_to_dict(parent) if parent is not None else None
+    return result
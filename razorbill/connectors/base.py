@@ -1,8 +1,16 @@
 from abc import ABC, abstractmethod
-from typing import Any, Type
+from typing import Any, AsyncIterator, Awaitable, Callable, NamedTuple, Type
 from pydantic import BaseModel
 
 
+class IndexChange(NamedTuple):
+    """An index ensure_index made, or one to apply by a migration when `applied` is False"""
+    field: str
+    applied: bool
+    statement: str
+    migration: str | None = None
+
+
 class BaseConnector(ABC):
     @property
     @abstractmethod
@@ -19,10 +27,48 @@ class BaseConnector(ABC):
     def type_pk(self) -> Type[str|int]:
         pass
 
+    @property
+    def relations(self) -> dict[str, tuple[str, str, Type[BaseModel]]]:
+        """Parents items can be populated with: populate key -> (foreign key, relationship field, parent schema)"""
+        return {}
+
+    @property
+    def startup_handlers(self) -> list[Callable[[], Awaitable[None]]]:
+        """Coroutines to run on application startup, routers of the connector register them"""
+        return []
+
+    async def has_index(self, field: str, sorted: bool = False) -> bool:
+        """Whether lookups by `field` are served by an index, ordered scans too when `sorted`"""
+        return field == self.pk_name
+
+    async def ensure_index(self, field: str, sorted: bool = False) -> IndexChange | None:
+        """Indexes `field` unless it is indexed already, None when nothing was or has to be done"""
+        return None
+
     @abstractmethod
     async def count(self, filters: dict[str, Any] | None = None) -> int:
         pass
 
+    async def count_capped(self, filters: dict[str, Any] | None = None, cap: int = 1000) -> int:
+        """Counts at most `cap` items, so a large result costs no more than `cap` rows.
+
+        The default counts everything and clips it, connectors override it to stop early.
+        """
+        return min(await self.count(filters), cap)
+
+    async def count_estimated(self, filters: dict[str, Any] | None = None) -> int:
+        """An approximate count from database statistics, the default is the exact count"""
+        return await self.count(filters)
+
+    async def count_by(self, field: str) -> dict[Any, int]:
+        """Item counts per non-null value of `field`, the default walks iter_many"""
+        counts: dict[Any, int] = {}
+        async for item in self.iter_many(fields=[field]):
+            value = item.get(field)
+            if value is not None:
+                counts[value] = counts.get(value, 0) + 1
+        return counts
+
     @abstractmethod
     async def get_many(
         self, *,
@@ -30,14 +76,68 @@ class BaseConnector(ABC):
         limit: int,
         populate: bool = False, 
         filters: dict[str, Any]|None = None,
-        sorting: tuple[str, bool]|None = None
+        sorting: tuple[str, bool]|None = None,
+        cursor: tuple[Any, Any]|None = None,
+        fields: list[str]|None = None
     ) -> list[dict[str, Any]]:
+        """`cursor` is the (sort value, pk) of the last item of the previous page, items after it are returned.
+
+        `fields` limits items to these fields plus the pk and populated relationships.
+        """
         pass
 
+    async def get_many_with_total(
+        self, *,
+        skip: int,
+        limit: int,
+        populate: list[str]|None = None,
+        filters: dict[str, Any]|None = None,
+        sorting: tuple[str, bool]|None = None,
+        cursor: tuple[Any, Any]|None = None,
+        fields: list[str]|None = None
+    ) -> tuple[list[dict[str, Any]], int]:
+        """The page and the count of every item matching the filters.
+
+        The default runs get_many and count, connectors override it to get both in one query.
+        """
+        items = await self.get_many(
+            skip=skip, limit=limit, populate=populate, filters=filters,
+            sorting=sorting, cursor=cursor, fields=fields
+        )
+        return items, await self.count(filters)
+
+    async def iter_many(
+        self,
+        filters: dict[str, Any]|None = None,
+        sorting: tuple[str, bool]|None = None,
+        fields: list[str]|None = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Yields every matching item, holding at most one batch in memory.
+
+        The default walks get_many page by page, connectors override it with a native cursor.
+        """
+        skip = 0
+        while True:
+            items = await self.get_many(
+                skip=skip, limit=batch_size, filters=filters, sorting=sorting, fields=fields
+            )
+            for item in items:
+                yield item
+            if len(items) < batch_size:
+                return
+            skip += batch_size
+
     @abstractmethod
-    async def get_one(self, obj_id: str | int, populate: bool | str = False) -> dict[str, Any]:
+    async def get_one(
+        self, obj_id: str | int, populate: bool | str = False, fields: list[str]|None = None
+    ) -> dict[str, Any]:
         pass
 
+    async def exists(self, obj_id: str | int) -> bool:
+        """Whether an item with this pk exists, connectors override it to skip loading the item"""
+        return await self.get_one(obj_id, fields=[self.pk_name]) is not None
+
     @abstractmethod
     async def create_one(self, obj: dict[str, Any]) -> dict[str, Any]:
         pass
@@ -46,6 +146,18 @@ class BaseConnector(ABC):
     async def update_one(self, obj_id: str | int, obj: dict[str, Any]) -> dict[str, Any]:
         pass
 
+    async def update_one_with_old(
+        self, obj_id: str | int, obj: dict[str, Any]
+    ) -> tuple[dict[str, Any] | None, dict[str, Any] | None]:
+        """The item before and after the update, (None, None) when it does not exist.
+
+        The default reads the item before updating it, connectors override it to get both from the write.
+        """
+        old = await self.get_one(obj_id)
+        if old is None:
+            return None, None
+        return old, await self.update_one(obj_id, obj)
+
     @abstractmethod
     async def delete_one(self, obj_id: str | int) -> dict[str, Any] | None:
         pass
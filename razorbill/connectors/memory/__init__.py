@@ -0,0 +1,2 @@
+from razorbill.connectors.memory.connector import MemoryConnector, _inmemory_storage
+from razorbill.connectors.memory.index import HashIndex, SortedIndex
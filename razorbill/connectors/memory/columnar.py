@@ -0,0 +1,241 @@
+import sys
+from collections.abc import MutableMapping
+from types import NoneType, UnionType
+from typing import Any, Iterator, Type, Union, get_args, get_origin
+
+import numpy as np
+from pydantic import BaseModel
+
+
+_TYPED_COLUMNS = {"int": np.int64, "float": np.float64, "bool": np.bool_}
+
+
+def _column_kind(annotation: Any) -> str:
+    if get_origin(annotation) in (Union, UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not NoneType]
+        if len(args) == 1:
+            annotation = args[0]
+
+    # bool is a subclass of int, it has to be checked first
+    if annotation is bool:
+        return "bool"
+    if annotation is int:
+        return "int"
+    if annotation is float:
+        return "float"
+    if annotation is str:
+        return "str"
+    return "object"
+
+
+class _Column:
+    """One field of every row: a typed array plus a null mask, or an object array."""
+
+    def __init__(self, kind: str, capacity: int) -> None:
+        self.kind = kind
+        self.nulls: np.ndarray | None = None
+
+        if kind in _TYPED_COLUMNS:
+            self.values = np.zeros(capacity, dtype=_TYPED_COLUMNS[kind])
+            self.nulls = np.ones(capacity, dtype=bool)
+        else:
+            self.values = np.full(capacity, None, dtype=object)
+
+    def resize(self, capacity: int, offsets: np.ndarray | None = None) -> None:
+        """Reallocates the column, keeping either the first rows or only the given offsets."""
+        values = self.values if offsets is None else self.values[offsets]
+        if self.nulls is None:
+            self.values = np.full(capacity, None, dtype=object)
+        else:
+            self.values = np.zeros(capacity, dtype=values.dtype)
+        self.values[:len(values)] = values
+
+        if self.nulls is not None:
+            nulls = self.nulls if offsets is None else self.nulls[offsets]
+            self.nulls = np.ones(capacity, dtype=bool)
+            self.nulls[:len(nulls)] = nulls
+
+    def _to_object(self) -> None:
+        values = np.full(len(self.values), None, dtype=object)
+        for offset in np.flatnonzero(~self.nulls):  # type: ignore
+            values[offset] = self.values[offset].item()
+
+        self.kind = "object"
+        self.values = values
+        self.nulls = None
+
+    def set(self, offset: int, value: Any) -> None:
+        if self.nulls is None:
+            self.values[offset] = sys.intern(value) if type(value) is str else value
+            return
+
+        if value is None:
+            self.nulls[offset] = True
+            return
+
+        try:
+            self.values[offset] = value
+        except (TypeError, ValueError, OverflowError):
+            # a value the typed array cannot hold, keep it as a python object instead
+            self._to_object()
+            self.values[offset] = value
+            return
+
+        self.nulls[offset] = False
+
+    def get(self, offset: int) -> Any:
+        if self.nulls is None:
+            return self.values[offset]
+        if self.nulls[offset]:
+            return None
+        return self.values[offset].item()
+
+    def equals(self, value: Any, size: int) -> np.ndarray:
+        if self.nulls is None:
+            return np.asarray(self.values[:size] == value, dtype=bool)
+
+        if value is None:
+            return self.nulls[:size].copy()
+
+        if not isinstance(value, (int, float, np.generic)):
+            return np.zeros(size, dtype=bool)
+
+        return (self.values[:size] == value) & ~self.nulls[:size]
+
+
+class ColumnarStorage(MutableMapping):
+    """Row store keeping every schema field in its own array.
+
+    Numeric and bool fields live in typed NumPy arrays with a null mask, strings are interned
+    into object arrays, and a pk -> row offset map locates rows. Rows are appended, deletes leave
+    tombstones that are compacted away once they make up half of the arrays, so iteration keeps
+    insertion order. Fields missing from the schema are kept per row in a plain dict.
+    """
+
+    def __init__(self, schema: Type[BaseModel], pk_name: str, capacity: int = 1024) -> None:
+        self._pk_name = pk_name
+        self._capacity = capacity
+        self._columns = {
+            name: _Column(_column_kind(info.annotation), capacity)
+            for name, info in schema.model_fields.items()
+        }
+        self._keys = np.full(capacity, None, dtype=object)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._offsets: dict[Any, int] = {}
+        self._extra: dict[int, dict[str, Any]] = {}
+        self._size = 0
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, pk: Any) -> bool:
+        return pk in self._offsets
+
+    def __iter__(self) -> Iterator[Any]:
+        for offset in np.flatnonzero(self._alive[:self._size]):
+            yield self._keys[offset]
+
+    def __reversed__(self) -> Iterator[Any]:
+        for offset in np.flatnonzero(self._alive[:self._size])[::-1]:
+            yield self._keys[offset]
+
+    def __getitem__(self, pk: Any) -> dict[str, Any]:
+        return self._row(self._offsets[pk])
+
+    def __setitem__(self, pk: Any, row: dict[str, Any]) -> None:
+        offset = self._offsets.get(pk)
+
+        if offset is None:
+            if self._size == self._capacity:
+                self._resize(self._capacity * 2)
+
+            offset = self._size
+            self._size += 1
+            self._offsets[pk] = offset
+            self._keys[offset] = pk
+            self._alive[offset] = True
+
+        for name, column in self._columns.items():
+            column.set(offset, row.get(name))
+
+        extra = {key: value for key, value in row.items() if key not in self._columns}
+        if extra:
+            self._extra[offset] = extra
+        else:
+            self._extra.pop(offset, None)
+
+    def __delitem__(self, pk: Any) -> None:
+        offset = self._offsets.pop(pk)
+        self._alive[offset] = False
+        self._keys[offset] = None
+        self._extra.pop(offset, None)
+        self._dead += 1
+
+        if self._dead > 1024 and self._dead * 2 > self._size:
+            self._compact()
+
+    def _row(self, offset: int) -> dict[str, Any]:
+        row = {name: column.get(offset) for name, column in self._columns.items()}
+        extra = self._extra.get(offset)
+        if extra:
+            row.update(extra)
+        return row
+
+    def _resize(self, capacity: int, offsets: np.ndarray | None = None) -> None:
+        for column in self._columns.values():
+            column.resize(capacity, offsets)
+
+        keys = self._keys if offsets is None else self._keys[offsets]
+        self._keys = np.full(capacity, None, dtype=object)
+        self._keys[:len(keys)] = keys
+
+        alive = self._alive if offsets is None else self._alive[offsets]
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._alive[:len(alive)] = alive
+
+        self._capacity = capacity
+
+    def _compact(self) -> None:
+        live = np.flatnonzero(self._alive[:self._size])
+        moved = {int(old): new for new, old in enumerate(live)}
+
+        self._resize(max(len(live) * 2, 1024), live)
+        self._size = len(live)
+        self._dead = 0
+        self._offsets = {self._keys[offset]: offset for offset in range(self._size)}
+        self._extra = {moved[offset]: extra for offset, extra in self._extra.items()}
+
+    def _mask(self, filters: dict[str, Any]) -> tuple[np.ndarray, dict[str, Any]]:
+        """Vectorized match of the filters on schema columns, the rest is returned for a row check."""
+        mask = self._alive[:self._size].copy()
+        rest = {}
+
+        for key, value in filters.items():
+            column = self._columns.get(key)
+            if column is None:
+                rest[key] = value
+                continue
+            mask &= column.equals(value, self._size)
+
+        return mask, rest
+
+    def select(self, filters: dict[str, Any] | None = None) -> Iterator[dict[str, Any]]:
+        if not filters:
+            mask, rest = self._alive[:self._size], {}
+        else:
+            mask, rest = self._mask(filters)
+
+        for offset in np.flatnonzero(mask):
+            row = self._row(offset)
+            if all(row.get(key) == value for key, value in rest.items()):
+                yield row
+
+    def count(self, filters: dict[str, Any] | None = None) -> int:
+        if not filters:
+            return len(self)
+
+        mask, rest = self._mask(filters)
+        if rest:
+            return sum(1 for _ in self.select(filters))
+        return int(mask.sum())
@@ -0,0 +1,650 @@
+import asyncio
+import time
+from collections import Counter
+from heapq import heappop, heappush
+from itertools import dropwhile, islice
+from collections.abc import MutableMapping
+from typing import Any, AsyncIterator, Iterable, Type
+from razorbill.connectors.base import BaseConnector, IndexChange
+from razorbill.filters import RANGE_OPERATORS, match_row, parse_filters
+from razorbill.connectors.memory.eviction import build_policy, row_size
+from razorbill.connectors.memory.index import HashIndex, SortedIndex, sort_key
+from razorbill.connectors.memory.journal import Journal
+from razorbill.connectors.memory.storage import build_storage
+from pydantic import BaseModel
+
+_inmemory_storage: dict[
+    str, MutableMapping[int, dict[str, Any]]] = {}  # key = schema_name, value = {key = (pk, parent_pk | None), value = value }
+_inmemory_schemas: dict[str, Type[BaseModel]] = {}  # key = schema_name, value = schema, for populate
+
+
+class MemoryConnector(BaseConnector):
+    def __init__(
+            self,
+            schema: Type[BaseModel],
+            pk_name: str = "id",
+            indexes: list[str] | None = None,
+            sorted_indexes: list[str] | None = None,
+            storage: str = "dict",
+            persist_path: str | None = None,
+            fsync: str = "batch",
+            snapshot_every: int = 100_000,
+            shared_path: str | None = None,
+            max_entries: int | None = None,
+            max_bytes: int | None = None,
+            ttl: float | None = None,
+            expire_interval: float | None = None,
+            eviction: str = "lru"
+    ) -> None:
+        """Rows expire `ttl` seconds after they were written. Expired rows are removed lazily, before every
+        read, and with `expire_interval` also by a sweep on the event loop every this many seconds,
+        so a connector nobody reads does not hold them forever. The sweep starts with the first
+        operation made inside a running loop and stops on close().
+        """
+        if storage == "shared" and persist_path is not None:
+            raise ValueError("The shared storage is a file already, it cannot be combined with 'persist_path'")
+        if storage == "shared" and (max_entries or max_bytes or ttl):
+            raise ValueError("Capacity limits and ttl are per process, they cannot be used with the shared storage")
+
+        self._id = 1
+        self._pk_name = pk_name
+        self._schema = schema
+        self._shared = storage == "shared"
+        self._storage = build_storage(storage, schema, pk_name, shared_path=shared_path)
+        _inmemory_storage[schema.__name__] = self._storage
+        _inmemory_schemas[schema.__name__] = schema
+
+        self._indexes: dict[str, HashIndex] = {}
+        for field in indexes or []:
+            self._check_field(field)
+            self._indexes[field] = HashIndex(field)
+
+        self._sorted_indexes: dict[str, SortedIndex] = {}
+        for field in sorted_indexes or []:
+            self._check_field(field)
+            self._sorted_indexes[field] = SortedIndex(field)
+
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._policy = build_policy(eviction) if max_entries or max_bytes else None
+        self._bytes = 0
+        self._sizes: dict[Any, int] = {}
+        self._ttl = ttl
+        self._expires: dict[Any, float] = {}
+        self._expiry_heap: list[tuple[float, Any]] = []
+        self._expire_interval = expire_interval if ttl is not None else None
+        self._sweeper: asyncio.Task | None = None
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        # populate tuple -> [(parent schema name, fk field, relationship field)]
+        self._populate_plans: dict[tuple[str, ...], list[tuple[str, str, str]]] = {}
+
+        self._journal: Journal | None = None
+        if persist_path is not None:
+            self._journal = Journal(
+                persist_path, schema.__name__, self._storage,
+                fsync=fsync, snapshot_every=snapshot_every
+            )
+            self._journal.load()
+            self._id = (self._journal.last_pk or 0) + 1
+            self._rebuild_indexes()
+            for pk, obj in self._storage.items():
+                self._track(pk, obj)
+            self._make_room()
+
+        if self._shared:
+            # other workers change the rows too, the storage reports every change to keep indexes current
+            self._storage.bind(on_change=self._on_shared_change, on_reload=self._rebuild_indexes)
+            self._storage.refresh()
+
+    @property
+    def pk_name(self) -> str:
+        return self._pk_name
+
+    @property
+    def schema(self) -> Type[BaseModel]:
+        return self._schema
+
+    @property
+    def type_pk(self) -> Type[int]:
+        return int
+
+    @property
+    def relations(self) -> dict[str, tuple[str, str, Type[BaseModel]]]:
+        relations = {}
+        for schema_name, schema in _inmemory_schemas.items():
+            relationship = schema_name.replace('Schema', '').lower()
+            if relationship + '_id' in self._schema.model_fields:
+                relations[relationship] = (relationship + '_id', relationship, schema)
+        return relations
+
+    @property
+    def indexes(self) -> list[str]:
+        return list(self._indexes)
+
+    @property
+    def sorted_indexes(self) -> list[str]:
+        return list(self._sorted_indexes)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Cache counters: get_one hits and misses, evictions, expirations, current entries and bytes."""
+        return {**self._stats, "entries": len(self._storage), "bytes": self._bytes}
+
+    def expire(self) -> int:
+        """Removes every row whose ttl has passed, returns how many were removed."""
+        if self._ttl is None:
+            return 0
+
+        now = time.monotonic()
+        expired = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, pk = heappop(self._expiry_heap)
+            # updates push a new deadline, the old heap entry is stale then
+            if self._expires.get(pk) != expires_at:
+                continue
+
+            obj = self._storage.get(pk)
+            if obj is not None:
+                self._remove(pk, obj)
+                expired += 1
+
+        self._stats["expirations"] += expired
+        return expired
+
+    def _start_sweeper(self) -> None:
+        if self._expire_interval is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # a sweeper left on a finished or closed loop is dead, the running loop gets a new one
+        if self._sweeper is not None and not self._sweeper.done() and self._sweeper.get_loop() is loop:
+            return
+        self._sweeper = loop.create_task(self._sweep())
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(self._expire_interval)  # type: ignore
+            self.expire()
+
+    def snapshot(self) -> None:
+        """Writes a snapshot of a persistent connector right away and waits for it."""
+        if self._journal is not None:
+            self._journal.snapshot(wait=True)
+
+    def close(self) -> None:
+        """Flushes the log of a persistent connector to disk, detaches a shared one from its file."""
+        if self._sweeper is not None:
+            if not self._sweeper.get_loop().is_closed():
+                self._sweeper.cancel()
+            self._sweeper = None
+        if self._journal is not None:
+            self._journal.close()
+        if self._shared:
+            self._storage.close()
+
+    def add_index(self, field: str, sorted: bool = False) -> None:
+        """Builds a hash index, or a sorted one, over the rows already stored and keeps it from then on"""
+        self._check_field(field)
+        if sorted:
+            index: HashIndex | SortedIndex = self._sorted_indexes.setdefault(field, SortedIndex(field))
+        else:
+            index = self._indexes.setdefault(field, HashIndex(field))
+        index.rebuild(self._storage.items())
+
+    async def has_index(self, field: str, sorted: bool = False) -> bool:
+        if field == self._pk_name or field in self._sorted_indexes:
+            return True
+        return not sorted and field in self._indexes
+
+    async def ensure_index(self, field: str, sorted: bool = False) -> IndexChange | None:
+        if await self.has_index(field, sorted):
+            return None
+        self.add_index(field, sorted)
+        kind = "sorted" if sorted else "hash"
+        return IndexChange(field, True, f"{kind} index on {self._schema.__name__}.{field}")
+
+    def _check_field(self, field: str) -> None:
+        if field not in self._schema.model_fields:
+            raise ValueError(f"Cannot index unknown field '{field}' of {self._schema.__name__}")
+
+    def _coerce_pk(self, obj_id: str | int | None) -> int | None:
+        """Path parameters arrive as strings, rows are keyed by int"""
+        try:
+            return self.type_pk(obj_id)  # type: ignore
+        except (TypeError, ValueError):
+            return None
+
+    def _get_next_id(self) -> int:
+        if self._shared:
+            return self._storage.allocate_id()
+
+        id_ = self._id
+        self._id += 1
+
+        return id_
+
+    def _index(self, pk: Any, obj: dict[str, Any]) -> None:
+        for index in self._indexes.values():
+            index.add(pk, obj)
+        for sorted_index in self._sorted_indexes.values():
+            sorted_index.add(pk, obj)
+
+    def _unindex(self, pk: Any, obj: dict[str, Any]) -> None:
+        for index in self._indexes.values():
+            index.remove(pk, obj)
+        for sorted_index in self._sorted_indexes.values():
+            sorted_index.remove(pk, obj)
+
+    def _rebuild_indexes(self) -> None:
+        for index in [*self._indexes.values(), *self._sorted_indexes.values()]:
+            index.rebuild(self._storage.items())
+
+    def _on_shared_change(self, pk: Any, old: dict[str, Any] | None, new: dict[str, Any] | None) -> None:
+        if old is not None:
+            self._unindex(pk, old)
+        if new is not None:
+            self._index(pk, new)
+
+    def _refresh(self) -> None:
+        """Brings the local state up to date before an operation: remote changes, expired rows."""
+        if self._shared:
+            self._storage.refresh()
+        if self._ttl is not None:
+            self._start_sweeper()
+            self.expire()
+
+    def _track(self, pk: Any, obj: dict[str, Any]) -> None:
+        if self._policy is not None:
+            self._policy.add(pk)
+
+        if self._max_bytes is not None:
+            size = row_size(obj)
+            self._bytes += size - self._sizes.get(pk, 0)
+            self._sizes[pk] = size
+
+        if self._ttl is not None:
+            expires_at = time.monotonic() + self._ttl
+            self._expires[pk] = expires_at
+            heappush(self._expiry_heap, (expires_at, pk))
+
+    def _untrack(self, pk: Any) -> None:
+        if self._policy is not None:
+            self._policy.remove(pk)
+        self._bytes -= self._sizes.pop(pk, 0)
+        self._expires.pop(pk, None)
+
+    def _touch(self, pk: Any) -> None:
+        if self._policy is not None:
+            self._policy.touch(pk)
+
+    def _make_room(self, rows: int = 0, size: int = 0, keep: Any = None) -> None:
+        """Evicts rows until `rows` more rows of `size` bytes fit into the limits."""
+        if self._policy is None:
+            return
+
+        while (
+                (self._max_entries is not None and len(self._storage) + rows > self._max_entries) or
+                (self._max_bytes is not None and self._bytes + size > self._max_bytes)
+        ):
+            # the row being written stays, the next row in line goes instead
+            pk = self._policy.victim(skip=keep)
+            if pk is None:
+                break
+
+            self._remove(pk, self._storage[pk])
+            self._stats["evictions"] += 1
+
+    def _put(self, pk: Any, obj: dict[str, Any], old: dict[str, Any] | None = None) -> None:
+        if self._journal is not None:
+            self._journal.put(pk, obj)
+
+        if self._shared:
+            self._storage[pk] = obj
+            return
+
+        if old is not None:
+            self._unindex(pk, old)
+        self._storage[pk] = obj
+        self._index(pk, obj)
+        self._track(pk, obj)
+
+    def _remove(self, pk: Any, old: dict[str, Any]) -> None:
+        if self._journal is not None:
+            self._journal.delete(pk)
+
+        del self._storage[pk]
+        if not self._shared:
+            self._unindex(pk, old)
+            self._untrack(pk)
+
+    def _filter_candidates(
+            self,
+            filters: dict[str, Any] | None
+    ) -> tuple[Iterable[Any] | None, list[tuple[str, str, Any]]]:
+        """Picks the narrowest index lookup for the filters.
+
+        Equality, `in` and `isnull` filters are served by a hash index, range, prefix and equality
+        filters by a sorted one. Returns the candidate primary keys (None when no filter is indexed, meaning
+        a full scan) and the parsed filters that still have to be checked against each candidate.
+        """
+        if not filters:
+            return None, []
+
+        parsed = parse_filters(filters)
+        best: tuple[int, int, Any] | None = None  # (candidates, position in parsed, lookup)
+        for position, (field, operator, operand) in enumerate(parsed):
+            index = self._indexes.get(field)
+            if index is not None and operator in ("eq", "in", "isnull"):
+                if operator == "isnull":
+                    if not operand:
+                        continue
+                    operand, operator = None, "eq"
+                values = [operand] if operator == "eq" else list(dict.fromkeys(operand))
+                size = sum(index.size(value) for value in values)
+                lookup = (index, values)
+            elif field in self._sorted_indexes and (
+                    operator in RANGE_OPERATORS or operator == "prefix" or (operator == "eq" and operand is not None)
+            ):
+                start, stop = self._sorted_indexes[field].bounds(operator, operand)
+                size = stop - start
+                lookup = (self._sorted_indexes[field], (start, stop))
+            else:
+                continue
+
+            if best is None or size < best[0]:
+                best = (size, position, lookup)
+
+        if best is None:
+            return None, parsed
+
+        _, position, (index, arguments) = best
+        field, operator, _ = parsed[position]
+        # prefix bounds are not exact for every string, the prefix is checked again
+        rest = [item for i, item in enumerate(parsed) if i != position or operator == "prefix"]
+
+        if isinstance(index, SortedIndex):
+            # rows keep the storage order, which is the primary key order
+            return sorted(index.slice_pks(*arguments)), rest
+        if len(arguments) == 1:
+            return index.lookup(arguments[0]), rest
+        return sorted(pk for value in arguments for pk in index.lookup(value)), rest
+
+    def _iter_filtered(self, filters: dict[str, Any] | None) -> Iterable[dict[str, Any]]:
+        candidates, rest = self._filter_candidates(filters)
+
+        if candidates is None:
+            # plain equality goes down to the storage, which can vectorize it
+            equal = {field: operand for field, operator, operand in rest if operator == "eq"}
+            rest = [item for item in rest if item[1] != "eq"]
+            for obj in self._storage.select(equal):
+                if match_row(obj, rest):
+                    yield obj
+            return
+
+        for pk in candidates:
+            obj = self._storage[pk]
+            if match_row(obj, rest):
+                yield obj
+
+    def _iter_sorted(
+            self,
+            filters: dict[str, Any] | None,
+            field: str,
+            desc: bool,
+            after: tuple[tuple[bool, Any], Any] | None = None
+    ) -> Iterable[dict[str, Any]]:
+        storage = self._storage
+        pk_name = self._pk_name
+        candidates, rest = self._filter_candidates(filters)
+
+        def entry(obj: dict[str, Any]) -> tuple[tuple[bool, Any], Any]:
+            return sort_key(obj.get(field)), obj[pk_name]
+
+        if candidates is not None:
+            # an index bucket is usually far smaller than the table, sorting it is cheaper than a walk
+            objs = sorted((storage[pk] for pk in candidates), key=entry, reverse=desc)
+        elif field in self._sorted_indexes:
+            objs = (storage[pk] for pk in self._sorted_indexes[field].iter_pks(desc, after))
+            after = None
+        elif field == pk_name:
+            objs = (storage[pk] for pk in reversed(storage)) if desc else storage.values()
+        else:
+            objs = sorted(storage.values(), key=entry, reverse=desc)
+
+        if after is not None:
+            objs = dropwhile((lambda obj: entry(obj) >= after) if desc else (lambda obj: entry(obj) <= after), objs)
+
+        for obj in objs:
+            if match_row(obj, rest):
+                yield obj
+
+    async def create_one(self, obj: dict[str, Any]) -> dict[str, Any]:
+        self._start_sweeper()
+        id = self._get_next_id()
+        obj_with_id = {**obj, 'id': id}
+        self._make_room(1, row_size(obj_with_id) if self._max_bytes is not None else 0)
+        self._put(id, obj_with_id)
+        return obj_with_id
+
+    async def count(self, filters: dict[str, Any] | None = None) -> int:
+        self._refresh()
+        candidates, rest = self._filter_candidates(filters)
+        if candidates is None and all(operator == "eq" for _, operator, _ in rest):
+            return self._storage.count({field: operand for field, _, operand in rest})
+        if candidates is not None and not rest:
+            return len(candidates)  # type: ignore
+
+        return sum(1 for _ in self._iter_filtered(filters))
+
+    async def count_by(self, field: str) -> dict[Any, int]:
+        self._refresh()
+        index = self._indexes.get(field)
+        if index is not None:
+            return index.counts()
+        return dict(Counter(value for obj in self._storage.values() if (value := obj.get(field)) is not None))
+
+    async def count_capped(self, filters: dict[str, Any] | None = None, cap: int = 1000) -> int:
+        self._refresh()
+        if not filters:
+            return min(len(self._storage), cap)
+        return sum(1 for _ in islice(self._iter_filtered(filters), cap))
+
+    def _populate_plan(self, populate: list[str]) -> list[tuple[str, str, str]]:
+        key = tuple(populate)
+        plan = self._populate_plans.get(key)
+        if plan is None:
+            relations = self.relations
+            plan = []
+            for relationship in populate:
+                if relationship in relations:
+                    parent_fk, _, parent_schema = relations[relationship]
+                    plan.append((parent_schema.__name__, parent_fk, relationship))
+            # a parent connector created later may resolve the missing keys
+            if len(plan) == len(populate):
+                self._populate_plans[key] = plan
+        return plan
+
+    def _populate(self, objs: list[dict[str, Any]], populate: list[str] | None) -> list[dict[str, Any]]:
+        """Nests parent rows under their relationship field, one lookup per distinct key of the page.
+
+        Returns copies, stored rows are never modified.
+        """
+        plan = self._populate_plan(populate) if populate else []
+        if not plan:
+            return objs
+
+        objs = [dict(obj) for obj in objs]
+        for schema_name, parent_fk, relationship in plan:
+            parent_storage = _inmemory_storage.get(schema_name, {})
+            parents: dict[Any, dict[str, Any] | None] = {}
+            for obj in objs:
+                fk_value = obj.get(parent_fk)
+                if fk_value not in parents:
+                    parent = parent_storage.get(fk_value)
+                    parents[fk_value] = dict(parent) if parent is not None else None
+                obj[relationship] = parents[fk_value]
+
+        return objs
+
+    def _project(
+            self,
+            objs: list[dict[str, Any]],
+            fields: list[str] | None,
+            populate: list[str] | None
+    ) -> list[dict[str, Any]]:
+        if not fields:
+            return objs
+
+        keys = {self._pk_name, *fields}
+        if populate:
+            keys.update(relationship for _, _, relationship in self._populate_plan(populate))
+        return [{key: value for key, value in obj.items() if key in keys} for obj in objs]
+
+    async def get_one(
+            self,
+            obj_id: str | int,
+            filters: dict[str, Any] | None = None,
+            populate: list[str] | None = None,
+            fields: list[str] | None = None
+    ) -> dict[str, Any] | None:
+        self._refresh()
+        obj_id = self._coerce_pk(obj_id)
+        obj = self._storage.get(obj_id)
+        if obj is not None:
+            if filters:
+                matches_filters = match_row(obj, parse_filters(filters))
+                if not matches_filters:
+                    return None
+
+            self._stats["hits"] += 1
+            self._touch(obj_id)
+            return self._project(self._populate([obj], populate), fields, populate)[0]
+
+        self._stats["misses"] += 1
+        return None
+
+    async def get_many(
+            self,
+            skip: int,
+            limit: int,
+            filters: dict[str, Any] | None = None,
+            populate: list[str] | None = None,
+            sorting: tuple[str, bool] | None = None,
+            cursor: tuple[Any, Any] | None = None,
+            fields: list[str] | None = None
+    ) -> list[dict[str, Any]]:
+        self._refresh()
+        sort_field, sort_desc = sorting if sorting is not None else (None, None)
+
+        after = None
+        if cursor is not None:
+            if sort_field is None:
+                # keyset pages follow the primary key unless another order is requested
+                sort_field, sort_desc = self._pk_name, False
+            sort_value, pk = cursor
+            after = (sort_key(sort_value), pk)
+
+        if sort_field is None:
+            objs = self._iter_filtered(filters)
+        elif after is not None:
+            # with a sorted index on the field, the page starts with a bisect instead of a walk
+            objs = self._iter_sorted(filters, sort_field, bool(sort_desc), after)
+        elif not filters and sort_field in self._sorted_indexes:
+            page = self._sorted_indexes[sort_field].page(skip, limit, bool(sort_desc))
+            objs = (self._storage[pk] for pk in page)
+            skip = 0
+        else:
+            objs = self._iter_sorted(filters, sort_field, bool(sort_desc))
+
+        # the scan stops as soon as the page is full, populate only touches returned rows
+        page = list(islice(objs, skip, skip + limit))
+        if self._policy is not None:
+            for obj in page:
+                self._touch(obj[self._pk_name])
+        return self._project(self._populate(page, populate), fields, populate)
+
+    async def iter_many(
+            self,
+            filters: dict[str, Any] | None = None,
+            sorting: tuple[str, bool] | None = None,
+            fields: list[str] | None = None,
+            batch_size: int = 1000
+    ) -> AsyncIterator[dict[str, Any]]:
+        self._refresh()
+        sort_field, sort_desc = sorting if sorting is not None else (None, None)
+        if sort_field is None:
+            objs = self._iter_filtered(filters)
+        else:
+            objs = self._iter_sorted(filters, sort_field, bool(sort_desc))
+
+        # only primary keys are collected up front, so writes while the export is consumed
+        # don't break the walk; rows deleted in between are skipped
+        pks = [obj[self._pk_name] for obj in objs]
+        for start in range(0, len(pks), batch_size):
+            batch = [self._storage.get(pk) for pk in pks[start:start + batch_size]]
+            for obj in self._project([dict(obj) for obj in batch if obj is not None], fields, None):
+                yield obj
+
+    async def update_one(
+            self, obj_id: str | int,
+            obj: dict[str, Any],
+            filters: dict[str, Any] | None = None
+    ) -> dict[str, Any] | None:
+        return (await self.update_one_with_old(obj_id, obj, filters))[1]
+
+    async def update_one_with_old(
+            self, obj_id: str | int,
+            obj: dict[str, Any],
+            filters: dict[str, Any] | None = None
+    ) -> tuple[dict[str, Any] | None, dict[str, Any] | None]:
+        self._refresh()
+        obj_id = self._coerce_pk(obj_id)
+        if obj_id is None:
+            return None, None
+
+        parsed = parse_filters(filters) if filters else []
+        updated_fields = {key: value for key, value in obj.items() if key != "id"}
+
+        def change(update_obj: dict[str, Any]) -> dict[str, Any] | None:
+            if parsed and not match_row(update_obj, parsed):
+                return None
+            if not updated_fields:
+                return update_obj
+            # rows are replaced rather than patched, storages may hand out copies
+            return {**update_obj, **updated_fields, "id": obj_id}
+
+        if self._shared:
+            # checked and written under the lock of the file, a row deleted by another worker stays deleted
+            return self._storage.update_row(obj_id, change)
+
+        update_obj = self._storage.get(obj_id)
+        if update_obj is None:
+            return None, None
+        updated_obj = change(update_obj)
+        if updated_obj is not None and updated_obj is not update_obj:
+            self._put(obj_id, updated_obj, update_obj)
+            self._make_room(keep=obj_id)
+        return update_obj, updated_obj
+
+    async def exists(self, obj_id: str | int) -> bool:
+        self._refresh()
+        obj_id = self._coerce_pk(obj_id)
+        return obj_id is not None and obj_id in self._storage
+
+    async def delete_one(self, obj_id: str | int, filters: dict[str, Any] | None = None) -> dict[str, Any] | None:
+        """Returns the deleted row, None when no row matches"""
+        self._refresh()
+        obj_id = self._coerce_pk(obj_id)
+        parsed = parse_filters(filters) if filters else []
+
+        if self._shared:
+            check = (lambda obj: match_row(obj, parsed)) if parsed else None
+            return self._storage.delete_row(obj_id, check) if obj_id is not None else None
+
+        obj = self._storage.get(obj_id)
+        if obj is None or (parsed and not match_row(obj, parsed)):
+            return None
+        self._remove(obj_id, obj)
+        return obj
@@ -0,0 +1,102 @@
+import sys
+from collections import OrderedDict
+from typing import Any
+
+
+EVICTION_POLICIES = ("lru", "lfu")
+
+
+class LRUPolicy:
+    """Evicts the row that was accessed least recently."""
+
+    def __init__(self) -> None:
+        self._order: OrderedDict[Any, None] = OrderedDict()
+
+    def add(self, pk: Any) -> None:
+        self._order[pk] = None
+        self._order.move_to_end(pk)
+
+    def touch(self, pk: Any) -> None:
+        if pk in self._order:
+            self._order.move_to_end(pk)
+
+    def remove(self, pk: Any) -> None:
+        self._order.pop(pk, None)
+
+    def victim(self, skip: Any = None) -> Any:
+        """The least recently accessed row other than `skip`, None when there is none"""
+        for pk in self._order:
+            if pk != skip:
+                return pk
+        return None
+
+
+class LFUPolicy:
+    """Evicts the row that was accessed least often, the least recent one among equals.
+
+    Rows are kept in per-frequency buckets, so every operation is O(1).
+    """
+
+    def __init__(self) -> None:
+        self._frequencies: dict[Any, int] = {}
+        self._buckets: dict[int, dict[Any, None]] = {}
+        self._min_frequency = 0
+
+    def _unlink(self, pk: Any, frequency: int) -> None:
+        bucket = self._buckets[frequency]
+        del bucket[pk]
+        if not bucket:
+            del self._buckets[frequency]
+
+    def add(self, pk: Any) -> None:
+        if pk in self._frequencies:
+            self.touch(pk)
+            return
+
+        self._frequencies[pk] = 1
+        self._buckets.setdefault(1, {})[pk] = None
+        self._min_frequency = 1
+
+    def touch(self, pk: Any) -> None:
+        frequency = self._frequencies.get(pk)
+        if frequency is None:
+            return
+
+        self._unlink(pk, frequency)
+        if self._min_frequency == frequency and frequency not in self._buckets:
+            self._min_frequency = frequency + 1
+
+        self._frequencies[pk] = frequency + 1
+        self._buckets.setdefault(frequency + 1, {})[pk] = None
+
+    def remove(self, pk: Any) -> None:
+        frequency = self._frequencies.pop(pk, None)
+        if frequency is not None:
+            self._unlink(pk, frequency)
+
+    def victim(self, skip: Any = None) -> Any:
+        """The least often accessed row other than `skip`, None when there is none"""
+        if not self._buckets:
+            return None
+        if self._min_frequency not in self._buckets:
+            self._min_frequency = min(self._buckets)
+        for pk in self._buckets[self._min_frequency]:
+            if pk != skip:
+                return pk
+
+        # `skip` is alone in the lowest bucket, the next lowest one holds the victim
+        frequencies = [frequency for frequency in self._buckets if frequency != self._min_frequency]
+        return next(iter(self._buckets[min(frequencies)])) if frequencies else None
+
+
+def build_policy(eviction: str) -> LRUPolicy | LFUPolicy:
+    if eviction == "lru":
+        return LRUPolicy()
+    if eviction == "lfu":
+        return LFUPolicy()
+    raise ValueError(f"Unknown eviction policy '{eviction}', expected one of {EVICTION_POLICIES}")
+
+
+def row_size(row: dict[str, Any]) -> int:
+    """Approximate memory taken by a row: the dict itself plus its values, keys are shared."""
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
@@ -0,0 +1,141 @@
+import sys
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Iterable, Iterator
+
+
+class HashIndex:
+    """Equality index over one field: value -> primary keys of the rows holding it.
+
+    Buckets are sorted lists of primary keys, kept in order with bisect, so a lookup yields
+    rows in the order a scan would. Indexed fields must hold hashable values.
+    """
+
+    def __init__(self, field: str) -> None:
+        self.field = field
+        self._buckets: dict[Any, list[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def add(self, pk: Any, row: dict[str, Any]) -> None:
+        bucket = self._buckets.setdefault(row.get(self.field), [])
+        if not bucket or bucket[-1] < pk:
+            bucket.append(pk)
+        else:
+            # an updated row moved back into the bucket, it is put back in its place
+            insort(bucket, pk)
+
+    def remove(self, pk: Any, row: dict[str, Any]) -> None:
+        value = row.get(self.field)
+        bucket = self._buckets.get(value)
+        if bucket is None:
+            return
+
+        position = bisect_left(bucket, pk)
+        if position < len(bucket) and bucket[position] == pk:
+            del bucket[position]
+        if not bucket:
+            del self._buckets[value]
+
+    def lookup(self, value: Any) -> Iterable[Any]:
+        return self._buckets.get(value, ())
+
+    def size(self, value: Any) -> int:
+        bucket = self._buckets.get(value)
+        return len(bucket) if bucket is not None else 0
+
+    def counts(self) -> dict[Any, int]:
+        """Rows per indexed value, None left out"""
+        return {value: len(bucket) for value, bucket in self._buckets.items() if value is not None}
+
+    def rebuild(self, rows: Iterable[tuple[Any, dict[str, Any]]]) -> None:
+        self._buckets = {}
+        for pk, row in rows:
+            self.add(pk, row)
+
+
+def sort_key(value: Any) -> tuple[bool, Any]:
+    """Makes values of one field comparable with each other, None sorts after everything else."""
+    return (True, 0) if value is None else (False, value)
+
+
+def _entry_value(entry: tuple[tuple[bool, Any], Any]) -> tuple[bool, Any]:
+    return entry[0]
+
+
+class SortedIndex:
+    """Ordered index over one field, kept as a sorted list of (sort_key(value), pk) entries.
+
+    Inserts and removals are bisect-based, a page at any offset is a plain list slice.
+    """
+
+    def __init__(self, field: str) -> None:
+        self.field = field
+        self._entries: list[tuple[tuple[bool, Any], Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry(self, pk: Any, row: dict[str, Any]) -> tuple[tuple[bool, Any], Any]:
+        return sort_key(row.get(self.field)), pk
+
+    def add(self, pk: Any, row: dict[str, Any]) -> None:
+        insort(self._entries, self._entry(pk, row))
+
+    def remove(self, pk: Any, row: dict[str, Any]) -> None:
+        entry = self._entry(pk, row)
+        position = bisect_left(self._entries, entry)
+        if position < len(self._entries) and self._entries[position] == entry:
+            del self._entries[position]
+
+    def iter_pks(self, desc: bool = False, after: tuple[tuple[bool, Any], Any] | None = None) -> Iterator[Any]:
+        """Primary keys in index order, starting right past the `after` entry when it is given."""
+        entries = self._entries
+        if after is None:
+            start, stop = 0, len(entries)
+        elif desc:
+            start, stop = 0, bisect_left(entries, after)
+        else:
+            start, stop = bisect_right(entries, after), len(entries)
+
+        positions = range(stop - 1, start - 1, -1) if desc else range(start, stop)
+        return (entries[position][1] for position in positions)
+
+    def bounds(self, operator: str, operand: Any) -> tuple[int, int]:
+        """Positions of the entries matching an equality, range or prefix filter, None values never match."""
+        entries = self._entries
+        start, stop = 0, bisect_left(entries, (True, 0), key=_entry_value)
+        value = (False, operand)
+
+        if operator == "eq":
+            start = bisect_left(entries, value, key=_entry_value)
+            stop = bisect_right(entries, value, key=_entry_value)
+        elif operator == "gt":
+            start = bisect_right(entries, value, key=_entry_value)
+        elif operator == "gte":
+            start = bisect_left(entries, value, key=_entry_value)
+        elif operator == "lt":
+            stop = bisect_left(entries, value, key=_entry_value)
+        elif operator == "lte":
+            stop = bisect_right(entries, value, key=_entry_value)
+        elif operator == "prefix":
+            start = bisect_left(entries, value, key=_entry_value)
+            if operand and ord(operand[-1]) < sys.maxunicode:
+                # the first string past every string with the prefix
+                upper = (False, operand[:-1] + chr(ord(operand[-1]) + 1))
+                stop = bisect_left(entries, upper, key=_entry_value)
+        return start, max(start, stop)
+
+    def slice_pks(self, start: int, stop: int) -> list[Any]:
+        return [pk for _, pk in self._entries[start:stop]]
+
+    def page(self, skip: int, limit: int, desc: bool = False) -> list[Any]:
+        if desc:
+            stop = len(self._entries) - skip
+            entries = self._entries[max(stop - limit, 0):max(stop, 0)][::-1]
+        else:
+            entries = self._entries[skip:skip + limit]
+        return [pk for _, pk in entries]
+
+    def rebuild(self, rows: Iterable[tuple[Any, dict[str, Any]]]) -> None:
+        self._entries = sorted(self._entry(pk, row) for pk, row in rows)
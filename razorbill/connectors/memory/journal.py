@@ -0,0 +1,282 @@
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from collections.abc import MutableMapping
+from typing import Any, BinaryIO, Callable, Iterator
+
+
+FSYNC_POLICIES = ("always", "batch", "none")
+
+_RECORD_HEADER = struct.Struct("<II")  # payload length, crc32 of the payload
+_SNAPSHOT_MAGIC = b"RZBS"
+_SNAPSHOT_HEADER = struct.Struct("<4sQ")  # magic, generation of the first log not covered by the snapshot
+
+PUT = 0
+DELETE = 1
+
+
+def _pickle_record(record: tuple[int, Any, dict[str, Any] | None]) -> bytes:
+    return pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def encode_record(
+        op: int,
+        pk: Any,
+        row: dict[str, Any] | None,
+        dumps: Callable[[tuple[int, Any, Any]], bytes] = _pickle_record
+) -> bytes:
+    payload = dumps((op, pk, row))
+    return _RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_records(
+        buffer: Any,
+        offset: int = 0,
+        end: int | None = None,
+        loads: Callable[[Any], tuple[int, Any, Any]] = pickle.loads
+) -> Iterator[tuple[tuple[int, Any, Any], int]]:
+    """Yields ((op, pk, row), next offset) pairs, stops at the first truncated or corrupted record."""
+    view = memoryview(buffer)[:end]
+
+    try:
+        while offset + _RECORD_HEADER.size <= len(view):
+            length, crc = _RECORD_HEADER.unpack_from(view, offset)
+            start = offset + _RECORD_HEADER.size
+            payload = view[start:start + length]
+
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+
+            offset = start + length
+            yield loads(payload), offset
+    finally:
+        view.release()
+
+
+def _map_file(path: str) -> mmap.mmap | None:
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class Journal:
+    """Durable state of one MemoryConnector: an append-only log of mutations plus periodic snapshots.
+
+    Files live in `directory` and are prefixed with `name`: `<name>.snapshot` and `<name>.log.<gen>`.
+    Every `snapshot_every` records the log is rotated and a background thread compacts the previous
+    snapshot and the rotated logs into a new snapshot, after which the logs it covers are removed.
+    The storage itself is never copied, so writes do not wait for the compaction. Startup maps the
+    snapshot and the remaining logs into memory and replays them.
+
+    fsync policies: "always" syncs every record, "batch" syncs every `fsync_batch_size` records and
+    at most `fsync_interval` seconds after a record is written, "none" leaves flushing to the OS.
+    """
+
+    def __init__(
+            self,
+            directory: str,
+            name: str,
+            storage: MutableMapping,
+            fsync: str = "batch",
+            fsync_batch_size: int = 1000,
+            fsync_interval: float = 1.0,
+            snapshot_every: int = 100_000
+    ) -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}', expected one of {FSYNC_POLICIES}")
+
+        os.makedirs(directory, exist_ok=True)
+        self._prefix = os.path.join(directory, name)
+        self._storage = storage
+        self._fsync = fsync
+        self._fsync_batch_size = fsync_batch_size
+        self._fsync_interval = fsync_interval
+        self._snapshot_every = snapshot_every
+
+        self._generation = 0
+        self._log: BinaryIO | None = None
+        self._records = 0
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._sync_timer: threading.Timer | None = None
+        # the log is written by the event loop and synced by the timer thread
+        self._lock = threading.RLock()
+        self._compaction: threading.Thread | None = None
+        self._last_pk: Any = None
+
+    @property
+    def last_pk(self) -> Any:
+        """The highest primary key ever written, deleted rows included, so ids are never reused."""
+        return self._last_pk
+
+    def _see_pk(self, pk: Any) -> None:
+        if self._last_pk is None or pk > self._last_pk:
+            self._last_pk = pk
+
+    def _log_path(self, generation: int) -> str:
+        return f"{self._prefix}.log.{generation}"
+
+    def _log_generations(self) -> list[int]:
+        directory, name = os.path.split(self._prefix)
+        generations = []
+        for file_name in os.listdir(directory):
+            if file_name.startswith(name + ".log."):
+                suffix = file_name[len(name) + 5:]
+                if suffix.isdigit():
+                    generations.append(int(suffix))
+        return sorted(generations)
+
+    def _read_state(self, until: int | None = None) -> tuple[Any, dict[Any, dict[str, Any]], int]:
+        """The last pk and rows of the snapshot replayed with the logs before generation `until`.
+
+        Returns them with the first generation the snapshot does not cover.
+        """
+        last_pk, state, first_generation = None, {}, 0
+        snapshot = self._prefix + ".snapshot"
+
+        if os.path.exists(snapshot):
+            buffer = _map_file(snapshot)
+            if buffer is not None:
+                with buffer:
+                    magic, first_generation = _SNAPSHOT_HEADER.unpack_from(buffer)
+                    if magic != _SNAPSHOT_MAGIC:
+                        raise ValueError(f"{snapshot} is not a snapshot file")
+                    with memoryview(buffer)[_SNAPSHOT_HEADER.size:] as view:
+                        last_pk, state = pickle.loads(view)
+
+        for generation in self._log_generations():
+            if generation < first_generation or (until is not None and generation >= until):
+                continue
+
+            buffer = _map_file(self._log_path(generation))
+            if buffer is None:
+                continue
+            with buffer:
+                for (op, pk, row), _ in read_records(buffer):
+                    if op == PUT:
+                        if last_pk is None or pk > last_pk:
+                            last_pk = pk
+                        state[pk] = row
+                    else:
+                        state.pop(pk, None)
+
+        return last_pk, state, first_generation
+
+    def load(self) -> None:
+        """Fills the storage from the snapshot and the logs, then opens a fresh log for writing."""
+        self._last_pk, state, first_generation = self._read_state()
+        self._storage.update(state)
+
+        generations = self._log_generations()
+        for generation in generations:
+            if generation < first_generation:
+                os.remove(self._log_path(generation))
+
+        self._generation = max(generations + [first_generation]) + 1
+        self._log = open(self._log_path(self._generation), "ab")
+
+    def _append(self, op: int, pk: Any, row: dict[str, Any] | None) -> None:
+        # checked before writing, so the rotated log is complete once the record goes to the new one
+        if self._records >= self._snapshot_every:
+            self.snapshot()
+
+        with self._lock:
+            self._log.write(encode_record(op, pk, row))  # type: ignore
+            self._unsynced += 1
+            self._records += 1
+
+            if self._fsync == "always":
+                self.sync()
+            elif self._fsync == "batch":
+                if (
+                        self._unsynced >= self._fsync_batch_size or
+                        time.monotonic() - self._synced_at >= self._fsync_interval
+                ):
+                    self.sync()
+                elif self._sync_timer is None:
+                    # the last records of a burst are synced even when no write follows them
+                    self._sync_timer = threading.Timer(self._fsync_interval, self._timed_sync)
+                    self._sync_timer.daemon = True
+                    self._sync_timer.start()
+
+    def _timed_sync(self) -> None:
+        with self._lock:
+            self._sync_timer = None
+            if self._unsynced:
+                self.sync()
+
+    def put(self, pk: Any, row: dict[str, Any]) -> None:
+        self._append(PUT, pk, row)
+        self._see_pk(pk)
+
+    def delete(self, pk: Any) -> None:
+        self._append(DELETE, pk, None)
+
+    def sync(self) -> None:
+        with self._lock:
+            if self._log is None:
+                return
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._unsynced = 0
+            self._synced_at = time.monotonic()
+
+    def snapshot(self, wait: bool = False) -> None:
+        """Rotates the log and compacts the rotated logs into the snapshot in a background thread."""
+        if self._compaction is not None and self._compaction.is_alive():
+            if not wait:
+                return
+            self._compaction.join()
+
+        with self._lock:
+            self.sync()
+            self._log.close()  # type: ignore
+            self._generation += 1
+            self._log = open(self._log_path(self._generation), "ab")
+            self._records = 0
+
+        self._compaction = threading.Thread(target=self._write_snapshot, args=(self._generation,), daemon=True)
+        self._compaction.start()
+
+        if wait:
+            self._compaction.join()
+
+    def _write_snapshot(self, generation: int) -> None:
+        path = self._prefix + ".snapshot"
+        tmp_path = path + ".tmp"
+        # the rotated logs are closed and synced, only the thread reads them
+        last_pk, state, _ = self._read_state(until=generation)
+
+        with open(tmp_path, "wb") as file:
+            file.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, generation))
+            pickle.dump((last_pk, state), file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(tmp_path, path)
+        directory = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+        for old_generation in self._log_generations():
+            if old_generation < generation:
+                os.remove(self._log_path(old_generation))
+
+    def close(self) -> None:
+        if self._compaction is not None:
+            self._compaction.join()
+        with self._lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            if self._log is not None:
+                self.sync()
+                self._log.close()
+                self._log = None
@@ -0,0 +1,256 @@
+import fcntl
+import mmap
+import os
+import struct
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+from razorbill.connectors.memory.journal import DELETE, PUT, encode_record, read_records
+from razorbill.connectors.memory.storage import DictStorage
+from razorbill.schema import build_serialization_schema
+
+
+_MAGIC = b"RZBM"
+_VERSION = 2
+# magic, version, generation, next id, end of the written records
+_HEADER = struct.Struct("<4sIQQQ")
+_HEADER_SIZE = 64
+_INITIAL_CAPACITY = 1 << 20
+_COMPACT_MIN_GARBAGE = 1 << 20
+
+
+class SharedStorage(MutableMapping):
+    """Row store shared by every process on the host through one memory-mapped file.
+
+    The file is a header followed by a log of (op, pk, row) records, the same format as the
+    Journal. Each process keeps its own dict of rows and replays records other processes
+    appended before every operation, under a shared flock. Writes and id allocation take an
+    exclusive flock, so ids never collide across workers. Once most of the log is superseded
+    records, the writer rewrites it in place and bumps the generation, which makes the other
+    processes reload from the start.
+
+    Records are JSON validated back through `schema`, never pickle, so a process only ever reads
+    data from the file. The file is created readable by its owner only, and one that is a link,
+    belongs to another user or can be written by others is refused.
+
+    `on_change(pk, old_row, new_row)` is called for every row that changes, whichever process
+    changed it, and `on_reload()` after the local state was rebuilt from scratch.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            schema: Type[BaseModel],
+            on_change: Callable[[Any, dict | None, dict | None], None] | None = None,
+            on_reload: Callable[[], None] | None = None
+    ) -> None:
+        record = TypeAdapter(tuple[int, Any, build_serialization_schema(schema) | None])  # type: ignore
+        self._dumps = record.dump_json
+        self._loads = lambda payload: record.validate_json(bytes(payload))
+        self._on_change = on_change
+        self._on_reload = on_reload
+        self._rows = DictStorage()
+        self._sizes: dict[Any, int] = {}
+        self._live_bytes = 0
+        self._generation = -1
+        self._offset = _HEADER_SIZE
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW | os.O_CLOEXEC, 0o600)
+        info = os.fstat(self._fd)
+        if info.st_uid != os.getuid() or info.st_mode & 0o022:
+            os.close(self._fd)
+            raise PermissionError(f"{path} has to belong to the current user and be writable by it only")
+
+        with self._lock(fcntl.LOCK_EX):
+            if os.fstat(self._fd).st_size < _HEADER_SIZE:
+                os.ftruncate(self._fd, _HEADER_SIZE + _INITIAL_CAPACITY)
+                os.pwrite(self._fd, _HEADER.pack(_MAGIC, _VERSION, 0, 1, _HEADER_SIZE), 0)
+
+            self._map = mmap.mmap(self._fd, 0)
+            magic, version, *_ = _HEADER.unpack_from(self._map)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"{path} is not a razorbill shared storage file")
+
+    def bind(
+            self,
+            on_change: Callable[[Any, dict | None, dict | None], None],
+            on_reload: Callable[[], None]
+    ) -> None:
+        self._on_change = on_change
+        self._on_reload = on_reload
+
+    @contextmanager
+    def _lock(self, operation: int) -> Iterator[None]:
+        fcntl.flock(self._fd, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _header(self) -> tuple[int, int, int]:
+        _, _, generation, next_id, end = _HEADER.unpack_from(self._map)
+        return generation, next_id, end
+
+    def _write_header(self, generation: int, next_id: int, end: int) -> None:
+        _HEADER.pack_into(self._map, 0, _MAGIC, _VERSION, generation, next_id, end)
+
+    def _remap(self, end: int) -> None:
+        if end > len(self._map):
+            self._map.close()
+            self._map = mmap.mmap(self._fd, 0)
+
+    def _apply(self, op: int, pk: Any, row: dict[str, Any] | None, size: int, notify: bool = True) -> None:
+        old = self._rows.get(pk)
+        self._live_bytes -= self._sizes.pop(pk, 0)
+
+        if op == PUT:
+            self._rows[pk] = row  # type: ignore
+            self._sizes[pk] = size
+            self._live_bytes += size
+        else:
+            self._rows.pop(pk, None)
+
+        if notify and self._on_change is not None:
+            self._on_change(pk, old, row)
+
+    def _catch_up(self) -> None:
+        """Applies records appended by other processes, the caller holds the lock."""
+        generation, _, end = self._header()
+        reload = generation != self._generation
+
+        if reload:
+            self._rows = DictStorage()
+            self._sizes = {}
+            self._live_bytes = 0
+            self._offset = _HEADER_SIZE
+
+        self._remap(end)
+        offset = self._offset
+        for (op, pk, row), next_offset in read_records(self._map, offset, end, self._loads):
+            self._apply(op, pk, row, next_offset - offset, notify=not reload)
+            offset = next_offset
+        self._offset = end
+
+        if reload:
+            self._generation = generation
+            if self._on_reload is not None:
+                self._on_reload()
+
+    def refresh(self) -> None:
+        with self._lock(fcntl.LOCK_SH):
+            self._catch_up()
+
+    def allocate_id(self) -> int:
+        with self._lock(fcntl.LOCK_EX):
+            generation, next_id, end = self._header()
+            self._write_header(generation, next_id + 1, end)
+            return next_id
+
+    def _append(self, op: int, pk: Any, row: dict[str, Any] | None) -> None:
+        with self._lock(fcntl.LOCK_EX):
+            self._catch_up()
+            self._write(op, pk, row)
+
+    def _write(self, op: int, pk: Any, row: dict[str, Any] | None) -> None:
+        """Appends a record, the caller holds the exclusive lock and has caught up."""
+        record = encode_record(op, pk, row, self._dumps)
+        generation, next_id, end = self._header()
+
+        if end + len(record) > len(self._map):
+            os.ftruncate(self._fd, max(len(self._map) * 2, end + len(record)))
+            self._remap(end + len(record))
+
+        self._map[end:end + len(record)] = record
+        self._write_header(generation, next_id, end + len(record))
+        self._offset = end + len(record)
+        self._apply(op, pk, row, len(record))
+
+        garbage = self._offset - _HEADER_SIZE - self._live_bytes
+        if garbage > max(self._live_bytes, _COMPACT_MIN_GARBAGE):
+            self._compact()
+
+    def update_row(
+            self,
+            pk: Any,
+            change: Callable[[dict[str, Any]], dict[str, Any] | None]
+    ) -> tuple[dict[str, Any] | None, dict[str, Any] | None]:
+        """Replaces a row by `change(row)` under the exclusive lock, so no other process writes in between.
+
+        Returns the row before and after, the latter None when `change` returns None, and (None, None)
+        when the row is gone. Nothing is written when `change` returns the row itself.
+        """
+        with self._lock(fcntl.LOCK_EX):
+            self._catch_up()
+            old = self._rows.get(pk)
+            if old is None:
+                return None, None
+
+            new = change(old)
+            if new is not None and new is not old:
+                self._write(PUT, pk, new)
+            return old, new
+
+    def delete_row(self, pk: Any, check: Callable[[dict[str, Any]], bool] | None = None) -> dict[str, Any] | None:
+        """Deletes a row under the exclusive lock when `check(row)` allows it, returns the deleted row."""
+        with self._lock(fcntl.LOCK_EX):
+            self._catch_up()
+            old = self._rows.get(pk)
+            if old is None or (check is not None and not check(old)):
+                return None
+
+            self._write(DELETE, pk, None)
+            return old
+
+    def _compact(self) -> None:
+        """Rewrites the log with the live rows only, the caller holds the exclusive lock."""
+        generation, next_id, _ = self._header()
+        offset = _HEADER_SIZE
+        self._sizes = {}
+
+        for pk, row in self._rows.items():
+            record = encode_record(PUT, pk, row, self._dumps)
+            self._map[offset:offset + len(record)] = record
+            self._sizes[pk] = len(record)
+            offset += len(record)
+
+        self._live_bytes = offset - _HEADER_SIZE
+        self._offset = offset
+        self._generation = generation + 1
+        self._write_header(self._generation, next_id, offset)
+        self._map.flush()
+
+    def __getitem__(self, pk: Any) -> dict[str, Any]:
+        return self._rows[pk]
+
+    def __setitem__(self, pk: Any, row: dict[str, Any]) -> None:
+        self._append(PUT, pk, row)
+
+    def __delitem__(self, pk: Any) -> None:
+        if pk not in self._rows:
+            raise KeyError(pk)
+        self._append(DELETE, pk, None)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._rows)
+
+    def __reversed__(self) -> Iterator[Any]:
+        return reversed(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, pk: Any) -> bool:
+        return pk in self._rows
+
+    def select(self, filters: dict[str, Any] | None = None) -> Iterator[dict[str, Any]]:
+        return self._rows.select(filters)
+
+    def count(self, filters: dict[str, Any] | None = None) -> int:
+        return self._rows.count(filters)
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
@@ -0,0 +1,65 @@
+import os
+import stat
+import tempfile
+from typing import Any, Iterator, Type
+
+from pydantic import BaseModel
+
+
+STORAGE_KINDS = ("dict", "columnar", "shared")
+
+
+class DictStorage(dict):
+    """Default row store: primary key -> row dict, iterated in insertion order."""
+
+    def select(self, filters: dict[str, Any] | None = None) -> Iterator[dict[str, Any]]:
+        rows = self.values()
+        if not filters:
+            yield from rows
+            return
+
+        for row in rows:
+            if all(row.get(key) == value for key, value in filters.items()):
+                yield row
+
+    def count(self, filters: dict[str, Any] | None = None) -> int:
+        if not filters:
+            return len(self)
+        return sum(1 for _ in self.select(filters))
+
+
+def default_shared_path(schema: Type[BaseModel]) -> str:
+    """`razorbill-<uid>/<schema name>` under /dev/shm, in a directory only the current user can enter."""
+    root = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    directory = os.path.join(root, f"razorbill-{os.getuid()}")
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+
+    # another user may have created the directory first, or a link in its place
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{directory} has to be a directory private to the current user")
+    return os.path.join(directory, schema.__name__)
+
+
+def build_storage(
+        kind: str,
+        schema: Type[BaseModel],
+        pk_name: str,
+        shared_path: str | None = None
+) -> DictStorage | Any:
+    if kind == "dict":
+        return DictStorage()
+
+    if kind == "columnar":
+        # numpy is an optional dependency, only the columnar mode needs it
+        from razorbill.connectors.memory.columnar import ColumnarStorage
+        return ColumnarStorage(schema, pk_name)
+
+    if kind == "shared":
+        from razorbill.connectors.memory.shared import SharedStorage
+        return SharedStorage(shared_path or default_shared_path(schema), schema)
+
+    raise ValueError(f"Unknown storage '{kind}', expected one of {STORAGE_KINDS}")
@@ -0,0 +1,51 @@
+import asyncio
+from typing import Type
+
+from beanie import Document, init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+
+
+_clients: dict[str, AsyncIOMotorClient] = {}
+# (url, database name) -> document models not handed to beanie yet
+_pending_models: dict[tuple[str, str], list[Type[Document]]] = {}
+_init_lock: asyncio.Lock | None = None
+
+
+def get_client(url: str) -> AsyncIOMotorClient:
+    """Returns the Motor client of the process for this url, creating it on first use.
+
+    Connectors of the same deployment share one client and so one connection pool.
+    """
+    client = _clients.get(url)
+    if client is None:
+        client = AsyncIOMotorClient(url)
+        _clients[url] = client
+    return client
+
+
+def register_document_model(url: str, db_name: str, model: Type[Document]) -> None:
+    _pending_models.setdefault((url, db_name), []).append(model)
+
+
+async def init_mongo() -> None:
+    """Initializes beanie once for every registered document model, e.g. on application startup.
+
+    Models registered after the first call are initialized by the next one, concurrent calls wait
+    for the running initialization instead of repeating it.
+    """
+    global _init_lock
+    if _init_lock is None:
+        _init_lock = asyncio.Lock()
+
+    async with _init_lock:
+        for url, db_name in list(_pending_models):
+            models = _pending_models[url, db_name]
+            await init_beanie(database=get_client(url)[db_name], document_models=models)
+            del _pending_models[url, db_name]
+
+
+def close_clients() -> None:
+    """Closes the pools of every registered client, e.g. on application shutdown."""
+    for client in _clients.values():
+        client.close()
+    _clients.clear()
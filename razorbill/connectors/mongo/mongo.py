@@ -1,15 +1,17 @@
 from abc import ABC
-from typing import Any, Type
+from typing import Any, AsyncIterator, Awaitable, Callable, Type
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pydantic import BaseModel, validate_arguments
+from pymongo import ReturnDocument
 from pymongo.errors import DuplicateKeyError
 import pymongo
 from bson import ObjectId
 from beanie import PydanticObjectId
-from razorbill.connectors.base import BaseConnector
-from razorbill.connectors.mongo.utils import _prepare_result, validate_id
-from beanie import init_beanie, Document
-from functools import wraps
+from beanie.odm.utils.encoder import Encoder
+from razorbill.connectors.base import BaseConnector, IndexChange
+from razorbill.connectors.mongo.client import get_client, init_mongo, register_document_model
+from razorbill.connectors.mongo.utils import _prepare_result, build_mongo_query, validate_id
+from beanie import Document
 from razorbill.connectors.mongo.utils import create_beanie_model
 
 
@@ -17,25 +19,36 @@ class AsyncMongoConnectorException(Exception):
     pass
 
 
-def ensure_initialized(func):
-    @wraps(func)
-    async def wrapper(self, *args, **kwargs):
-        if not self.initialized:
-            await self.init_beanie()
-        return await func(self, *args, **kwargs)
+_mongo_connectors: dict[str, "AsyncMongoConnector"] = {}  # key = model name, for populate
 
-    return wrapper
+
+def _documents_to_items(documents: list[dict[str, Any]], joined: list[str]) -> list[dict[str, Any]]:
+    for document in documents:
+        document["id"] = str(document.pop("_id"))
+        for relationship in joined:
+            parent_document = document.get(relationship)
+            if parent_document is not None:
+                parent_document["id"] = str(parent_document.pop("_id"))
+            document[relationship] = parent_document
+    return documents
 
 
 class AsyncMongoConnector(BaseConnector):
     @validate_arguments
-    def __init__(self, url: str, model: Type[BaseModel], pk_name: str = "id") -> None:
+    def __init__(self, url: str, model: Type[BaseModel], pk_name: str = "id", raw_reads: bool = False) -> None:
+        """`raw_reads` reads get_many and get_one pages with Motor straight into dicts.
+
+        Beanie documents are not built then, the data is validated once, by the response model.
+        """
         self.document_schema = create_beanie_model(model, model.__name__, pk_name)
         self.db_name = url.split('/')[-1]
-        self.client: AsyncIOMotorClient = AsyncIOMotorClient(url)
+        self.client: AsyncIOMotorClient = get_client(url)
         self._schema = self.document_schema  # update_mongo_schema(model)
         self._pk_name = pk_name
-        self.initialized = False
+        self._raw_reads = raw_reads
+        # beanie is initialized by init_mongo() on startup, routers register it, request methods do not check it
+        register_document_model(url, self.db_name, self.document_schema)
+        _mongo_connectors[model.__name__] = self
 
     @property
     def pk_name(self) -> str:
@@ -49,19 +62,66 @@ class AsyncMongoConnector(BaseConnector):
     def type_pk(self) -> Type[str]:
         return str
 
+    @property
+    def relations(self) -> dict[str, tuple[str, str, Type[BaseModel]]]:
+        relations = {}
+        for name, connector in _mongo_connectors.items():
+            relationship = name.replace('Schema', '').lower()
+            if relationship + '_id' in self.document_schema.model_fields:
+                relations[relationship] = (relationship + '_id', relationship, connector.schema)
+        return relations
+
+    @property
+    def startup_handlers(self) -> list[Callable[[], Awaitable[None]]]:
+        # beanie is initialized once for every registered connector, not checked per request
+        return [init_mongo]
+
     async def init_beanie(self):
-        await init_beanie(database=self.client[self.db_name], document_models=[self.document_schema])
-        self.initialized = True
+        """Kept for existing startup code, initializes every registered connector at once"""
+        await init_mongo()
+
+    async def has_index(self, field: str, sorted: bool = False) -> bool:
+        if field in (self._pk_name, "_id"):
+            return True
+        collection = self.document_schema.get_motor_collection()
+        async for index in collection.list_indexes():
+            # a compound index serves lookups and sorts by its first key
+            if next(iter(index["key"]), None) == field:
+                return True
+        return False
+
+    async def ensure_index(self, field: str, sorted: bool = False) -> IndexChange | None:
+        if await self.has_index(field, sorted):
+            return None
+        collection = self.document_schema.get_motor_collection()
+        name = await collection.create_index([(field, pymongo.ASCENDING)])
+        return IndexChange(field, True, f"db.{collection.name}.createIndex({{{field}: 1}}) as {name}")
 
-    @ensure_initialized
     async def count(self, filters: dict[str, Any] = {}) -> int:
         if filters:
-            query = self.document_schema.find(filters)
+            query = self.document_schema.find(build_mongo_query(filters))
         else:
             query = self.document_schema.find()
         return await query.count()
 
-    @ensure_initialized
+    async def count_capped(self, filters: dict[str, Any] | None = None, cap: int = 1000) -> int:
+        collection = self.document_schema.get_motor_collection()
+        return await collection.count_documents(build_mongo_query(filters), limit=cap)
+
+    async def count_by(self, field: str) -> dict[Any, int]:
+        pipeline = [
+            {"$match": {field: {"$ne": None}}},
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        ]
+        documents = await self.document_schema.get_motor_collection().aggregate(pipeline).to_list(length=None)
+        return {document["_id"]: document["count"] for document in documents}
+
+    async def count_estimated(self, filters: dict[str, Any] | None = None) -> int:
+        """Collection metadata instead of a scan, filtered counts are exact"""
+        if filters:
+            return await self.count(filters)
+        return await self.document_schema.get_motor_collection().estimated_document_count()
+
     async def create_one(self, obj: dict[str, Any]) -> dict[str, Any]:
         try:
             new_document = self.document_schema(**obj)
@@ -71,63 +131,283 @@ class AsyncMongoConnector(BaseConnector):
         except DuplicateKeyError:
             raise AsyncMongoConnectorException(f"Duplicate key error")
 
-    @ensure_initialized
+    def _page_query(
+            self,
+            filters: dict[str, Any] | None,
+            sorting: tuple[str, bool] | None,
+            cursor: tuple[Any, Any] | None
+    ) -> tuple[dict[str, Any], list[tuple[str, int]]]:
+        """The query document and the sort of a page"""
+        filters = build_mongo_query(filters)
+        sort_field, sort_desc = sorting if sorting is not None else (None, None)
+        if sort_field == 'id':
+            sort_field = "_id"
+
+        if cursor is not None:
+            # keyset page: a range on (sort field, _id) served by an index instead of skipping documents
+            value, last_id = cursor
+            last_id = validate_id(last_id)
+            operator = "$lt" if sort_desc else "$gt"
+            if sort_field is None or sort_field == "_id":
+                filters["_id"] = {operator: last_id}
+            elif value is None:
+                # null sorts before every other value, comparisons never match it
+                filters["$or"] = [{sort_field: None, "_id": {operator: last_id}}]
+                if not sort_desc:
+                    filters["$or"].append({sort_field: {"$ne": None}})
+            else:
+                filters["$or"] = [
+                    {sort_field: {operator: value}},
+                    {sort_field: value, "_id": {operator: last_id}},
+                ]
+                if sort_desc:
+                    filters["$or"].append({sort_field: None})
+
+        direction = pymongo.DESCENDING if sort_desc else pymongo.ASCENDING
+        sort_fields = []
+        if sort_field is not None:
+            sort_fields = [(sort_field, direction)]
+            if sort_field != "_id":
+                # ties are broken by _id, so keyset pages never skip or repeat documents
+                sort_fields.append(("_id", direction))
+        elif cursor is not None:
+            sort_fields = [("_id", direction)]
+        return filters, sort_fields
+
     async def get_many(
             self,
             skip: int,
             limit: int,
             filters: dict[str, Any] = {},
-            populate: bool = False,
-            sorting: dict[str, bool] = None
+            populate: list[str] | None = None,
+            sorting: tuple[str, bool] | None = None,
+            cursor: tuple[Any, Any] | None = None,
+            fields: list[str] | None = None
     ) -> list[dict[str, Any]]:
+        filters, sort_fields = self._page_query(filters, sorting, cursor)
+
+        if populate or fields:
+            return await self._aggregate(filters, sort_fields, skip, limit, populate, fields)
+
+        if self._raw_reads:
+            cursor = self.document_schema.get_motor_collection().find(filters, skip=skip, limit=limit or 0)
+            if sort_fields:
+                cursor = cursor.sort(sort_fields)
+            return _documents_to_items(await cursor.to_list(length=None), [])
+
         query = self.document_schema.find(filters) if filters else self.document_schema.find()
-        if sorting:
-            sort_fields = [(field if field != 'id' else "_id", pymongo.DESCENDING if sort_desc else pymongo.ASCENDING)
-                           for field, sort_desc in sorting.items()]
+        if sort_fields:
             query = query.sort(sort_fields)
         query = query.skip(skip).limit(limit)
         return await query.to_list()
 
-    @ensure_initialized
+    async def get_many_with_total(
+            self,
+            skip: int,
+            limit: int,
+            filters: dict[str, Any] | None = None,
+            populate: list[str] | None = None,
+            sorting: tuple[str, bool] | None = None,
+            cursor: tuple[Any, Any] | None = None,
+            fields: list[str] | None = None
+    ) -> tuple[list[dict[str, Any]], int]:
+        """One aggregation with a $facet: the page in one branch, the count of the $match in the other"""
+        if cursor is not None:
+            # the $match of a keyset page leaves out the documents before the cursor
+            return await super().get_many_with_total(
+                skip=skip, limit=limit, filters=filters, populate=populate,
+                sorting=sorting, cursor=cursor, fields=fields
+            )
+
+        query, sort_fields = self._page_query(filters, sorting, None)
+        stages, joined = await self._page_stages(sort_fields, skip, limit, populate, fields)
+        pipeline = [
+            {"$match": query},
+            # a $facet branch cannot be empty
+            {"$facet": {"items": stages or [{"$match": {}}], "total": [{"$count": "count"}]}},
+        ]
+
+        collection = self.document_schema.get_motor_collection()
+        result = (await collection.aggregate(pipeline).to_list(length=1))[0]
+        total = result["total"][0]["count"] if result["total"] else 0
+        return _documents_to_items(result["items"], joined), total
+
+    async def _page_stages(
+            self,
+            sort_fields: list[tuple[str, int]],
+            skip: int,
+            limit: int | None,
+            populate: list[str] | None,
+            fields: list[str] | None
+    ) -> tuple[list[dict[str, Any]], list[str]]:
+        """Stages after the $match: the page, a $lookup by _id into every requested parent collection, the projection"""
+        pipeline: list[dict[str, Any]] = []
+        if sort_fields:
+            pipeline.append({"$sort": dict(sort_fields)})
+        if skip:
+            pipeline.append({"$skip": skip})
+        if limit:
+            pipeline.append({"$limit": limit})
+
+        relations = self.relations
+        joined = []
+        for key in populate or []:
+            if key not in relations:
+                continue
+            fk, relationship, parent_schema = relations[key]
+            parent = _mongo_connectors[parent_schema.__name__]
+
+            # foreign keys are stored as strings, the lookup needs them as ObjectId to hit the _id index
+            local_field = f"__{fk}"
+            pipeline += [
+                {"$addFields": {local_field: {"$convert": {
+                    "input": f"${fk}", "to": "objectId", "onError": None, "onNull": None
+                }}}},
+                {"$lookup": {
+                    "from": parent.document_schema.get_motor_collection().name,
+                    "localField": local_field,
+                    "foreignField": "_id",
+                    "as": relationship,
+                }},
+                {"$unwind": {"path": f"${relationship}", "preserveNullAndEmptyArrays": True}},
+                {"$project": {local_field: 0}},
+            ]
+            joined.append(relationship)
+
+        if fields:
+            # _id is always kept, the rest of the document never leaves the server
+            pipeline.append({"$project": {"_id": 1, **{key: 1 for key in [*fields, *joined] if key != 'id'}}})
+        return pipeline, joined
+
+    async def _aggregate(
+            self,
+            filters: dict[str, Any],
+            sort_fields: list[tuple[str, int]],
+            skip: int,
+            limit: int | None,
+            populate: list[str] | None,
+            fields: list[str] | None
+    ) -> list[dict[str, Any]]:
+        """One aggregation for a page with populated parents or a projection"""
+        stages, joined = await self._page_stages(sort_fields, skip, limit, populate, fields)
+        collection = self.document_schema.get_motor_collection()
+        documents = await collection.aggregate([{"$match": filters}, *stages]).to_list(length=None)
+        return _documents_to_items(documents, joined)
+
+    async def iter_many(
+            self,
+            filters: dict[str, Any] | None = None,
+            sorting: tuple[str, bool] | None = None,
+            fields: list[str] | None = None,
+            batch_size: int = 1000
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Streams documents from a Motor cursor, the server sends `batch_size` documents at a time"""
+        sort_field, sort_desc = sorting if sorting is not None else (None, None)
+        if sort_field == 'id':
+            sort_field = "_id"
+        projection = {"_id": 1, **{key: 1 for key in fields if key != 'id'}} if fields else None
+
+        cursor = self.document_schema.get_motor_collection().find(build_mongo_query(filters), projection, batch_size=batch_size)
+        if sort_field is not None:
+            direction = pymongo.DESCENDING if sort_desc else pymongo.ASCENDING
+            sort_fields = [(sort_field, direction)]
+            if sort_field != "_id":
+                sort_fields.append(("_id", direction))
+            cursor = cursor.sort(sort_fields)
+
+        async for document in cursor:
+            document["id"] = str(document.pop("_id"))
+            yield document
+
+    async def exists(self, obj_id: str | int) -> bool:
+        obj_id = validate_id(obj_id)
+        if obj_id is None:
+            return False
+        # answered from the _id index, the document itself is never fetched
+        collection = self.document_schema.get_motor_collection()
+        return await collection.find_one({"_id": obj_id}, {"_id": 1}) is not None
+
     async def get_one(
             self,
             obj_id: str | int,
             filters: dict[str, Any] = {},
-            populate: bool = False
+            populate: list[str] | None = None,
+            fields: list[str] | None = None
     ) -> dict[str, Any] | None:
         obj_id = validate_id(obj_id)
         if obj_id is None:
             return None
+        if populate or fields:
+            results = await self._aggregate({"_id": obj_id}, [], 0, 1, populate, fields)
+            return results[0] if results else None
+
+        if self._raw_reads:
+            document = await self.document_schema.get_motor_collection().find_one({"_id": obj_id})
+            return _documents_to_items([document], [])[0] if document else None
+
         result = await self.document_schema.get(obj_id)
         if not result:
             return None
 
         return _prepare_result(result, [])
 
-    @ensure_initialized
+    def _encode(self, obj: dict[str, Any]) -> dict[str, Any]:
+        """Encodes values the way Beanie does on save, BSON has no date, Decimal or Enum types"""
+        return Encoder(custom_encoders=self.document_schema.get_settings().bson_encoders).encode(obj)
+
     async def update_one(
             self, obj_id: str | int,
             obj: dict[str, Any],
             filters: dict[str, Any] = {}
-    ) -> dict[str, Any]:
+    ) -> dict[str, Any] | None:
+        """One find_one_and_update round trip, None when no document matches"""
+        obj_id = validate_id(obj_id)
+        if obj_id is None:
+            return None
 
-        document = await self.document_schema.get(obj_id)
-        result = await document.update({"$set": obj})
+        collection = self.document_schema.get_motor_collection()
+        query = {**build_mongo_query(filters), "_id": obj_id}
+        if not obj:
+            document = await collection.find_one(query)
+        else:
+            document = await collection.find_one_and_update(
+                query, {"$set": self._encode(obj)}, return_document=ReturnDocument.AFTER
+            )
+        return _documents_to_items([document], [])[0] if document else None
 
-        if not result:
-            return None
+    async def update_one_with_old(
+            self, obj_id: str | int,
+            obj: dict[str, Any]
+    ) -> tuple[dict[str, Any] | None, dict[str, Any] | None]:
+        """One find_one_and_update returning the document before the update, the update is applied to it"""
+        obj_id = validate_id(obj_id)
+        if obj_id is None:
+            return None, None
 
-        return result
+        collection = self.document_schema.get_motor_collection()
+        if not obj:
+            document = await collection.find_one({"_id": obj_id})
+            item = _documents_to_items([document], [])[0] if document else None
+            return item, item
 
-    @ensure_initialized
-    async def delete_one(self, obj_id: str | int, filters: dict[str, Any] = {}) -> bool:
-        document = await self.document_schema.get(obj_id)
-        result = await document.delete()
+        obj = self._encode(obj)
+        document = await collection.find_one_and_update(
+            {"_id": obj_id}, {"$set": obj}, return_document=ReturnDocument.BEFORE
+        )
+        if document is None:
+            return None, None
+        old = _documents_to_items([document], [])[0]
+        return old, {**old, **obj}
 
-        if not result:
+    async def delete_one(self, obj_id: str | int, filters: dict[str, Any] = {}) -> dict[str, Any] | None:
+        """One find_one_and_delete round trip, returns the deleted document or None when none matches"""
+        obj_id = validate_id(obj_id)
+        if obj_id is None:
             return None
 
-        return result
+        collection = self.document_schema.get_motor_collection()
+        document = await collection.find_one_and_delete({**build_mongo_query(filters), "_id": obj_id})
+        return _documents_to_items([document], [])[0] if document else None
 
 #
 # class AsyncMongoConnector(BaseConnector):
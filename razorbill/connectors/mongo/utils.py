@@ -1,5 +1,5 @@
+import re
 from typing import Any, Type, Container, Optional
-from pydantic.fields import Field, ModelField
 from pydantic import BaseModel, create_model, BaseConfig
 from beanie import Document
 from bson import ObjectId
@@ -8,6 +8,7 @@ from beanie import PydanticObjectId
 from pydantic import ValidationError
 from beanie.odm.documents import DocType
 from beanie.odm.utils.pydantic import get_model_fields
+from razorbill.filters import parse_filters
 
 
 def create_beanie_model(
@@ -31,6 +32,9 @@ def update_mongo_schema(
         pk_field_name: str = "id"
 ) -> BaseModel:
 
+    # pydantic v1 only, the module has to import under v2
+    from pydantic.fields import ModelField
+
     fields = {
         f.name: (f.type_, ...)
         for f in schema_cls.__fields__.values()
@@ -78,4 +82,25 @@ def validate_id(id_str: str) -> PydanticObjectId:
         pydantic_obj_id = PydanticObjectId(obj_id)
         return pydantic_obj_id
     except (ValueError, ValidationError, InvalidId):
-        return None
\ No newline at end of file
+        return None
+
+_MONGO_OPERATORS = {"gt": "$gt", "gte": "$gte", "lt": "$lt", "lte": "$lte"}
+
+
+def build_mongo_query(filters: dict[str, Any] | None) -> dict[str, Any]:
+    """Translates razorbill filters into a query document, operators on one field are merged"""
+    query: dict[str, Any] = {}
+    for field, operator, operand in parse_filters(filters):
+        if operator == "eq":
+            condition = {"$eq": operand}
+        elif operator == "isnull":
+            condition = {"$eq": None} if operand else {"$ne": None}
+        elif operator == "prefix":
+            # an anchored literal regex is served by an index as a range scan
+            condition = {"$regex": "^" + re.escape(operand)}
+        elif operator == "in":
+            condition = {"$in": list(operand)}
+        else:
+            condition = {_MONGO_OPERATORS[operator]: operand}
+        query.setdefault(field, {}).update(condition)
+    return query
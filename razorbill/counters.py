@@ -0,0 +1,63 @@
+import time
+from typing import Any
+
+
+def field_value(record: Any, field: str) -> Any:
+    """Reads a field of a connector record, a dict or a document object"""
+    if isinstance(record, dict):
+        return record.get(field)
+    return getattr(record, field, None)
+
+
+class CounterCache:
+    """Item counts per value of one field, usually the parent foreign key.
+
+    CRUD adjusts the counts once each create, update and delete has been committed, with no await
+    in between, so every request of the process reads counts that agree with its own writes. Writes
+    made elsewhere (other workers, raw SQL) are not seen: the counts expire `ttl` seconds after they
+    were loaded and are recounted on the next read, or at once with CRUD.rebuild_counters.
+    """
+
+    def __init__(self, field: str, ttl: float | None = None) -> None:
+        self.field = field
+        self.ttl = ttl
+        self._counts: dict[Any, int] | None = None
+        self._expires_at = 0.0
+        # bumped on every write, a rebuild racing with writes is thrown away
+        self._generation = 0
+
+    @property
+    def loaded(self) -> bool:
+        if self._counts is not None and self.ttl is not None and self._expires_at <= time.monotonic():
+            self._counts = None
+        return self._counts is not None
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, value: Any) -> int:
+        return (self._counts or {}).get(value, 0)
+
+    def load(self, counts: dict[Any, int], generation: int) -> bool:
+        """Replaces the counts unless a write happened after `generation`, returns whether it did"""
+        if generation != self._generation:
+            return False
+        self._counts = dict(counts)
+        if self.ttl is not None:
+            self._expires_at = time.monotonic() + self.ttl
+        return True
+
+    def add(self, value: Any, delta: int) -> None:
+        self._generation += 1
+        if self._counts is None or value is None:
+            return
+
+        count = self._counts.get(value, 0) + delta
+        if count > 0:
+            self._counts[value] = count
+        else:
+            self._counts.pop(value, None)
+
+    def invalidate(self) -> None:
+        self._counts = None
@@ -1,11 +1,30 @@
-from typing import Any, Type, Callable, Optional
+from typing import Any, AsyncIterator, Type, Callable, Optional
 
+from razorbill.cache import TTLCache
 from razorbill.connectors.base import BaseConnector
+from razorbill.counters import CounterCache, field_value
+
+
+COUNT_STRATEGIES = ("exact", "capped", "estimated")
 
 
 class CRUD:
-    def __init__(self, connector: Type[BaseConnector]):
+    def __init__(
+            self,
+            connector: Type[BaseConnector],
+            counter_cache: str | None = None,
+            exists_ttl: float | None = None,
+            counter_ttl: float | None = 60.0
+    ):
+        """`counter_cache` keeps item counts per value of this field, so count({field: value}) is a lookup.
+        The counts only follow this process's writes, they are recounted every `counter_ttl` seconds
+        (never when None, which is only exact with a single process writing).
+
+        `exists_ttl` caches exists() answers, found or not, for this many seconds.
+        """
         self._connector = connector
+        self._counters = CounterCache(counter_cache, counter_ttl) if counter_cache is not None else None
+        self._exists_cache = TTLCache(exists_ttl) if exists_ttl else None
 
         self._before_create_func = None
         self._before_update_func = None
@@ -28,6 +47,11 @@ class CRUD:
     def connector(self) -> Type[BaseConnector] | None:
         return self._connector
 
+    @property
+    def uses_parent(self) -> bool:
+        """Whether hooks take the parent item, nested routes have to load it then"""
+        return self._after_create_func_parent or self._after_get_many_func_parent
+
     def before_create(self, func: Callable) -> Callable:
         self._before_create_func = func
         return func
@@ -97,15 +121,63 @@ class CRUD:
 
         return decorator
 
-    async def count(self, filters: dict[str, Any] | None = None) -> int:
+    async def count(self, filters: dict[str, Any] | None = None, strategy: str = "exact", cap: int = 1000) -> int:
+        """`strategy` is one of COUNT_STRATEGIES: an exact count, at most `cap`, or a statistics estimate"""
+        counters = self._counters
+        if counters is not None and filters and len(filters) == 1 and filters.get(counters.field) is not None:
+            if not counters.loaded:
+                await self.rebuild_counters()
+            if counters.loaded:
+                count = counters.get(filters[counters.field])
+                return min(count, cap) if strategy == "capped" else count
+
+        if strategy == "capped":
+            return await self._connector.count_capped(filters=filters, cap=cap)  # type: ignore
+        if strategy == "estimated":
+            return await self._connector.count_estimated(filters=filters)  # type: ignore
         return await self._connector.count(filters=filters)  # type: ignore
 
-    async def get_one(self, obj_id: str | int, populate: list[str] | None = None) -> dict[str, Any]:
+    async def exists(self, obj_id: str | int) -> bool:
+        """Checks the item exists without loading it, unless get_one hooks have a say"""
+        if self._before_get_one_func is not None or self._after_get_one_func is not None:
+            return await self.get_one(obj_id) is not None
+
+        cache = self._exists_cache
+        if cache is not None:
+            found = cache.get(str(obj_id))
+            if found is not None:
+                return found
+
+        found = await self._connector.exists(obj_id)  # type: ignore
+        if cache is not None:
+            cache.set(str(obj_id), found)
+        return found
+
+    def _forget(self, obj_id: Any) -> None:
+        if self._exists_cache is not None:
+            self._exists_cache.pop(str(obj_id))
+
+    async def rebuild_counters(self) -> dict[Any, int]:
+        """Recounts the counter cache from the connector, repairing any drift"""
+        if self._counters is None:
+            raise ValueError("CRUD was created without a counter_cache field")
+
+        generation = self._counters.generation
+        counts = await self._connector.count_by(self._counters.field)  # type: ignore
+        self._counters.load(counts, generation)
+        return counts
+
+    async def get_one(
+            self,
+            obj_id: str | int,
+            populate: list[str] | None = None,
+            fields: list[str] | None = None
+    ) -> dict[str, Any]:
         if self._before_get_one_func is not None:
             item = await self._before_get_one_func(obj_id, populate)
             if item is not None: return item
 
-        item = await self._connector.get_one(obj_id=obj_id, populate=populate)  # type: ignore
+        item = await self._connector.get_one(obj_id=obj_id, populate=populate, fields=fields)  # type: ignore
 
         if self._after_get_one_func is not None:
             item = await self._after_get_one_func(item)
@@ -119,7 +191,9 @@ class CRUD:
             populate: list[str] | None = None,
             filters: dict[str, Any] | None = None,
             sorting: tuple[str, bool] | None = None,
-            parent_obj: Type[dict[str, Any]] | None = None
+            parent_obj: Type[dict[str, Any]] | None = None,
+            cursor: tuple[Any, Any] | None = None,
+            fields: list[str] | None = None
     ) -> list[dict[str, Any]]:
 
         if self._before_get_many_func is not None:
@@ -128,9 +202,39 @@ class CRUD:
 
         record = await self._connector.get_many(
             skip=skip, limit=limit, filters=filters,
-            populate=populate, sorting=sorting
+            populate=populate, sorting=sorting, cursor=cursor, fields=fields
         )  # type: ignore
 
+        return await self._after_get_many(record, parent_obj)
+
+    async def get_many_with_total(
+            self, *,
+            skip: int = 0,
+            limit: int = 10,
+            populate: list[str] | None = None,
+            filters: dict[str, Any] | None = None,
+            sorting: tuple[str, bool] | None = None,
+            parent_obj: Type[dict[str, Any]] | None = None,
+            cursor: tuple[Any, Any] | None = None,
+            fields: list[str] | None = None
+    ) -> tuple[list[dict[str, Any]], int]:
+        """get_many plus the count of every item matching the filters, in one query where the connector can"""
+        if self._before_get_many_func is not None:
+            items = await self._before_get_many_func(skip, limit, filters, sorting, populate)
+            if items is not None: return items, await self.count(filters)
+
+        record, total = await self._connector.get_many_with_total(
+            skip=skip, limit=limit, filters=filters,
+            populate=populate, sorting=sorting, cursor=cursor, fields=fields
+        )  # type: ignore
+
+        return await self._after_get_many(record, parent_obj), total
+
+    async def _after_get_many(
+            self,
+            record: list[dict[str, Any]],
+            parent_obj: Type[dict[str, Any]] | None
+    ) -> list[dict[str, Any]]:
         if self._after_get_many_func is not None:
 
             if self._after_get_many_func_parent:
@@ -143,6 +247,15 @@ class CRUD:
 
         return record
 
+    def iter_many(
+            self, *,
+            filters: dict[str, Any] | None = None,
+            sorting: tuple[str, bool] | None = None,
+            fields: list[str] | None = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Streams every matching item, get_many hooks are not applied"""
+        return self._connector.iter_many(filters=filters, sorting=sorting, fields=fields)  # type: ignore
+
     async def create(self, obj: Type[dict[str, Any]], parent_obj: Type[dict[str, Any]] | None = None) -> dict[str, Any]:
         _obj = None
 
@@ -152,6 +265,11 @@ class CRUD:
         if _obj is None: _obj = obj
 
         record = await self._connector.create_one(obj=_obj)  # type: ignore
+        # the new pk may be cached as missing
+        self._forget(field_value(record, self._connector.pk_name))  # type: ignore
+        if self._counters is not None:
+            self._counters.add(field_value(record, self._counters.field), 1)
+
         if self._after_create_func is not None:
             args = [record]
             if self._after_create_func_parent:
@@ -175,7 +293,18 @@ class CRUD:
 
         if _obj is None: _obj = obj
 
-        record = await self._connector.update_one(obj_id=obj_id, obj=_obj)  # type: ignore
+        if self._counters is not None and self._counters.field in _obj:
+            # the old value comes from the write itself, no separate read that a concurrent write could outdate
+            old, record = await self._connector.update_one_with_old(obj_id=obj_id, obj=_obj)  # type: ignore
+            if record:
+                old_value = field_value(old, self._counters.field)
+                new_value = field_value(record, self._counters.field)
+                if new_value != old_value:
+                    self._counters.add(old_value, -1)
+                    self._counters.add(new_value, 1)
+        else:
+            record = await self._connector.update_one(obj_id=obj_id, obj=_obj)  # type: ignore
+        self._forget(obj_id)
 
         if self._after_update_func is not None:
             if self._after_update_func_before_obj:
@@ -188,11 +317,17 @@ class CRUD:
 
         return record
 
-    async def delete(self, obj_id: str | int):
+    async def delete(self, obj_id: str | int) -> Any:
         if self._before_delete_func is not None:
             await self._before_delete_func(obj_id)
 
         record = await self._connector.delete_one(obj_id=obj_id)  # type: ignore
+        self._forget(obj_id)
+        if self._counters is not None and record:
+            # connectors return the deleted item, it holds the counted value
+            self._counters.add(field_value(record, self._counters.field), -1)
 
         if self._after_delete_func is not None:
             await self._after_delete_func(record)
+
+        return record
@@ -1,17 +1,29 @@
-from typing import Type
+import inspect
+import types
+from typing import Any, Callable, Type, Union, get_args, get_origin
 
 from pydantic import BaseModel
 from fastapi import HTTPException, Depends, Path, Request, Query, params
 
 from razorbill.crud import CRUD
 from razorbill.exceptions import NotFoundError
+from razorbill.filters import RANGE_OPERATORS
+from razorbill.utils import decode_cursor
 
 
-def build_exists_dependency(crud: CRUD, item_tag: str) -> params.Depends:
+def build_exists_dependency(
+        crud: CRUD,
+        item_tag: str,
+        load_item: Callable[[], bool] | None = None
+) -> params.Depends:
     """Зависимость, которая берет id элемента из URL и проверяет есть ли данный элемент в базе"""
 
     async def dep(item_id: int | str = Path(..., alias=item_tag)):
-        item = await crud.get_one(item_id)
+        # the item is loaded only when hooks need it, an existence check is enough otherwise
+        if load_item is not None and load_item():
+            item = await crud.get_one(item_id)
+        else:
+            item = {"id": item_id} if await crud.exists(item_id) else None
         if item is None:
             raise NotFoundError(crud.connector.schema.__name__, item_tag, item_id)
         return item
@@ -40,32 +52,123 @@ def build_parent_populate_dependency() -> params.Depends:
     return Depends(dep)
 
 
-def build_sorting_dependency(obj: Type[BaseModel]) -> params.Depends:
+def build_populate_dependency(relations: list[str]) -> params.Depends:
+    async def dep(
+            populate: list[str] | None = Query(None, description="Parents to nest into items", enum=relations)
+    ):
+        if populate is not None:
+            unknown = [key for key in populate if key not in relations]
+            if unknown:
+                raise create_query_validation_exception(
+                    field="populate", msg=f"unknown populate values {unknown}", type="value_error"
+                )
+        return populate
+
+    return Depends(dep)
+
+
+def build_fields_dependency(obj: Type[BaseModel]) -> params.Depends:
+    fields = list(obj.model_fields)
+
+    async def dep(
+            fields_: list[str] | None = Query(None, alias="fields", description="Fields to return", enum=fields)
+    ):
+        if fields_ is not None:
+            unknown = [key for key in fields_ if key not in fields]
+            if unknown:
+                raise create_query_validation_exception(
+                    field="fields", msg=f"unknown fields {unknown}", type="value_error"
+                )
+        return fields_
+
+    return Depends(dep)
+
+
+def _strip_optional(annotation: Any) -> Any:
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return args[0] if len(args) == 1 else Union[tuple(args)]
+    return annotation
+
+
+def build_filters_dependency(obj: Type[BaseModel], filters: list[str]) -> params.Depends:
+    """Typed query parameters for every filter field: `field`, `field__gt`, `field__in`, `field__isnull`, ...
+
+    Returns the filters dict in the format the connectors take, without the parameters left out.
+    """
+    parameters = []
+
+    def add(name: str, annotation: Any, description: str) -> None:
+        parameters.append(inspect.Parameter(
+            name, inspect.Parameter.KEYWORD_ONLY,
+            default=Query(None, description=description), annotation=annotation | None
+        ))
+
+    for field in filters:
+        annotation = _strip_optional(obj.model_fields[field].annotation)
+        add(field, annotation, f"{field} equals")
+        if annotation is not bool:
+            for operator in RANGE_OPERATORS:
+                add(f"{field}__{operator}", annotation, f"{field} {operator}")
+        add(f"{field}__in", list[annotation], f"{field} is one of")  # type: ignore
+        if annotation is str:
+            add(f"{field}__prefix", str, f"{field} starts with")
+        add(f"{field}__isnull", bool, f"{field} is null or not")
+
+    async def dep(**kwargs: Any) -> dict[str, Any]:
+        return {key: value for key, value in kwargs.items() if value is not None}
+
+    dep.__signature__ = inspect.Signature(parameters)  # type: ignore
+    return Depends(dep)
+
+
+def build_sorting_dependency(obj: Type[BaseModel], fields: list[str] | None = None) -> params.Depends:
     def get_sortable_fields():
-        return list(obj.__fields__.keys())
+        return list(obj.__fields__.keys()) if fields is None else list(fields)
+
+    sortable_fields = get_sortable_fields()
 
     async def dep(
-            sort_field: str = Query(None, description="Field to sort by", enum=get_sortable_fields()),
+            sort_field: str = Query(None, description="Field to sort by", enum=sortable_fields),
             sort_desc: bool = Query(None)
     ):
+        if sort_field is not None and sort_field not in sortable_fields:
+            raise create_query_validation_exception(
+                field="sort_field", msg=f"cannot sort by '{sort_field}'", type="value_error"
+            )
         return sort_field, sort_desc
 
     return Depends(dep)
 
 
+def create_query_validation_exception(field: str, msg: str, type: str = "type_error.integer") -> HTTPException:
+    return HTTPException(
+        422,
+        detail={
+            "detail": [
+                {"loc": ["query", field], "msg": msg, "type": type}
+            ]
+        },
+    )
+
+
+def validate_limit(limit: int | None, max_limit: int | None) -> None:
+    if limit is not None:
+        if limit <= 0:
+            raise create_query_validation_exception(
+                field="limit", msg="limit query parameter must be greater then zero"
+            )
+
+        elif max_limit and max_limit < limit:
+            raise create_query_validation_exception(
+                field="limit",
+                msg=f"limit query parameter must be less then {max_limit}",
+            )
+
+
 def build_pagination_dependency(max_limit: int | None = None) -> params.Depends:
     """Зависимость, которая валидируют пагинационный параметры запроса"""
 
-    def create_query_validation_exception(field: str, msg: str) -> HTTPException:
-        return HTTPException(
-            422,
-            detail={
-                "detail": [
-                    {"loc": ["query", field], "msg": msg, "type": "type_error.integer"}
-                ]
-            },
-        )
-
     def pagination(skip: int = 0, limit: int | None = max_limit) -> tuple[int, int | None]:
         if skip < 0:
             raise create_query_validation_exception(
@@ -73,19 +176,25 @@ def build_pagination_dependency(max_limit: int | None = None) -> params.Depends:
                 msg="skip query parameter must be greater or equal to zero",
             )
 
-        if limit is not None:
-            if limit <= 0:
-                raise create_query_validation_exception(
-                    field="limit", msg="limit query parameter must be greater then zero"
-                )
-
-            elif max_limit and max_limit < limit:
-                raise create_query_validation_exception(
-                    field="limit",
-                    msg=f"limit query parameter must be less then {max_limit}",
-                )
-
+        validate_limit(limit, max_limit)
         return skip, limit
 
     return Depends(pagination)
 
+
+def build_cursor_pagination_dependency(max_limit: int | None = None) -> params.Depends:
+    """Keyset pagination: an opaque cursor from the X-Next-Cursor header of the previous page instead of skip"""
+
+    def pagination(cursor: str | None = None, limit: int | None = max_limit) -> tuple[tuple[Any, Any] | None, int | None]:
+        validate_limit(limit, max_limit)
+        if cursor is None:
+            return None, limit
+
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            raise create_query_validation_exception(
+                field="cursor", msg="cursor query parameter is malformed", type="value_error"
+            )
+        return decoded, limit
+
+    return Depends(pagination)
@@ -0,0 +1,50 @@
+from typing import Any
+
+
+# a filter key is "<field>__<operator>", a plain field name is an equality filter
+FILTER_OPERATORS = ("gt", "gte", "lt", "lte", "in", "prefix", "isnull")
+RANGE_OPERATORS = ("gt", "gte", "lt", "lte")
+
+
+def split_filter(key: str) -> tuple[str, str]:
+    """Splits a filter key into the field and the operator, "eq" for a plain field"""
+    field, separator, operator = key.rpartition("__")
+    if separator and field and operator in FILTER_OPERATORS:
+        return field, operator
+    return key, "eq"
+
+
+def parse_filters(filters: dict[str, Any] | None) -> list[tuple[str, str, Any]]:
+    return [(*split_filter(key), value) for key, value in (filters or {}).items()]
+
+
+def match(value: Any, operator: str, operand: Any) -> bool:
+    """Checks a row value against one filter the way the SQL and Mongo connectors do"""
+    if operator == "eq":
+        return value == operand
+    if operator == "isnull":
+        return (value is None) == bool(operand)
+    if operator == "in":
+        return value in operand
+    if value is None:
+        # comparisons with NULL are never true in SQL
+        return False
+
+    try:
+        if operator == "prefix":
+            return isinstance(value, str) and value.startswith(operand)
+        if operator == "gt":
+            return value > operand
+        if operator == "gte":
+            return value >= operand
+        if operator == "lt":
+            return value < operand
+        if operator == "lte":
+            return value <= operand
+    except TypeError:
+        return False
+    raise ValueError(f"Unknown filter operator '{operator}', expected one of {FILTER_OPERATORS}")
+
+
+def match_row(row: dict[str, Any], filters: list[tuple[str, str, Any]]) -> bool:
+    return all(match(row.get(field), operator, operand) for field, operator, operand in filters)
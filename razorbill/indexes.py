@@ -0,0 +1,53 @@
+from typing import Iterable
+
+from razorbill.connectors.base import IndexChange
+from razorbill.router import Router
+
+
+class IndexReport:
+    """What ensure_indexes did: indexes created, statements left to apply, sortable fields without an index"""
+
+    def __init__(self) -> None:
+        self.created: list[tuple[str, IndexChange]] = []
+        self.pending: list[tuple[str, IndexChange]] = []
+        self.unindexed_sort_fields: list[tuple[str, str]] = []
+
+    @property
+    def migrations(self) -> list[str]:
+        """Alembic operations for the pending SQL indexes, ready to paste into an upgrade()"""
+        return [change.migration for _, change in self.pending if change.migration]
+
+    def __str__(self) -> str:
+        lines = []
+        for resource, change in self.created:
+            lines.append(f"created  {resource}.{change.field}: {change.statement}")
+        for resource, change in self.pending:
+            lines.append(f"missing  {resource}.{change.field}: {change.statement}")
+        for resource, field in self.unindexed_sort_fields:
+            lines.append(f"unindexed sort field  {resource}.{field}")
+        return "\n".join(lines)
+
+
+async def ensure_indexes(routers: Iterable[Router]) -> IndexReport:
+    """Indexes every field the routers filter or sort by, e.g. on application startup.
+
+    Memory and Mongo indexes are created right away, SQL ones are reported as CREATE INDEX
+    statements and alembic operations since the schema belongs to migrations. Fields that can be
+    sorted by but have no index are flagged in the report.
+    """
+    report = IndexReport()
+    for router in routers:
+        connector = router.crud.connector
+        resource = connector.schema.__name__  # type: ignore
+        patterns = router.access_patterns
+
+        for field, usages in patterns.items():
+            change = await connector.ensure_index(field, sorted=bool(usages & {"range", "sort"}))  # type: ignore
+            if change is not None:
+                (report.created if change.applied else report.pending).append((resource, change))
+
+        pending = {change.field for name, change in report.pending if name == resource}
+        for field in router.sortable_fields:
+            if field not in pending and not await connector.has_index(field, sorted=True):  # type: ignore
+                report.unindexed_sort_fields.append((resource, field))
+    return report
@@ -1,25 +1,62 @@
+import csv
+import io
+import json
 from enum import Enum
-from typing import Callable, Type, Any
+from typing import AsyncIterator, Callable, Type, Any
 
-from pydantic import BaseModel
-from fastapi import APIRouter, Path, Depends, params
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from fastapi import APIRouter, Path, Depends, Query, Response, params
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from razorbill.crud import CRUD
+from razorbill.counters import field_value
+from razorbill.crud import COUNT_STRATEGIES, CRUD
 from razorbill.exceptions import NotFoundError, UndefinedParentItemName, UndefinedSchemaException
-from razorbill.schema import rebuild_schema
-from razorbill.utils import get_slug_schema_name, build_path_elements
+from razorbill.schema import build_partial_schema, build_populated_schema, build_serialization_schema, rebuild_schema
+from razorbill.utils import get_slug_schema_name, build_path_elements, encode_cursor, validate_filters
 from razorbill.deps import (
+    build_cursor_pagination_dependency,
     build_exists_dependency,
+    build_fields_dependency,
+    build_filters_dependency,
     build_last_parent_dependency,
     build_pagination_dependency,
     build_parent_populate_dependency,
+    build_populate_dependency,
     build_sorting_dependency,
+    create_query_validation_exception,
 )
 
 _dummy_dependency = Depends(lambda: None)
+_EXPORT_CHUNK_SIZE = 1000
+
+
+async def _stream_ndjson(items: AsyncIterator[dict[str, Any]], schema: Type[BaseModel]) -> AsyncIterator[str]:
+    lines = []
+    async for item in items:
+        lines.append(json.dumps(schema.model_validate(item).model_dump(mode="json")) + "\n")
+        if len(lines) >= _EXPORT_CHUNK_SIZE:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+async def _stream_csv(items: AsyncIterator[dict[str, Any]], schema: Type[BaseModel]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(schema.model_fields), extrasaction="ignore")
+    writer.writeheader()
+    rows = 0
+
+    async for item in items:
+        writer.writerow(schema.model_validate(item).model_dump(mode="json"))
+        rows += 1
+        if rows % _EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
 
 
-# class _DummyFilter(BaseModel): pass
 # TODO сделать функционал для RESPONSE модел для create read update,
 #  response_create_schema(None), overwrite_response_create_schema(False)
 #  responce_update_schema, overwrite_response_update_schema
@@ -35,22 +72,29 @@ class Router(APIRouter):
             self,
             crud: CRUD,
             items_per_query: int = 10,
+            cursor_pagination: bool = False,
             item_name: str | None = None,
             parent_item_name: str | None = None,
             parent_crud: CRUD | None = None,
             parent_prefix: str = '',
             count_endpoint: bool | list[params.Depends] = True,
+            count_strategy: str = "exact",
+            count_cap: int = 1000,
+            total_count_header: bool = False,
             get_all_endpoint: bool | list[params.Depends] = True,
             get_one_endpoint: bool | list[params.Depends] = True,
             create_one_endpoint: bool | list[params.Depends] = True,
             update_one_endpoint: bool | list[params.Depends] = True,
             delete_one_endpoint: bool | list[params.Depends] = True,
+            export_endpoint: bool | list[params.Depends] = False,
             path_item_parameter: Callable | None = None,
             prefix: str = '',
             tags: list[str | Enum] | None = None,
             dependencies: list[params.Depends] | None = None,
             schema_slug: str | None = None,
             filters: list[str] | None = None,
+            sort_fields: list[str] | None = None,
+            trusted_responses: bool = False,
             schema: Type[BaseModel] | None = None,
             create_schema: Type[BaseModel] | None = None,
             update_schema: Type[BaseModel] | None = None,
@@ -64,6 +108,17 @@ class Router(APIRouter):
         super().__init__(dependencies=dependencies, **kwargs)
 
         self._crud = crud
+        if crud.connector is not None:
+            # the app runs them through include_router, an app with its own lifespan has to call them itself
+            for handler in crud.connector.startup_handlers:
+                if handler not in self.on_startup:
+                    self.add_event_handler("startup", handler)
+
+        if count_strategy not in COUNT_STRATEGIES:
+            raise ValueError(f"Unknown count strategy '{count_strategy}', expected one of {COUNT_STRATEGIES}")
+        self._count_strategy = count_strategy
+        self._count_cap = count_cap
+        self._total_count_header = total_count_header
 
         self._parent_crud = parent_crud
         self._parent_prefix = parent_prefix
@@ -86,17 +141,27 @@ class Router(APIRouter):
 
         self._build_schemes()
 
-        self._sort_field_dependency = build_sorting_dependency(self._Schema)  # type: ignore
-
-        # self._FilterSchema = _DummyFilter
-
-        # if filters is not None:
-        #     filters = validate_filters(self._Schema, filters)  # type: ignore
-        #     self._FilterSchema = rebuild_schema(
-        #         self._CreateSchema,  # type: ignore
-        #         fields_to_include=filters,
-        #         schema_name_prefix="Filter"
-        #     )
+        if sort_fields is not None:
+            sort_fields = validate_filters(self._Schema, sort_fields)  # type: ignore
+        self._sort_fields = sort_fields
+        self._sort_field_dependency = build_sorting_dependency(self._Schema, sort_fields)  # type: ignore
+
+        relations = self._crud.connector.relations if self._crud.connector is not None else {}
+        self._relations = relations
+        self._populate_dependency = build_populate_dependency(list(relations))
+        # unset relationship fields are left out, so responses without populate keep their shape
+        self._ReadSchema = build_populated_schema(self._Schema, relations) if relations else self._Schema  # type: ignore
+        self._read_exclude_unset = bool(relations)
+        self._fields_dependency = build_fields_dependency(self._Schema)  # type: ignore
+        self._partial_schemas: dict[frozenset[str], Type[BaseModel]] = {}
+        # connector items are serialized as they are, without the validation of response_model
+        self._trusted_responses = trusted_responses
+        self._adapters: dict[Type[BaseModel], tuple[TypeAdapter, TypeAdapter]] = {}
+
+        self._filters_dependency = _dummy_dependency
+        self._filters = [] if filters is None else validate_filters(self._Schema, filters)  # type: ignore
+        if filters is not None:
+            self._filters_dependency = build_filters_dependency(self._Schema, self._filters)  # type: ignore
 
         if item_name is None:
             item_name = self._Schema.__name__  # type: ignore
@@ -111,7 +176,11 @@ class Router(APIRouter):
         self._path = path
         self._item_path = item_path
         self._path_field = Path(alias=item_tag) if path_item_parameter is None else path_item_parameter
-        self._pagination_dependency = build_pagination_dependency(items_per_query)
+        self._cursor_pagination = cursor_pagination
+        if cursor_pagination:
+            self._pagination_dependency = build_cursor_pagination_dependency(items_per_query)
+        else:
+            self._pagination_dependency = build_pagination_dependency(items_per_query)
 
         self.prefix = prefix
         self.tags = tags
@@ -119,6 +188,9 @@ class Router(APIRouter):
         if count_endpoint:
             self._init_count_endpoint(count_endpoint)
 
+        if export_endpoint:
+            self._init_export_endpoint(export_endpoint)
+
         if get_all_endpoint:
             self._init_get_all_endpoint(get_all_endpoint)
 
@@ -161,6 +233,30 @@ class Router(APIRouter):
 
         return _deps
 
+    @property
+    def crud(self) -> CRUD:
+        return self._crud
+
+    @property
+    def sortable_fields(self) -> list[str]:
+        return list(self._Schema.model_fields) if self._sort_fields is None else list(self._sort_fields)  # type: ignore
+
+    @property
+    def access_patterns(self) -> dict[str, set[str]]:
+        """Fields the endpoints look up by, with how: "filter" (equality), "range" or "sort".
+
+        Sort fields are only listed when they were declared with `sort_fields`, every field is
+        sortable otherwise.
+        """
+        patterns: dict[str, set[str]] = {}
+        if self._parent_item_tag is not None:
+            patterns.setdefault(self._parent_item_tag, set()).add("filter")
+        for field in self._filters:
+            patterns.setdefault(field, set()).update(("filter", "range"))
+        for field in self._sort_fields or []:
+            patterns.setdefault(field, set()).add("sort")
+        return patterns
+
     def _build_parent(self):
         if self._parent_crud is None:
             return
@@ -176,7 +272,9 @@ class Router(APIRouter):
         parent_item_tag, _, parent_item_path = build_path_elements(self._parent_item_name)
 
         self._parent_item_tag = parent_item_tag
-        self._parent_exists_dependency = build_exists_dependency(self._parent_crud, parent_item_tag)
+        self._parent_exists_dependency = build_exists_dependency(
+            self._parent_crud, parent_item_tag, load_item=lambda: self._crud.uses_parent
+        )
         self._parent_id_dependency = build_last_parent_dependency(parent_item_tag,
                                                                   self._crud.connector.type_pk)  # type: ignore
         self._parent_populate_dependency = build_parent_populate_dependency()
@@ -232,44 +330,171 @@ class Router(APIRouter):
                 schema_name_prefix="Update"
             )
 
+    def _cursor_field(self, sorting: tuple[str, bool] | None) -> str:
+        if sorting is not None and sorting[0] is not None:
+            return sorting[0]
+        return self._crud.connector.pk_name  # type: ignore
+
+    def _parse_cursor(self, cursor: tuple[Any, Any], sorting: tuple[str, bool] | None) -> tuple[Any, Any]:
+        """Cursor values come back from JSON, they are coerced to the types of the sort field and pk"""
+        sort_value, pk = cursor
+        field = self._cursor_field(sorting)
+        field_info = self._Schema.model_fields.get(field)  # type: ignore
+        try:
+            if field_info is not None and sort_value is not None:
+                sort_value = TypeAdapter(field_info.annotation).validate_python(sort_value)
+            pk = self._crud.connector.type_pk(pk)  # type: ignore
+        except (ValidationError, ValueError, TypeError):
+            raise create_query_validation_exception(
+                field="cursor", msg="cursor query parameter is malformed", type="value_error"
+            )
+        return sort_value, pk
+
+    def _next_cursor(self, item: dict[str, Any], sorting: tuple[str, bool] | None) -> str:
+        pk_name = self._crud.connector.pk_name  # type: ignore
+        # items are dicts or documents, a document's .get is not a field lookup
+        return encode_cursor(field_value(item, self._cursor_field(sorting)), field_value(item, pk_name))
+
+    def _partial_schema(self, fields: list[str], populate: list[str] | None = None) -> Type[BaseModel]:
+        keys = {self._crud.connector.pk_name, *fields}  # type: ignore
+        keys.update(self._relations[key][1] for key in populate or [])
+        schema = self._partial_schemas.get(frozenset(keys))
+        if schema is None:
+            schema = build_partial_schema(self._ReadSchema, list(keys))  # type: ignore
+            self._partial_schemas[frozenset(keys)] = schema
+        return schema
+
+    def _partial_response(
+            self,
+            items: list[dict[str, Any]] | dict[str, Any],
+            fields: list[str],
+            populate: list[str] | None,
+            headers: dict[str, str] | None = None
+    ) -> Response:
+        """Serializes sparse fieldset items through a schema made of the requested fields only"""
+        schema = self._partial_schema(fields, populate)
+        if self._trusted_responses:
+            return self._trusted_response(items, schema, headers=headers)
+
+        if isinstance(items, list):
+            content = [schema.model_validate(item).model_dump(mode="json") for item in items]
+        else:
+            content = schema.model_validate(items).model_dump(mode="json")
+        return JSONResponse(content, headers=headers)
+
+    def _trusted_response(
+            self,
+            items: list[dict[str, Any]] | dict[str, Any],
+            schema: Type[BaseModel],
+            headers: dict[str, str] | None = None
+    ) -> Response:
+        """Serializes connector items straight to JSON through a TypeAdapter, without validating them.
+
+        The connector is trusted to return values of the schema types. Keys missing from an item are
+        left out of its JSON, as response_model_exclude_unset would. The endpoints keep their
+        response_model, so the OpenAPI schema is the same as without trusted responses.
+        """
+        adapters = self._adapters.get(schema)
+        if adapters is None:
+            typed_dict = build_serialization_schema(schema)
+            adapters = self._adapters[schema] = (TypeAdapter(typed_dict), TypeAdapter(list[typed_dict]))  # type: ignore
+
+        if isinstance(items, list):
+            content = adapters[1].dump_json([self._plain_item(item, schema) for item in items], by_alias=True)
+        else:
+            content = adapters[0].dump_json(self._plain_item(items, schema), by_alias=True)
+        return Response(content, media_type="application/json", headers=headers)
+
+    @staticmethod
+    def _plain_item(item: Any, schema: Type[BaseModel]) -> dict[str, Any]:
+        # connectors returning documents instead of dicts take the validating path
+        if isinstance(item, dict):
+            return item
+        return schema.model_validate(item, from_attributes=True).model_dump(exclude_unset=True)
+
     def _init_count_endpoint(self, deps: bool | list[params.Depends]):
         path = self._parent_prefix + self._path + "count"
 
         @self.get(path, dependencies=self._init_deps(deps, parent=True))
         async def count(
                 parent: dict[str, int] = self._parent_id_dependency,  # type: ignore
-                # filters: self._FilterSchema = Depends(self._FilterSchema), # type: ignore
+                filters: dict[str, Any] | None = self._filters_dependency,  # type: ignore
         ) -> int:
-            # payload = filters.model_dump(exclude_none=True)
-            # if parent is not None:
-            #     payload |= parent
+            return await self._crud.count(
+                {**(filters or {}), **(parent or {})}, strategy=self._count_strategy, cap=self._count_cap
+            )
 
-            return await self._crud.count(parent)
+    def _init_export_endpoint(self, deps: bool | list[params.Depends]):
+        path = self._parent_prefix + self._path + "export"
+
+        @self.get(path, response_class=StreamingResponse, dependencies=self._init_deps(deps, parent=True))
+        async def export(
+                parent: dict[str, Any] = self._parent_id_dependency,  # type: ignore
+                format: str = Query("ndjson", enum=["ndjson", "csv"]),
+                fields: list[str] | None = self._fields_dependency,  # type: ignore
+                filters: dict[str, Any] | None = self._filters_dependency,  # type: ignore
+                sorting: tuple[str, bool] | None = self._sort_field_dependency,  # type: ignore
+        ):
+            schema = self._Schema if fields is None else self._partial_schema(fields)
+            filters = {**(filters or {}), **(parent or {})}
+            items = self._crud.iter_many(filters=filters or None, sorting=sorting, fields=fields)
+
+            if format == "csv":
+                return StreamingResponse(_stream_csv(items, schema), media_type="text/csv")
+            return StreamingResponse(_stream_ndjson(items, schema), media_type="application/x-ndjson")
 
     def _init_get_all_endpoint(self, deps: bool | list[params.Depends]):
         path = self._parent_prefix + self._path
 
-        @self.get(path, response_model=list[self._Schema],
+        @self.get(path, response_model=list[self._ReadSchema],
+                  response_model_exclude_unset=self._read_exclude_unset,
                   dependencies=self._init_deps(deps, parent=True))  # type: ignore
         async def get_many(
-                pagination: tuple[int, int] = self._pagination_dependency,  # type: ignore
+                response: Response,
+                pagination: tuple[Any, int] = self._pagination_dependency,  # type: ignore
                 parent_obj: dict[str, Any] = self._parent_exists_dependency,  # type: ignore
-                # populate: list[str]|None = None,
-                # filters: self._FilterSchema = Depends(self._FilterSchema), # type: ignore
+                populate: list[str] | None = self._populate_dependency,  # type: ignore
+                fields: list[str] | None = self._fields_dependency,  # type: ignore
+                filters: dict[str, Any] | None = self._filters_dependency,  # type: ignore
                 sorting: tuple[str, bool] | None = self._sort_field_dependency,  # type: ignore
         ):
-            # payload = filters.model_dump(exclude_none=True)
-            # if parent is not None:
-            #     payload |= parent
-            skip, limit = pagination
-            parent = {}
+            skip, cursor = 0, None
+            if self._cursor_pagination:
+                cursor, limit = pagination
+                if fields is not None:
+                    # the next cursor is made of the sort field, it has to be loaded
+                    fields = list(dict.fromkeys([*fields, self._cursor_field(sorting)]))
+                if cursor is not None:
+                    cursor = self._parse_cursor(cursor, sorting)
+            else:
+                skip, limit = pagination
+
+            filters = dict(filters or {})
             if parent_obj is not None:
-                parent = {self._parent_item_tag: self._crud.connector.type_pk(parent_obj['id'])}
-            items = await self._crud.get_many(
-                skip=skip, limit=limit,
-                filters=parent, sorting=sorting,
-                parent_obj=parent_obj
-            )
+                filters[self._parent_item_tag] = self._crud.connector.type_pk(parent_obj['id'])
+            headers = {}
+            if self._total_count_header:
+                items, total = await self._crud.get_many_with_total(
+                    skip=skip, limit=limit,
+                    filters=filters, sorting=sorting, populate=populate,
+                    parent_obj=parent_obj, cursor=cursor, fields=fields
+                )
+                headers["X-Total-Count"] = str(total)
+            else:
+                items = await self._crud.get_many(
+                    skip=skip, limit=limit,
+                    filters=filters, sorting=sorting, populate=populate,
+                    parent_obj=parent_obj, cursor=cursor, fields=fields
+                )
+
+            if self._cursor_pagination and items and limit is not None and len(items) >= limit:
+                headers["X-Next-Cursor"] = self._next_cursor(items[-1], sorting)
+            if fields is not None:
+                return self._partial_response(items, fields, populate, headers)
+            if self._trusted_responses:
+                return self._trusted_response(items, self._ReadSchema, headers)  # type: ignore
+
+            response.headers.update(headers)
             return items
 
     def _init_create_one_endpoint(self, deps: bool | list[params.Depends]):
@@ -285,20 +510,28 @@ class Router(APIRouter):
                 parent = {self._parent_item_tag: self._crud.connector.type_pk(parent_obj['id'])}
                 payload = body.dict() | parent
             item = await self._crud.create(payload, parent_obj)
+            if self._trusted_responses:
+                return self._trusted_response(item, self._Schema)  # type: ignore
             return item
 
     def _init_get_one_endpoint(self, deps: bool | list[params.Depends]):
         @self.get(
             self._item_path,
-            response_model=self._Schema,
+            response_model=self._ReadSchema,
+            response_model_exclude_unset=self._read_exclude_unset,
             dependencies=self._init_deps(deps)
         )
         async def get_one(
                 item_id: int | str = self._path_field,  # type: ignore
-                # populate: list[str]|None = None,
+                populate: list[str] | None = self._populate_dependency,  # type: ignore
+                fields: list[str] | None = self._fields_dependency,  # type: ignore
         ):
-            item = await self._crud.get_one(item_id)  # , populate=populate)
+            item = await self._crud.get_one(item_id, populate=populate, fields=fields)
             if item:
+                if fields is not None:
+                    return self._partial_response(item, fields, populate)
+                if self._trusted_responses:
+                    return self._trusted_response(item, self._ReadSchema)  # type: ignore
                 return item
             raise NotFoundError(self._Schema.__name__, self._path_field.alias, item_id)  # type: ignore
 
@@ -317,10 +550,14 @@ class Router(APIRouter):
 
             item = await self._crud.update(item_id, payload)  # type: ignore
             if item:
+                if self._trusted_responses:
+                    return self._trusted_response(item, self._Schema)  # type: ignore
                 return item
             raise NotFoundError(self._Schema.__name__, self._path_field.alias, item_id)  # type: ignore
 
     def _init_delete_one_endpoint(self, deps: bool | list[params.Depends]):
         @self.delete(self._item_path, dependencies=self._init_deps(deps))
         async def delete_one(item_id: int | str = self._path_field):  # type: ignore
-            _ = await self._crud.delete(item_id)
+            record = await self._crud.delete(item_id)
+            if not record:
+                raise NotFoundError(self._Schema.__name__, self._path_field.alias, item_id)  # type: ignore
@@ -1,6 +1,8 @@
-from typing import Type, Any
+from types import UnionType
+from typing import Annotated, Type, Any, Union, get_args, get_origin
 
-from pydantic import BaseModel, create_model, model_validator
+from pydantic import BaseModel, Field, create_model, model_validator
+from typing_extensions import TypedDict
 
 
 def rebuild_schema(
@@ -30,6 +32,57 @@ def rebuild_schema(
     return rebuilded_schema
 
 
+def build_populated_schema(
+    schema: Type[BaseModel],
+    relations: dict[str, tuple[str, str, Type[BaseModel]]]
+) -> Type[BaseModel]:
+    """Schema of populated items: parents nested under their relationship field, foreign keys optional"""
+    fields: dict[str, Any] = {}
+
+    for fk, relationship, parent_schema in relations.values():
+        info = schema.model_fields.get(fk)
+        if info is not None:
+            fields[fk] = (info.annotation | None, None)  # type: ignore
+        fields[relationship] = (parent_schema | None, None)
+
+    return create_model("Populated" + schema.__name__, __base__=schema, **fields)
+
+
+def build_partial_schema(schema: Type[BaseModel], fields: list[str]) -> Type[BaseModel]:
+    """Schema with only `fields` of `schema`, for responses to sparse fieldset requests"""
+    return rebuild_schema(
+        schema,
+        fields_to_exclude=[name for name in schema.model_fields if name not in fields],
+        schema_name_prefix="Partial"
+    )
+
+
+def _serialization_annotation(annotation: Any) -> Any:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return build_serialization_schema(annotation)
+
+    origin = get_origin(annotation)
+    if origin in (Union, UnionType):
+        return Union[tuple(_serialization_annotation(arg) for arg in get_args(annotation))]  # type: ignore
+    if origin is list:
+        return list[_serialization_annotation(get_args(annotation)[0])]  # type: ignore
+    return annotation
+
+
+def build_serialization_schema(schema: Type[BaseModel]) -> Any:
+    """TypedDict with the fields of `schema`, nested schemas included, to serialize items as plain dicts.
+
+    Keys outside the schema are dropped and missing keys are left out, values are not validated.
+    """
+    fields = {}
+    for name, info in schema.model_fields.items():
+        annotation = _serialization_annotation(info.annotation)
+        alias = info.serialization_alias or info.alias
+        fields[name] = annotation if alias is None else Annotated[annotation, Field(serialization_alias=alias)]
+
+    return TypedDict(schema.__name__ + "Dict", fields, total=False)  # type: ignore
+
+
 if __name__ == "__main__":
     
     class AdditionalCreateSchema(BaseModel):           
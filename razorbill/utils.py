@@ -1,6 +1,8 @@
+import base64
+import json
 import re
 
-from typing import Type
+from typing import Any, Type
 from pydantic import BaseModel
 
 
@@ -16,7 +18,7 @@ def validate_filters(schema_cls: Type[BaseModel], filters: list[str]) -> list[st
     valid_filters = [
         filter_field for filter_field 
         in filters if filter_field 
-        in schema_cls.__annotations__
+        in schema_cls.model_fields
     ]
     return valid_filters
 
@@ -35,3 +37,18 @@ def build_path_elements(name: str) -> tuple[str, str, str]:
     item_path = path + item_path_tag
 
     return item_tag, path, item_path
+
+
+def encode_cursor(sort_value: Any, pk: Any) -> str:
+    """Opaque keyset pagination token: the sort value and primary key of the last returned item"""
+    payload = json.dumps([sort_value, pk], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple[Any, Any] | None:
+    try:
+        payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        sort_value, pk = json.loads(payload)
+    except (ValueError, TypeError):
+        return None
+    return sort_value, pk
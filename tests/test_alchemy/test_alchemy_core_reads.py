@@ -0,0 +1,36 @@
+import pytest
+from razorbill.connectors.alchemy.connector import AsyncSQLAlchemyConnector
+from tests.models import Base, User
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_core_and_orm_reads_match(tmp_path):
+    db_url = f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    core = AsyncSQLAlchemyConnector(model=User, db_url=db_url)
+    orm = AsyncSQLAlchemyConnector(model=User, db_url=db_url, core_reads=False)
+    async with core.session_maker.kw["bind"].begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    for i in range(10):
+        await core.create_one(new_user(str(i % 3), f"test{i}", i % 2 or None))
+
+    for kwargs in (
+        {},
+        {"filters": {"telegram_id": "1"}, "sorting": ("telegram_username", True)},
+        {"filters": {"project_id": None}, "fields": ["telegram_id"]},
+        {"sorting": ("project_id", False), "cursor": (1, 4)},
+    ):
+        rows = await core.get_many(skip=0, limit=5, **kwargs)
+        assert rows and rows == await orm.get_many(skip=0, limit=5, **kwargs)
+
+    assert await core.get_one(4) == await orm.get_one(4) == {"id": 4, **new_user("0", "test3", 1)}
+    assert await core.get_one(4, fields=["telegram_username"]) == {"id": 4, "telegram_username": "test3"}
+    assert await core.get_one(40) is None
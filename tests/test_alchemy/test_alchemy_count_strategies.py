@@ -0,0 +1,53 @@
+import pytest
+from razorbill.builder import build
+from razorbill.connectors.alchemy.engine import get_engine
+from tests.models import Base, Project, User
+
+
+@pytest.mark.asyncio
+async def test_count_strategies(tmp_path):
+    db_url = f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    resources = build([User, Project], db_url=db_url)
+    async with get_engine(db_url).begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    users = resources["User"].connector
+    await resources["Project"].connector.create_one({"name": "first"})
+    for i in range(10):
+        await users.create_one({"telegram_id": str(i), "telegram_username": f"test{i}", "project_id": i % 2 or None})
+
+    assert await users.count() == 10
+    assert await users.count({"project_id": 1}) == 5
+    assert await users.count_capped(cap=4) == 4
+    assert await users.count_capped({"project_id__isnull": True}, cap=100) == 5
+    # sqlite has no table statistics, the estimate is the exact count
+    assert await users.count_estimated() == 10
+
+
+@pytest.mark.asyncio
+async def test_get_many_with_total(tmp_path):
+    db_url = f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    resources = build([User, Project], db_url=db_url)
+    async with get_engine(db_url).begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    users = resources["User"].connector
+    await resources["Project"].connector.create_one({"name": "first"})
+    for i in range(10):
+        await users.create_one({"telegram_id": str(i), "telegram_username": f"test{i}", "project_id": 1})
+
+    items, total = await users.get_many_with_total(skip=2, limit=3, filters={"id__gt": 1}, sorting=("id", False))
+    assert [item["id"] for item in items] == [4, 5, 6]
+    assert "__total_count" not in items[0]
+    assert total == 9
+
+    items, total = await users.get_many_with_total(skip=0, limit=2, populate=["project"], fields=["telegram_id"])
+    assert items[0] == {"id": 1, "telegram_id": "0", "project": {"id": 1, "name": "first"}}
+    assert total == 10
+
+    assert await users.get_many_with_total(skip=20, limit=5) == ([], 10)
+    assert await users.get_many_with_total(skip=0, limit=5, filters={"id__gt": 100}) == ([], 0)
+
+    items, total = await users.get_many_with_total(skip=0, limit=2, cursor=(None, 8))
+    assert [item["id"] for item in items] == [9, 10]
+    assert total == 10
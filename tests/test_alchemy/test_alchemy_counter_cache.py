@@ -0,0 +1,97 @@
+import time
+import pytest
+from sqlalchemy import event
+from razorbill.crud import CRUD
+from razorbill.builder import build
+from razorbill.connectors.alchemy.engine import get_engine
+from tests.models import Base, Project, User
+
+
+@pytest.mark.asyncio
+async def test_counter_cache(tmp_path):
+    db_url = f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    resources = build([User, Project], db_url=db_url)
+    async with get_engine(db_url).begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    projects = resources["Project"].connector
+    await projects.create_one({"name": "first"})
+    await projects.create_one({"name": "second"})
+    users = CRUD(resources["User"].connector, counter_cache="project_id")
+
+    for i in range(5):
+        await users.create({"telegram_id": str(i), "telegram_username": f"test{i}", "project_id": i % 2 + 1})
+    assert await resources["User"].connector.count_by("project_id") == {1: 3, 2: 2}
+
+    assert await users.count({"project_id": 1}) == 3
+    await users.delete(1)
+    await users.update(2, {"project_id": 1})
+    assert await users.count({"project_id": 1}) == 3
+    assert await users.count({"project_id": 2}) == 1
+
+
+@pytest.mark.asyncio
+async def test_build_counter_cache(tmp_path):
+    db_url = f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    resources = build([(User, Project), Project], db_url=db_url, counter_cache=True)
+    async with get_engine(db_url).begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    await resources["Project"].connector.create_one({"name": "first"})
+    users = resources["User"].crud
+    await users.create({"telegram_id": "1", "telegram_username": "test1", "project_id": 1})
+
+    assert await users.count({"project_id": 1}) == 1
+    assert await users.rebuild_counters() == {1: 1}
+
+
+@pytest.mark.asyncio
+async def test_counter_cache_writes_in_one_transaction(tmp_path):
+    db_url = f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    resources = build([User, Project], db_url=db_url)
+    engine = get_engine(db_url)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    await resources["Project"].connector.create_one({"name": "first"})
+    await resources["Project"].connector.create_one({"name": "second"})
+    users = CRUD(resources["User"].connector, counter_cache="project_id")
+    for i in range(3):
+        await users.create({"telegram_id": str(i), "telegram_username": f"test{i}", "project_id": 1})
+    await users.count({"project_id": 1})
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement.split()[0])
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    await users.delete(1)
+    assert statements == ["DELETE"]
+
+    statements.clear()
+    await users.update(2, {"project_id": 2})
+    # the row is read under a lock in the transaction of the update
+    assert statements == ["SELECT", "UPDATE"]
+    event.remove(engine.sync_engine, "before_cursor_execute", listener)
+
+    assert await users.count({"project_id": 1}) == 1
+    assert await users.count({"project_id": 2}) == 1
+
+
+@pytest.mark.asyncio
+async def test_counter_cache_expires(tmp_path, monkeypatch):
+    db_url = f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    resources = build([User, Project], db_url=db_url)
+    async with get_engine(db_url).begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    await resources["Project"].connector.create_one({"name": "first"})
+    users = CRUD(resources["User"].connector, counter_cache="project_id", counter_ttl=30)
+    await users.create({"telegram_id": "1", "telegram_username": "test1", "project_id": 1})
+    assert await users.count({"project_id": 1}) == 1
+
+    # a write this CRUD does not see, as another worker would make
+    await resources["User"].connector.create_one({"telegram_id": "2", "telegram_username": "test2", "project_id": 1})
+    assert await users.count({"project_id": 1}) == 1
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 31)
+    assert await users.count({"project_id": 1}) == 2
@@ -0,0 +1,40 @@
+import pytest
+from razorbill.connectors.alchemy.connector import AsyncSQLAlchemyConnector
+from tests.models import Base, User
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+async def walk(connector: AsyncSQLAlchemyConnector, limit: int, sorting=None) -> list[int]:
+    field = sorting[0] if sorting else "id"
+    ids, cursor = [], None
+    while True:
+        page = await connector.get_many(skip=0, limit=limit, sorting=sorting, cursor=cursor)
+        ids.extend(user["id"] for user in page)
+        if len(page) < limit:
+            return ids
+        cursor = (page[-1][field], page[-1]["id"])
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages(tmp_path):
+    connector = AsyncSQLAlchemyConnector(model=User, db_url=f"sqlite+aiosqlite:///{tmp_path}/test.db")
+    async with connector.session_maker.kw["bind"].begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    # foreign keys are not enforced by SQLite, so project ids need no projects
+    for i in range(20):
+        await connector.create_one(new_user(str(i), f"test{i}", i % 4 or None))
+
+    assert await walk(connector, 3) == list(range(1, 21))
+    assert await walk(connector, 3, sorting=("id", True)) == list(range(20, 0, -1))
+
+    ascending = sorted(range(1, 21), key=lambda i: ((i - 1) % 4 == 0, (i - 1) % 4, i))
+    assert await walk(connector, 3, sorting=("project_id", False)) == ascending
+    assert await walk(connector, 3, sorting=("project_id", True)) == ascending[::-1]
@@ -0,0 +1,44 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from razorbill.builder import build
+from razorbill.connectors.alchemy.connector import AsyncSQLAlchemyConnector
+from razorbill.connectors.alchemy.engine import dispose_engines, get_engine
+from tests.models import Base, Project, User
+
+
+@pytest.mark.asyncio
+async def test_connectors_share_engine(tmp_path):
+    db_url = f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    users = AsyncSQLAlchemyConnector(model=User, db_url=db_url)
+    projects = AsyncSQLAlchemyConnector(model=Project, db_url=db_url)
+    other = AsyncSQLAlchemyConnector(model=Project, db_url=db_url, echo=True)
+
+    assert users.session_maker is projects.session_maker
+    assert other.session_maker is not users.session_maker
+    assert get_engine(db_url) is users.session_maker.kw["bind"]
+    await dispose_engines()
+
+
+@pytest.mark.asyncio
+async def test_build(tmp_path):
+    db_url = f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    app = FastAPI()
+    resources = build([(User, Project)], db_url=db_url, app=app)
+
+    assert set(resources) == {"User", "Project"}
+    assert resources["User"].router.parent_crud is resources["Project"].crud
+    assert resources["User"].connector.session_maker is resources["Project"].connector.session_maker
+
+    async with get_engine(db_url).begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/project/", json={"name": "first"})
+        assert response.json() == {"id": 1, "name": "first"}
+        response = await client.post("/project/1/user/", json={"telegram_id": "1", "telegram_username": "test1"})
+        assert response.json()["project_id"] == 1
+        response = await client.get("/project/1/user/")
+        assert [user["telegram_id"] for user in response.json()] == ["1"]
+
+    await dispose_engines()
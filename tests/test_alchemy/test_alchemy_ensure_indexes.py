@@ -0,0 +1,26 @@
+import pytest
+from razorbill.builder import build
+from razorbill.indexes import ensure_indexes
+from tests.models import Project, User
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes(tmp_path):
+    resources = build(
+        [(User, Project, {"filters": ["telegram_id"], "sort_fields": ["id"]}), Project],
+        db_url=f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    )
+
+    report = await ensure_indexes(resource.router for resource in resources.values())
+    assert report.created == []
+    assert [change.statement for _, change in report.pending] == [
+        "CREATE INDEX ix_users_project_id ON users (project_id)",
+        "CREATE INDEX ix_users_telegram_id ON users (telegram_id)",
+    ]
+    assert report.migrations == [
+        "op.create_index('ix_users_project_id', 'users', ['project_id'])",
+        "op.create_index('ix_users_telegram_id', 'users', ['telegram_id'])",
+    ]
+    assert report.unindexed_sort_fields == [("Project", "name")]
+    # the statements are reported only, the table stays as declared
+    assert not User.__table__.indexes
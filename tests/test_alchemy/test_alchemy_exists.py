@@ -0,0 +1,20 @@
+import pytest
+from razorbill.builder import build
+from razorbill.connectors.alchemy.engine import get_engine
+from tests.models import Base, Project, User
+
+
+@pytest.mark.asyncio
+async def test_exists(tmp_path):
+    db_url = f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    resources = build([User, Project], db_url=db_url)
+    async with get_engine(db_url).begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    projects = resources["Project"].connector
+    await projects.create_one({"name": "first"})
+
+    assert await projects.exists(1)
+    assert await projects.exists("1")
+    assert not await projects.exists(2)
+    assert not await projects.exists("abc")
@@ -0,0 +1,31 @@
+import json
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from razorbill.builder import build
+from razorbill.connectors.alchemy.engine import get_engine
+from tests.models import Base, Project, User
+
+
+@pytest.mark.asyncio
+async def test_export(tmp_path):
+    db_url = f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    app = FastAPI()
+    resources = build([(User, Project, {"export_endpoint": True})], db_url=db_url, app=app)
+    async with get_engine(db_url).begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    await resources["Project"].connector.create_one({"name": "first"})
+    users = resources["User"].connector
+    for i in range(2500):
+        await users.create_one({"telegram_id": str(i), "telegram_username": f"test{i}", "project_id": 1})
+
+    streamed = [user async for user in users.iter_many(sorting=("id", True), batch_size=100)]
+    assert len(streamed) == 2500
+    assert streamed[0]["id"] == 2500
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/project/1/user/export", params={"fields": "telegram_id"})
+        lines = response.text.splitlines()
+        assert len(lines) == 2500
+        assert json.loads(lines[-1]) == {"id": 2500, "telegram_id": "2499"}
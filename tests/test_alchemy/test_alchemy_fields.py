@@ -0,0 +1,34 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from razorbill.builder import build
+from razorbill.connectors.alchemy.engine import get_engine
+from tests.models import Base, Project, User
+
+
+@pytest.mark.asyncio
+async def test_fields(tmp_path):
+    db_url = f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    app = FastAPI()
+    resources = build([User, Project], db_url=db_url, app=app)
+    async with get_engine(db_url).begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    users = resources["User"].connector
+    await resources["Project"].connector.create_one({"name": "first"})
+    await users.create_one({"telegram_id": "1", "telegram_username": "test1", "project_id": 1})
+
+    assert await users.get_many(skip=0, limit=10, fields=["telegram_id"]) == [{"id": 1, "telegram_id": "1"}]
+    assert await users.get_one(1, fields=["telegram_id"], populate=["project"]) == {
+        "id": 1, "telegram_id": "1", "project": {"id": 1, "name": "first"}
+    }
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/user/", params={"fields": ["telegram_id", "project_id"]})
+        assert response.json() == [{"id": 1, "telegram_id": "1", "project_id": 1}]
+
+        response = await client.get("/user/1", params={"fields": "telegram_username", "populate": "project"})
+        assert response.json() == {"id": 1, "telegram_username": "test1", "project": {"id": 1, "name": "first"}}
+
+        response = await client.get("/user/", params={"fields": "password"})
+        assert response.status_code == 422
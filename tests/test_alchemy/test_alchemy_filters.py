@@ -0,0 +1,54 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from razorbill.builder import build
+from razorbill.connectors.alchemy.engine import get_engine
+from tests.models import Base, Project, User
+
+
+async def get_ids(connector, filters: dict) -> list[int]:
+    users = await connector.get_many(skip=0, limit=100, filters=filters, sorting=("id", False))
+    return [user["id"] for user in users]
+
+
+@pytest.mark.asyncio
+async def test_filters(tmp_path):
+    db_url = f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    app = FastAPI()
+    resources = build(
+        [(User, None, {"filters": ["id", "telegram_username", "project_id"], "export_endpoint": True}), Project],
+        db_url=db_url, app=app
+    )
+    async with get_engine(db_url).begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    users = resources["User"].connector
+    await resources["Project"].connector.create_one({"name": "first"})
+    await resources["Project"].connector.create_one({"name": "second"})
+    for i in range(1, 7):
+        await users.create_one({"telegram_id": str(i), "telegram_username": f"user_{i}" if i < 4 else f"admin%{i}",
+                                "project_id": i % 3 or None})
+
+    assert await get_ids(users, {"id__gt": 4}) == [5, 6]
+    assert await get_ids(users, {"id__gte": 2, "id__lte": 3}) == [2, 3]
+    assert await get_ids(users, {"project_id__in": [2]}) == [2, 5]
+    assert await get_ids(users, {"project_id__isnull": True}) == [3, 6]
+    assert await get_ids(users, {"project_id__isnull": False, "id__lt": 3}) == [1, 2]
+    # LIKE wildcards in the prefix are matched literally
+    assert await get_ids(users, {"telegram_username__prefix": "user_"}) == [1, 2, 3]
+    assert await get_ids(users, {"telegram_username__prefix": "admin%"}) == [4, 5, 6]
+    assert await get_ids(users, {"telegram_username__prefix": "%"}) == []
+    assert await users.count({"project_id__in": [1, 2], "id__gt": 1}) == 3
+
+    # the same shape with other values reuses the cached statement
+    assert await get_ids(users, {"project_id__in": [1, 2]}) == [1, 2, 4, 5]
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/user/", params={"id__lt": 3, "project_id__in": [1, 2]})
+        assert [user["id"] for user in response.json()] == [1, 2]
+
+        response = await client.get("/user/count", params={"telegram_username__prefix": "admin"})
+        assert response.json() == 3
+
+        response = await client.get("/user/export", params={"project_id__isnull": True})
+        assert [line.count('"id"') for line in response.text.splitlines()] == [1, 1]
@@ -0,0 +1,39 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from razorbill.builder import build
+from razorbill.connectors.alchemy.engine import get_engine
+from tests.models import Base, Project, User
+
+
+@pytest.mark.asyncio
+async def test_populate(tmp_path):
+    db_url = f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    app = FastAPI()
+    resources = build([User, Project], db_url=db_url, app=app)
+    async with get_engine(db_url).begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    users = resources["User"].connector
+    assert list(users.relations) == ["project"]
+    assert resources["Project"].connector.relations == {}
+
+    await resources["Project"].connector.create_one({"name": "first"})
+    await users.create_one({"telegram_id": "1", "telegram_username": "test1", "project_id": 1})
+    await users.create_one({"telegram_id": "2", "telegram_username": "test2"})
+
+    page = await users.get_many(skip=0, limit=10, populate=["project"])
+    assert [user["project"] for user in page] == [{"id": 1, "name": "first"}, None]
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/user/1", params={"populate": "project"})
+        assert response.json() == {
+            "id": 1, "telegram_id": "1", "telegram_username": "test1", "project_id": 1,
+            "project": {"id": 1, "name": "first"}
+        }
+
+        response = await client.get("/user/")
+        assert "project" not in response.json()[0]
+
+        response = await client.get("/user/", params={"populate": "tags"})
+        assert response.status_code == 422
@@ -0,0 +1,60 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from razorbill.crud import CRUD
+from razorbill.router import Router
+from razorbill.connectors.alchemy.connector import AsyncSQLAlchemyConnector
+from tests.models import Base, User
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+async def make_connector(tmp_path, returning: bool) -> AsyncSQLAlchemyConnector:
+    connector = AsyncSQLAlchemyConnector(model=User, db_url=f"sqlite+aiosqlite:///{tmp_path}/test.db")
+    engine = connector.session_maker.kw["bind"]
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    dialect = engine.dialect
+    dialect.insert_returning = dialect.update_returning = dialect.delete_returning = returning
+    return connector
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("returning", [True, False])
+async def test_writes(tmp_path, returning):
+    connector = await make_connector(tmp_path, returning)
+
+    user = await connector.create_one(new_user("1", "test1"))
+    assert user == {"id": 1, **new_user("1", "test1")}
+    await connector.create_one(new_user("2", "test2"))
+
+    user = await connector.update_one(1, {"telegram_username": "updated"})
+    assert user == {"id": 1, **new_user("1", "updated")}
+    assert await connector.update_one(3, {"telegram_username": "updated"}) is None
+    assert await connector.update_one(2, {}) == {"id": 2, **new_user("2", "test2")}
+
+    assert await connector.delete_one(1) == {"id": 1, **new_user("1", "updated")}
+    assert await connector.delete_one(1) is None
+    assert await connector.count() == 1
+    assert await connector.get_one(2) == {"id": 2, **new_user("2", "test2")}
+
+
+@pytest.mark.asyncio
+async def test_router_missing_item(tmp_path):
+    connector = await make_connector(tmp_path, True)
+    await connector.create_one(new_user("1", "test1"))
+    app = FastAPI()
+    app.include_router(Router(CRUD(connector)))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.put("/user/2", json=new_user("2", "test2"))).status_code == 404
+        assert (await client.delete("/user/2")).status_code == 404
+        assert (await client.delete("/user/1")).status_code == 200
+        assert (await client.delete("/user/1")).status_code == 404
@@ -0,0 +1,40 @@
+import pytest
+from razorbill.connectors.alchemy.connector import AsyncSQLAlchemyConnector
+from razorbill.connectors.alchemy.select import statement_cache
+from tests.models import Base, User
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_statement_cache(tmp_path):
+    connector = AsyncSQLAlchemyConnector(model=User, db_url=f"sqlite+aiosqlite:///{tmp_path}/test.db")
+    async with connector.session_maker.kw["bind"].begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    for i in range(6):
+        await connector.create_one(new_user(str(i % 3), f"test{i}", i % 2 or None))
+    statement_cache.clear()
+
+    for telegram_id in ("0", "1", "2"):
+        users = await connector.get_many(skip=0, limit=10, filters={"telegram_id": telegram_id})
+        assert [user["telegram_id"] for user in users] == [telegram_id, telegram_id]
+        assert await connector.count({"telegram_id": telegram_id}) == 2
+
+    assert connector.statement_cache_info["misses"] == 2
+    assert connector.statement_cache_info["hits"] == 4
+
+    # None becomes IS NULL, a different statement than a bound value
+    assert await connector.count({"project_id": None}) == 3
+    assert await connector.count({"project_id": 1}) == 3
+    assert connector.statement_cache_info["misses"] == 4
+
+    users = await connector.get_many(skip=1, limit=2, sorting=("telegram_username", True))
+    assert [user["telegram_username"] for user in users] == ["test4", "test3"]
+    assert (await connector.get_one(3))["telegram_username"] == "test2"
@@ -0,0 +1,38 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from razorbill.builder import build
+from razorbill.connectors.alchemy.engine import get_engine
+from tests.models import Base, Project, User
+
+
+@pytest.mark.asyncio
+async def test_trusted_responses(tmp_path):
+    db_url = f"sqlite+aiosqlite:///{tmp_path}/test.db"
+    default, trusted = FastAPI(), FastAPI()
+    resources = build([(User, Project), Project], db_url=db_url, app=default)
+    options = {"trusted_responses": True}
+    build([(User, Project, options), (Project, None, options)], db_url=db_url, app=trusted)
+    async with get_engine(db_url).begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    await resources["Project"].connector.create_one({"name": "first"})
+    await resources["User"].connector.create_one({"telegram_id": "1", "telegram_username": "test1", "project_id": 1})
+    await resources["User"].connector.create_one({"telegram_id": "2", "telegram_username": "test2"})
+
+    requests = [
+        ("/project/", {}),
+        ("/project/1/user/", {}),
+        ("/project/1/user/", {"populate": "project"}),
+        ("/user/1", {"populate": "project"}),
+        ("/user/2", {}),
+    ]
+    for path, params in requests:
+        responses = []
+        for app in (default, trusted):
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                responses.append(await client.get(path, params=params))
+        assert responses[1].status_code == 200
+        assert responses[1].json() == responses[0].json()
+
+    assert trusted.openapi() == default.openapi()
@@ -0,0 +1,67 @@
+import pytest
+from razorbill.connectors.memory import MemoryConnector
+from tests.schemas import UserSchema
+
+pytest.importorskip("numpy")
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_columnar_crud():
+    connector = MemoryConnector(UserSchema, storage="columnar")
+    user = await connector.create_one(new_user("1", "test1", 1))
+    await connector.create_one(new_user("2", "test2"))
+
+    assert await connector.get_one(user["id"]) == {**new_user("1", "test1", 1), "id": 1}
+    assert await connector.count() == 2
+    assert await connector.count({"project_id": 1}) == 1
+    assert await connector.count({"project_id": None}) == 1
+    assert await connector.count({"telegram_id": "2"}) == 1
+
+    updated = await connector.update_one(user["id"], {"telegram_username": "updated"})
+    assert updated["telegram_username"] == "updated"
+    assert (await connector.get_one(user["id"]))["telegram_username"] == "updated"
+
+    assert await connector.delete_one(user["id"])
+    assert await connector.get_one(user["id"]) is None
+    assert await connector.count() == 1
+
+
+@pytest.mark.asyncio
+async def test_columnar_get_many():
+    connector = MemoryConnector(UserSchema, storage="columnar", indexes=["project_id"])
+    for i in range(3000):
+        await connector.create_one(new_user(str(i % 3), f"test{i}", i % 2))
+
+    for pk in range(1, 2001):
+        await connector.delete_one(pk)
+
+    assert await connector.count() == 1000
+    assert await connector.count({"telegram_id": "0", "project_id": 1}) == 167
+
+    users = await connector.get_many(skip=0, limit=3, filters={"telegram_id": "1"})
+    assert [user["id"] for user in users] == [2003, 2006, 2009]
+
+    users = await connector.get_many(skip=0, limit=2, sorting=("id", True))
+    assert [user["id"] for user in users] == [3000, 2999]
+
+
+@pytest.mark.asyncio
+async def test_columnar_keeps_values_it_cannot_type():
+    connector = MemoryConnector(UserSchema, storage="columnar")
+    user = await connector.create_one({**new_user("1", "test1", 2 ** 70), "extra": [1]})
+
+    assert await connector.get_one(user["id"]) == {**new_user("1", "test1", 2 ** 70), "extra": [1], "id": 1}
+    assert await connector.count({"project_id": 2 ** 70}) == 1
+
+
+def test_unknown_storage():
+    with pytest.raises(ValueError):
+        MemoryConnector(UserSchema, storage="unknown")
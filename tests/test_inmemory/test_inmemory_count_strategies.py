@@ -0,0 +1,52 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from razorbill.crud import CRUD
+from razorbill.router import Router
+from razorbill.connectors.memory import MemoryConnector
+from tests.schemas import UserSchema
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_count_strategies():
+    connector = MemoryConnector(UserSchema)
+    for i in range(10):
+        await connector.create_one(new_user(str(i), f"test{i}", i % 2))
+    crud = CRUD(connector)
+
+    assert await crud.count() == 10
+    assert await crud.count(strategy="capped", cap=3) == 3
+    assert await crud.count({"project_id": 1}, strategy="capped", cap=100) == 5
+    assert await crud.count({"project_id": 1}, strategy="estimated") == 5
+
+    items, total = await crud.get_many_with_total(skip=8, limit=5, filters={"id__gt": 2})
+    assert [item["id"] for item in items] == []
+    assert total == 8
+
+
+@pytest.mark.asyncio
+async def test_router_count_strategies():
+    connector = MemoryConnector(UserSchema)
+    for i in range(10):
+        await connector.create_one(new_user(str(i), f"test{i}"))
+    app = FastAPI()
+    app.include_router(Router(CRUD(connector), count_strategy="capped", count_cap=5, total_count_header=True))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/user_schema/count")
+        assert response.json() == 5
+
+        response = await client.get("/user_schema/", params={"limit": 3})
+        assert len(response.json()) == 3
+        assert response.headers["X-Total-Count"] == "10"
+
+    with pytest.raises(ValueError):
+        Router(CRUD(connector), count_strategy="fast")
@@ -0,0 +1,51 @@
+import pytest
+from razorbill.crud import CRUD
+from razorbill.connectors.memory import MemoryConnector
+from tests.schemas import UserSchema
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("indexes", [None, ["project_id"]])
+async def test_counter_cache(indexes):
+    connector = MemoryConnector(UserSchema, indexes=indexes)
+    await connector.create_one(new_user("0", "test0", 1))
+    crud = CRUD(connector, counter_cache="project_id")
+
+    # the first count loads the counters from the connector
+    assert await crud.count({"project_id": 1}) == 1
+    await crud.create(new_user("1", "test1", 1))
+    await crud.create(new_user("2", "test2", 2))
+    await crud.create(new_user("3", "test3"))
+    assert await crud.count({"project_id": 1}) == 2
+    assert await crud.count({"project_id": 2}) == 1
+
+    await crud.update(2, {"project_id": 2})
+    assert await crud.count({"project_id": 1}) == 1
+    assert await crud.count({"project_id": 2}) == 2
+
+    await crud.delete(3)
+    assert await crud.count({"project_id": 2}) == 1
+    assert await crud.count({"project_id": 2}, strategy="capped", cap=0) == 0
+    # other filters are counted by the connector
+    assert await crud.count({"project_id": None}) == 1
+    assert await crud.count() == 3
+
+    # writes that bypass the CRUD drift until a rebuild
+    await connector.create_one(new_user("4", "test4", 2))
+    assert await crud.count({"project_id": 2}) == 1
+    assert await crud.rebuild_counters() == {1: 1, 2: 2}
+    assert await crud.count({"project_id": 2}) == 2
+
+
+@pytest.mark.asyncio
+async def test_rebuild_without_counter_cache():
+    with pytest.raises(ValueError):
+        await CRUD(MemoryConnector(UserSchema)).rebuild_counters()
@@ -0,0 +1,68 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from razorbill.crud import CRUD
+from razorbill.router import Router
+from razorbill.connectors.memory import MemoryConnector
+from tests.schemas import UserSchema
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+async def walk(connector: MemoryConnector, limit: int, sorting=None, filters=None) -> list[int]:
+    field = sorting[0] if sorting else "id"
+    ids, cursor = [], None
+    while True:
+        page = await connector.get_many(skip=0, limit=limit, sorting=sorting, filters=filters, cursor=cursor)
+        ids.extend(user["id"] for user in page)
+        if len(page) < limit:
+            return ids
+        cursor = (page[-1][field], page[-1]["id"])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sorted_indexes", [None, ["project_id"]])
+async def test_cursor_pages(sorted_indexes):
+    connector = MemoryConnector(UserSchema, indexes=["telegram_id"], sorted_indexes=sorted_indexes)
+    for i in range(20):
+        await connector.create_one(new_user(str(i % 2), f"test{i}", i % 4 or None))
+
+    expected = [user["id"] for user in await connector.get_many(skip=0, limit=100, sorting=("project_id", False))]
+    assert await walk(connector, 3, sorting=("project_id", False)) == expected
+    expected = [user["id"] for user in await connector.get_many(skip=0, limit=100, sorting=("project_id", True))]
+    assert await walk(connector, 3, sorting=("project_id", True)) == expected
+
+    assert await walk(connector, 3) == list(range(1, 21))
+    assert await walk(connector, 4, sorting=("id", True)) == list(range(20, 0, -1))
+    assert await walk(connector, 3, filters={"telegram_id": "1"}) == list(range(2, 21, 2))
+
+
+@pytest.mark.asyncio
+async def test_router_cursor():
+    connector = MemoryConnector(UserSchema)
+    for i in range(5):
+        await connector.create_one(new_user(str(i), f"test{i}"))
+    app = FastAPI()
+    app.include_router(Router(CRUD(connector), cursor_pagination=True, items_per_query=2))
+
+    ids, cursor = [], None
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        while True:
+            params = {"limit": 2, "sort_field": "telegram_username", "sort_desc": True}
+            if cursor is not None:
+                params["cursor"] = cursor
+            response = await client.get("/user_schema/", params=params)
+            ids.extend(user["id"] for user in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+
+        assert ids == [5, 4, 3, 2, 1]
+        response = await client.get("/user_schema/", params={"cursor": "not a cursor"})
+        assert response.status_code == 422
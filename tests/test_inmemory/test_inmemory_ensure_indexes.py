@@ -0,0 +1,44 @@
+import pytest
+from razorbill.crud import CRUD
+from razorbill.router import Router
+from razorbill.indexes import ensure_indexes
+from razorbill.connectors.memory import MemoryConnector
+from tests.schemas import ProjectSchema, UserSchema
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes():
+    projects = CRUD(MemoryConnector(ProjectSchema))
+    users = MemoryConnector(UserSchema)
+    for i in range(5):
+        await users.create_one(new_user(str(i), f"test{i}", i % 2))
+    routers = [
+        Router(projects),
+        Router(
+            CRUD(users), parent_crud=projects, parent_item_name="Project",
+            filters=["telegram_id"], sort_fields=["telegram_username", "id"]
+        ),
+    ]
+
+    report = await ensure_indexes(routers)
+    assert users.indexes == ["project_id"]
+    assert sorted(users.sorted_indexes) == ["telegram_id", "telegram_username"]
+    assert [(name, change.field) for name, change in report.created] == [
+        ("UserSchema", "project_id"), ("UserSchema", "telegram_id"), ("UserSchema", "telegram_username")
+    ]
+    assert report.unindexed_sort_fields == [("ProjectSchema", "name")]
+    assert "unindexed sort field  ProjectSchema.name" in str(report)
+
+    # indexes built over existing rows serve the lookups
+    assert [user["id"] for user in await users.get_many(skip=0, limit=10, filters={"telegram_id": "3"})] == [4]
+    assert await users.count({"project_id": 1}) == 2
+
+    assert (await ensure_indexes(routers)).created == []
@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from razorbill.connectors.memory import MemoryConnector
+from tests.schemas import UserSchema
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction():
+    connector = MemoryConnector(UserSchema, max_entries=2, indexes=["project_id"])
+    await connector.create_one(new_user("1", "test1", 1))
+    await connector.create_one(new_user("2", "test2", 1))
+    await connector.get_one(1)
+    await connector.create_one(new_user("3", "test3", 1))
+
+    assert await connector.get_one(2) is None
+    assert await connector.count({"project_id": 1}) == 2
+    assert connector.stats["evictions"] == 1
+    assert connector.stats["hits"] == 1
+    assert connector.stats["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_lfu_eviction():
+    connector = MemoryConnector(UserSchema, max_entries=2, eviction="lfu")
+    await connector.create_one(new_user("1", "test1"))
+    await connector.create_one(new_user("2", "test2"))
+    await connector.get_one(1)
+    await connector.get_one(1)
+    await connector.get_one(2)
+    await connector.create_one(new_user("3", "test3"))
+    await connector.create_one(new_user("4", "test4"))
+
+    users = await connector.get_many(skip=0, limit=10)
+    assert [user["id"] for user in users] == [1, 4]
+
+
+@pytest.mark.asyncio
+async def test_max_bytes():
+    connector = MemoryConnector(UserSchema, max_bytes=2000)
+    for i in range(100):
+        await connector.create_one(new_user(str(i), f"test{i}"))
+
+    assert 0 < connector.stats["entries"] < 100
+    assert connector.stats["bytes"] <= 2000
+    assert await connector.get_one(100) is not None
+
+
+@pytest.mark.asyncio
+async def test_ttl():
+    connector = MemoryConnector(UserSchema, ttl=0.05, indexes=["project_id"])
+    await connector.create_one(new_user("1", "test1", 1))
+    await asyncio.sleep(0.03)
+    await connector.create_one(new_user("2", "test2", 1))
+    await asyncio.sleep(0.03)
+
+    assert await connector.count({"project_id": 1}) == 1
+    assert [user["id"] for user in await connector.get_many(skip=0, limit=10)] == [2]
+    assert await connector.get_one(1) is None
+
+    await connector.update_one(2, {"telegram_username": "updated"})
+    await asyncio.sleep(0.03)
+    assert await connector.get_one(2) is not None
+    assert connector.stats["expirations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expire_interval():
+    connector = MemoryConnector(UserSchema, ttl=0.05, expire_interval=0.02)
+    await connector.create_one(new_user("1", "test1", 1))
+    await connector.create_one(new_user("2", "test2", 1))
+
+    # nothing reads the connector, the sweep removes the rows
+    await asyncio.sleep(0.15)
+    assert connector.stats["entries"] == 0
+    assert connector.stats["expirations"] == 2
+    connector.close()
+
+
+@pytest.mark.asyncio
+async def test_update_of_victim_evicts_next_row():
+    connector = MemoryConnector(UserSchema, max_bytes=10_000, eviction="lfu")
+    for i in range(3):
+        await connector.create_one(new_user(str(i), f"test{i}"))
+    for pk in (2, 3, 2, 3):
+        await connector.get_one(pk)
+    connector._max_bytes = connector.stats["bytes"]
+
+    # row 1 is still accessed least often after its update and grows, row 2 makes room for it
+    await connector.update_one(1, {"telegram_username": "updated" * 20})
+    assert connector.stats["bytes"] <= connector._max_bytes
+    assert [user["id"] for user in await connector.get_many(skip=0, limit=10)] == [1, 3]
+    assert connector.stats["evictions"] == 1
+
+
+def test_sweeper_restarts_on_new_loop():
+    connector = MemoryConnector(UserSchema, ttl=0.05, expire_interval=0.02)
+
+    async def create_and_wait(telegram_id: str):
+        await connector.create_one(new_user(telegram_id, f"test{telegram_id}"))
+        await asyncio.sleep(0.15)
+
+    asyncio.run(create_and_wait("1"))
+    asyncio.run(create_and_wait("2"))
+    assert connector.stats["entries"] == 0
+    assert connector.stats["expirations"] == 2
+    connector.close()
+
+
+def test_invalid_eviction():
+    with pytest.raises(ValueError):
+        MemoryConnector(UserSchema, max_entries=2, eviction="fifo")
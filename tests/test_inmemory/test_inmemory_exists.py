@@ -0,0 +1,74 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from razorbill.crud import CRUD
+from razorbill.router import Router
+from razorbill.connectors.memory import MemoryConnector
+from tests.schemas import ProjectSchema, UserSchema
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_exists():
+    connector = MemoryConnector(ProjectSchema)
+    await connector.create_one({"name": "first"})
+
+    assert await connector.exists(1)
+    assert await connector.exists("1")
+    assert not await connector.exists(2)
+    assert not await connector.exists("abc")
+    assert (await connector.get_one("1"))["name"] == "first"
+
+
+@pytest.mark.asyncio
+async def test_exists_cache():
+    connector = MemoryConnector(ProjectSchema)
+    crud = CRUD(connector, exists_ttl=60)
+
+    assert not await crud.exists("1")
+    await connector.create_one({"name": "first"})
+    # cached as missing until the ttl passes or the CRUD writes it
+    assert not await crud.exists("1")
+
+    await crud.create({"name": "second"})
+    assert await crud.exists("2")
+    await connector.delete_one(2)
+    assert await crud.exists("2")
+    await crud.delete(2)
+    assert not await crud.exists("2")
+
+
+@pytest.mark.asyncio
+async def test_router_parent_exists():
+    projects = CRUD(MemoryConnector(ProjectSchema), exists_ttl=60)
+    users = CRUD(MemoryConnector(UserSchema))
+    await projects.create({"name": "first"})
+    await users.create(new_user("1", "test1", 1))
+    app = FastAPI()
+    app.include_router(Router(users, parent_crud=projects, parent_item_name="Project"))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/project/1/user_schema/")
+        assert [user["id"] for user in response.json()] == [1]
+
+        response = await client.get("/project/2/user_schema/")
+        assert response.status_code == 404
+
+        loaded = []
+
+        @projects.after_get_one
+        async def after_get_one(item):
+            loaded.append(item["id"])
+            return item
+
+        # with a get_one hook the parent is loaded, the hook has a say in whether it exists
+        response = await client.get("/project/1/user_schema/count")
+        assert response.json() == 1
+        assert loaded == [1]
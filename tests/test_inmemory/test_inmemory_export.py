@@ -0,0 +1,52 @@
+import json
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from razorbill.crud import CRUD
+from razorbill.router import Router
+from razorbill.connectors.memory import MemoryConnector
+from tests.schemas import UserSchema
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_iter_many():
+    connector = MemoryConnector(UserSchema)
+    for i in range(25):
+        await connector.create_one(new_user(str(i % 2), f"test{i}"))
+
+    users = [user async for user in connector.iter_many(filters={"telegram_id": "1"}, batch_size=4)]
+    assert [user["id"] for user in users] == list(range(2, 26, 2))
+
+    users = connector.iter_many(sorting=("id", True), fields=["telegram_id"], batch_size=4)
+    first = await users.__anext__()
+    await connector.delete_one(10)
+    await connector.create_one(new_user("0", "test25"))
+    assert first == {"id": 25, "telegram_id": "0"}
+    assert [user["id"] async for user in users] == [i for i in range(24, 0, -1) if i != 10]
+
+
+@pytest.mark.asyncio
+async def test_router_export():
+    connector = MemoryConnector(UserSchema)
+    for i in range(3):
+        await connector.create_one(new_user(str(i), f"test{i}"))
+    app = FastAPI()
+    app.include_router(Router(CRUD(connector), export_endpoint=True))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/user_schema/export", params={"sort_field": "id", "sort_desc": True})
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[0] == {"id": 3, **new_user("2", "test2")}
+        assert len(lines) == 3
+
+        response = await client.get("/user_schema/export", params={"format": "csv", "fields": "telegram_username"})
+        assert response.text.splitlines() == ["id,telegram_username", "1,test0", "2,test1", "3,test2"]
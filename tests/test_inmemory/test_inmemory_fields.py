@@ -0,0 +1,45 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from razorbill.crud import CRUD
+from razorbill.router import Router
+from razorbill.connectors.memory import MemoryConnector
+from tests.schemas import UserSchema
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_fields():
+    connector = MemoryConnector(UserSchema)
+    for i in range(3):
+        await connector.create_one(new_user(str(i), f"test{i}"))
+
+    users = await connector.get_many(skip=0, limit=2, fields=["telegram_username"])
+    assert users == [{"id": 1, "telegram_username": "test0"}, {"id": 2, "telegram_username": "test1"}]
+    assert await connector.get_one(3, fields=["telegram_id"]) == {"id": 3, "telegram_id": "2"}
+    assert (await connector.get_one(3))["telegram_username"] == "test2"
+
+
+@pytest.mark.asyncio
+async def test_router_fields():
+    connector = MemoryConnector(UserSchema)
+    for i in range(3):
+        await connector.create_one(new_user(str(i), f"test{i}"))
+    app = FastAPI()
+    app.include_router(Router(CRUD(connector), cursor_pagination=True))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/user_schema/", params={"fields": "telegram_id", "limit": 2})
+        assert response.json() == [{"id": 1, "telegram_id": "0"}, {"id": 2, "telegram_id": "1"}]
+
+        response = await client.get(
+            "/user_schema/", params={"fields": "telegram_id", "cursor": response.headers["X-Next-Cursor"]}
+        )
+        assert response.json() == [{"id": 3, "telegram_id": "2"}]
@@ -0,0 +1,73 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from razorbill.crud import CRUD
+from razorbill.router import Router
+from razorbill.connectors.memory import MemoryConnector
+from tests.schemas import UserSchema
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+async def create_users(connector: MemoryConnector) -> None:
+    for i in range(10):
+        await connector.create_one(new_user(str(i), f"user{i}" if i < 5 else f"admin{i}", i % 3 or None))
+
+
+async def get_ids(connector: MemoryConnector, filters: dict) -> list[int]:
+    return [user["id"] for user in await connector.get_many(skip=0, limit=100, filters=filters)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("options", [
+    {},
+    {"indexes": ["project_id"], "sorted_indexes": ["telegram_username", "id"]},
+])
+async def test_filter_operators(options):
+    connector = MemoryConnector(UserSchema, **options)
+    await create_users(connector)
+
+    assert await get_ids(connector, {"id__gt": 7}) == [8, 9, 10]
+    assert await get_ids(connector, {"id__gte": 3, "id__lt": 5}) == [3, 4]
+    assert await get_ids(connector, {"id__lte": 2}) == [1, 2]
+    assert await get_ids(connector, {"project_id__in": [2, 1]}) == [2, 3, 5, 6, 8, 9]
+    assert await get_ids(connector, {"telegram_username__prefix": "admin"}) == [6, 7, 8, 9, 10]
+    assert await get_ids(connector, {"project_id__isnull": True}) == [1, 4, 7, 10]
+    assert await get_ids(connector, {"project_id__isnull": False, "id__gt": 8}) == [9]
+    assert await get_ids(connector, {"project_id": 1, "telegram_username__prefix": "user"}) == [2, 5]
+
+    assert await connector.count({"project_id__in": [1]}) == 3
+    assert await connector.count({"telegram_username__prefix": "us"}) == 5
+    assert await connector.count({"id__gt": 5, "project_id__isnull": True}) == 2
+
+    users = await connector.get_many(
+        skip=0, limit=2, filters={"id__gt": 3}, sorting=("telegram_username", True)
+    )
+    assert [user["telegram_username"] for user in users] == ["user4", "user3"]
+
+
+@pytest.mark.asyncio
+async def test_router_filters():
+    connector = MemoryConnector(UserSchema)
+    await create_users(connector)
+    app = FastAPI()
+    app.include_router(Router(CRUD(connector), filters=["id", "telegram_username", "project_id"]))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/user_schema/", params={"id__gte": 8, "project_id__in": [2, 0]})
+        assert [user["id"] for user in response.json()] == [9]
+
+        response = await client.get("/user_schema/count", params={"telegram_username__prefix": "admin"})
+        assert response.json() == 5
+
+        response = await client.get("/user_schema/", params={"project_id": 1, "id__lt": 4})
+        assert [user["id"] for user in response.json()] == [2]
+
+        response = await client.get("/user_schema/", params={"id__gt": "abc"})
+        assert response.status_code == 422
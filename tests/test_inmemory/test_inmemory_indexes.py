@@ -0,0 +1,58 @@
+import pytest
+from razorbill.connectors.memory import MemoryConnector
+from tests.schemas import UserSchema
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_indexed_filters():
+    connector = MemoryConnector(UserSchema, indexes=["project_id", "telegram_id"])
+    await connector.create_one(new_user("1", "test1", 1))
+    await connector.create_one(new_user("2", "test2", 1))
+    await connector.create_one(new_user("2", "test3", 2))
+
+    assert await connector.count({"project_id": 1}) == 2
+    assert await connector.count({"project_id": 1, "telegram_id": "2"}) == 1
+    users = await connector.get_many(skip=0, limit=10, filters={"project_id": 2})
+    assert [user["telegram_username"] for user in users] == ["test3"]
+
+
+@pytest.mark.asyncio
+async def test_indexes_follow_updates_and_deletes():
+    connector = MemoryConnector(UserSchema, indexes=["project_id"])
+    user = await connector.create_one(new_user("1", "test1", 1))
+    await connector.create_one(new_user("2", "test2", 1))
+
+    await connector.update_one(user["id"], {"project_id": 2})
+    assert await connector.count({"project_id": 1}) == 1
+    assert await connector.count({"project_id": 2}) == 1
+
+    await connector.delete_one(user["id"])
+    assert await connector.count({"project_id": 2}) == 0
+    assert await connector.get_many(skip=0, limit=10, filters={"project_id": 2}) == []
+
+
+def test_index_unknown_field():
+    with pytest.raises(ValueError):
+        MemoryConnector(UserSchema, indexes=["unknown"])
+
+
+@pytest.mark.asyncio
+async def test_indexed_page_order():
+    indexed = MemoryConnector(UserSchema, indexes=["project_id"])
+    plain = MemoryConnector(UserSchema)
+    for connector in (indexed, plain):
+        for i in range(4):
+            await connector.create_one(new_user(str(i), f"test{i}", 3 if i in (0, 3) else 1))
+        await connector.update_one(1, {"project_id": 1})
+        await connector.update_one(1, {"project_id": 3})
+
+    pages = [await connector.get_many(skip=0, limit=10, filters={"project_id": 3}) for connector in (indexed, plain)]
+    assert [user["id"] for user in pages[0]] == [user["id"] for user in pages[1]] == [1, 4]
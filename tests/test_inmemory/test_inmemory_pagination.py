@@ -0,0 +1,40 @@
+import pytest
+from razorbill.connectors.memory import MemoryConnector
+from tests.schemas import UserSchema
+
+
+class CountingValue:
+    """Filter value that counts how many stored rows it was compared with."""
+
+    def __init__(self, value: str):
+        self.value = value
+        self.comparisons = 0
+
+    def __eq__(self, other):
+        self.comparisons += 1
+        return other == self.value
+
+
+@pytest.mark.asyncio
+async def test_get_many_pages():
+    connector = MemoryConnector(UserSchema)
+    for i in range(10):
+        await connector.create_one({"telegram_id": str(i % 2), "telegram_username": f"test{i}"})
+
+    users = await connector.get_many(skip=2, limit=3)
+    assert [user["id"] for user in users] == [3, 4, 5]
+
+    users = await connector.get_many(skip=1, limit=2, filters={"telegram_id": "1"})
+    assert [user["id"] for user in users] == [4, 6]
+
+
+@pytest.mark.asyncio
+async def test_get_many_stops_when_page_is_full():
+    connector = MemoryConnector(UserSchema)
+    for i in range(100):
+        await connector.create_one({"telegram_id": "1", "telegram_username": f"test{i}"})
+
+    value = CountingValue("1")
+    users = await connector.get_many(skip=5, limit=5, filters={"telegram_id": value})
+    assert len(users) == 5
+    assert value.comparisons == 10
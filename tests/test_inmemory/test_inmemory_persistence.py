@@ -0,0 +1,103 @@
+import os
+import time
+import pytest
+from razorbill.connectors.memory import MemoryConnector
+from razorbill.connectors.memory.journal import Journal
+from tests.schemas import UserSchema
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fsync", ["always", "batch", "none"])
+async def test_state_survives_restart(tmp_path, fsync):
+    connector = MemoryConnector(UserSchema, persist_path=str(tmp_path), fsync=fsync, indexes=["project_id"])
+    await connector.create_one(new_user("1", "test1", 1))
+    await connector.create_one(new_user("2", "test2", 1))
+    await connector.update_one(1, {"telegram_username": "updated"})
+    await connector.delete_one(2)
+    connector.close()
+
+    connector = MemoryConnector(UserSchema, persist_path=str(tmp_path), fsync=fsync, indexes=["project_id"])
+    assert await connector.count({"project_id": 1}) == 1
+    assert (await connector.get_one(1))["telegram_username"] == "updated"
+    assert (await connector.create_one(new_user("3", "test3")))["id"] == 3
+    connector.close()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_replaces_logs(tmp_path):
+    connector = MemoryConnector(UserSchema, persist_path=str(tmp_path), snapshot_every=10)
+    for i in range(25):
+        await connector.create_one(new_user(str(i), f"test{i}"))
+    connector.snapshot()
+    await connector.delete_one(1)
+    connector.close()
+
+    files = sorted(os.listdir(tmp_path))
+    assert "UserSchema.snapshot" in files
+    assert len([file for file in files if ".log." in file]) == 1
+
+    connector = MemoryConnector(UserSchema, persist_path=str(tmp_path))
+    assert await connector.count() == 24
+    connector.close()
+
+
+@pytest.mark.asyncio
+async def test_torn_tail_is_ignored(tmp_path):
+    connector = MemoryConnector(UserSchema, persist_path=str(tmp_path))
+    await connector.create_one(new_user("1", "test1"))
+    await connector.create_one(new_user("2", "test2"))
+    connector.close()
+
+    log = next(file for file in os.listdir(tmp_path) if ".log." in file)
+    with open(tmp_path / log, "r+b") as file:
+        file.truncate(os.path.getsize(tmp_path / log) - 3)
+
+    connector = MemoryConnector(UserSchema, persist_path=str(tmp_path))
+    assert await connector.count() == 1
+    connector.close()
+
+
+class _UncopyableStorage(dict):
+    def __iter__(self):
+        raise AssertionError("the storage is copied")
+
+
+def test_snapshot_compacts_logs_without_copying_storage(tmp_path):
+    journal = Journal(str(tmp_path), "rows", _UncopyableStorage(), snapshot_every=3)
+    journal.load()
+    for pk in range(1, 8):
+        journal.put(pk, {"id": pk})
+    journal.delete(2)
+    journal.snapshot(wait=True)
+    journal.put(8, {"id": 8})
+    journal.close()
+
+    storage = {}
+    journal = Journal(str(tmp_path), "rows", storage)
+    journal.load()
+    assert sorted(storage) == [1, 3, 4, 5, 6, 7, 8]
+    assert journal.last_pk == 8
+    journal.close()
+
+
+def test_batch_fsync_timer(tmp_path, monkeypatch):
+    synced = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd) or fsync(fd))
+
+    journal = Journal(str(tmp_path), "rows", {}, fsync="batch", fsync_interval=0.05)
+    journal.load()
+    journal.put(1, {"id": 1})
+    assert synced == []
+    # no write follows, the timer syncs the record
+    time.sleep(0.3)
+    assert len(synced) == 1
+    journal.close()
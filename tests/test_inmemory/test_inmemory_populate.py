@@ -0,0 +1,65 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from razorbill.crud import CRUD
+from razorbill.router import Router
+from razorbill.connectors.memory import MemoryConnector
+from tests.schemas import ProjectSchema, UserSchema
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_populate():
+    projects = MemoryConnector(ProjectSchema)
+    users = MemoryConnector(UserSchema, indexes=["project_id"])
+    await projects.create_one({"name": "first"})
+    await projects.create_one({"name": "second"})
+    await users.create_one(new_user("1", "test1", 1))
+    await users.create_one(new_user("2", "test2", 2))
+    await users.create_one(new_user("3", "test3", 2))
+    await users.create_one(new_user("4", "test4"))
+
+    page = await users.get_many(skip=0, limit=10, populate=["project"])
+    assert [user["project"] and user["project"]["name"] for user in page] == ["first", "second", "second", None]
+    assert [user["project_id"] for user in page] == [1, 2, 2, None]
+
+    user = await users.get_one(2, populate=["project"])
+    assert user["project"] == {"id": 2, "name": "second"}
+
+    # stored rows keep their foreign keys
+    user["project"]["name"] = "changed"
+    assert await users.get_one(2) == {"id": 2, **new_user("2", "test2", 2)}
+    assert (await projects.get_one(2))["name"] == "second"
+    assert await users.count({"project_id": 2}) == 2
+
+
+@pytest.mark.asyncio
+async def test_populate_unknown_schema():
+    users = MemoryConnector(UserSchema)
+    await users.create_one(new_user("1", "test1", 1))
+
+    assert await users.get_one(1, populate=["tag"]) == {"id": 1, **new_user("1", "test1", 1)}
+
+
+@pytest.mark.asyncio
+async def test_router_populate():
+    projects = MemoryConnector(ProjectSchema)
+    users = MemoryConnector(UserSchema)
+    await projects.create_one({"name": "first"})
+    await users.create_one(new_user("1", "test1", 1))
+    app = FastAPI()
+    app.include_router(Router(CRUD(users)))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/user_schema/", params={"populate": "project"})
+        assert response.json() == [{
+            "id": 1, "telegram_id": "1", "telegram_username": "test1", "project_id": 1,
+            "project": {"id": 1, "name": "first"}
+        }]
@@ -0,0 +1,129 @@
+import asyncio
+import os
+import multiprocessing
+import pytest
+from razorbill.connectors.memory import MemoryConnector
+from razorbill.connectors.memory.storage import default_shared_path
+from tests.schemas import UserSchema
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+def create_users(path: str, worker: int, count: int):
+    async def run():
+        connector = MemoryConnector(UserSchema, storage="shared", shared_path=path)
+        for i in range(count):
+            await connector.create_one(new_user(str(worker), f"test{i}", worker))
+        connector.close()
+
+    asyncio.run(run())
+
+
+@pytest.mark.asyncio
+async def test_workers_share_one_dataset(tmp_path):
+    path = str(tmp_path / "users")
+    connector = MemoryConnector(UserSchema, storage="shared", shared_path=path, indexes=["project_id"])
+
+    workers = [
+        multiprocessing.get_context("spawn").Process(target=create_users, args=(path, worker, 50))
+        for worker in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert await connector.count() == 200
+    assert await connector.count({"project_id": 2}) == 50
+    users = await connector.get_many(skip=0, limit=1000)
+    assert sorted(user["id"] for user in users) == list(range(1, 201))
+    connector.close()
+
+
+@pytest.mark.asyncio
+async def test_changes_are_visible_to_other_connectors(tmp_path):
+    path = str(tmp_path / "users")
+    first = MemoryConnector(UserSchema, storage="shared", shared_path=path, indexes=["project_id"])
+    second = MemoryConnector(UserSchema, storage="shared", shared_path=path, indexes=["project_id"])
+
+    user = await first.create_one(new_user("1", "test1", 1))
+    await second.update_one(user["id"], {"project_id": 2})
+    assert await first.count({"project_id": 1}) == 0
+    assert await first.count({"project_id": 2}) == 1
+
+    await first.delete_one(user["id"])
+    assert await second.get_one(user["id"]) is None
+    assert (await second.create_one(new_user("2", "test2")))["id"] == 2
+
+    first.close()
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_compaction_reloads_other_connectors(tmp_path):
+    path = str(tmp_path / "users")
+    first = MemoryConnector(UserSchema, storage="shared", shared_path=path)
+    second = MemoryConnector(UserSchema, storage="shared", shared_path=path, indexes=["telegram_username"])
+
+    user = await first.create_one(new_user("1", "test1"))
+    for i in range(20000):
+        await first.update_one(user["id"], {"telegram_username": f"test{i}"})
+
+    assert (await second.get_one(user["id"]))["telegram_username"] == "test19999"
+    assert await second.count({"telegram_username": "test19999"}) == 1
+    assert await second.count() == 1
+
+    first.close()
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_stale_connector_does_not_revive_deleted_rows(tmp_path):
+    path = str(tmp_path / "users")
+    first = MemoryConnector(UserSchema, storage="shared", shared_path=path)
+    second = MemoryConnector(UserSchema, storage="shared", shared_path=path)
+    user = await first.create_one(new_user("1", "test1", 1))
+    await second.get_one(user["id"])
+
+    # the second worker has not caught up when it writes
+    second._storage.refresh = lambda: None
+    await first.delete_one(user["id"])
+    assert await second.update_one(user["id"], {"telegram_username": "updated"}) is None
+    assert await second.delete_one(user["id"]) is None
+    assert await first.get_one(user["id"]) is None
+
+    first.close()
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_file_is_private(tmp_path):
+    path = tmp_path / "users"
+    connector = MemoryConnector(UserSchema, storage="shared", shared_path=str(path))
+    await connector.create_one(new_user("1", "test1"))
+    connector.close()
+    assert path.stat().st_mode & 0o777 == 0o600
+    # records are plain JSON, reading them never runs code
+    assert b'[0,1,{"telegram_id":"1","telegram_username":"test1","project_id":null,"id":1}]' in path.read_bytes()
+
+    path.chmod(0o666)
+    with pytest.raises(PermissionError):
+        MemoryConnector(UserSchema, storage="shared", shared_path=str(path))
+
+    link = tmp_path / "link"
+    link.symlink_to(path)
+    with pytest.raises(OSError):
+        MemoryConnector(UserSchema, storage="shared", shared_path=str(link))
+
+
+def test_default_shared_path_is_private():
+    path = default_shared_path(UserSchema)
+    directory = os.path.dirname(path)
+    assert os.path.basename(directory) == f"razorbill-{os.getuid()}"
+    assert os.stat(directory).st_mode & 0o777 == 0o700
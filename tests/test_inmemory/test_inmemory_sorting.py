@@ -0,0 +1,52 @@
+import pytest
+from razorbill.connectors.memory import MemoryConnector
+from tests.schemas import UserSchema
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+async def fill(connector: MemoryConnector):
+    await connector.create_one(new_user("3", "c", 1))
+    await connector.create_one(new_user("1", "a", 2))
+    await connector.create_one(new_user("2", "b", 1))
+    await connector.create_one(new_user("4", "d"))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sorted_indexes", [None, ["telegram_id", "project_id"]])
+async def test_get_many_sorted(sorted_indexes):
+    connector = MemoryConnector(UserSchema, sorted_indexes=sorted_indexes)
+    await fill(connector)
+
+    users = await connector.get_many(skip=0, limit=10, sorting=("telegram_id", False))
+    assert [user["telegram_id"] for user in users] == ["1", "2", "3", "4"]
+
+    users = await connector.get_many(skip=1, limit=2, sorting=("telegram_id", True))
+    assert [user["telegram_id"] for user in users] == ["3", "2"]
+
+    users = await connector.get_many(skip=0, limit=10, sorting=("project_id", False))
+    assert [user["project_id"] for user in users] == [1, 1, 2, None]
+
+    users = await connector.get_many(skip=0, limit=10, filters={"project_id": 1}, sorting=("telegram_id", True))
+    assert [user["telegram_id"] for user in users] == ["3", "2"]
+
+
+@pytest.mark.asyncio
+async def test_sorted_index_follows_updates():
+    connector = MemoryConnector(UserSchema, indexes=["project_id"], sorted_indexes=["telegram_id"])
+    await fill(connector)
+
+    await connector.update_one(1, {"telegram_id": "0"})
+    await connector.delete_one(3)
+
+    users = await connector.get_many(skip=0, limit=10, sorting=("telegram_id", False))
+    assert [user["telegram_id"] for user in users] == ["0", "1", "4"]
+
+    users = await connector.get_many(skip=0, limit=10, sorting=("id", True))
+    assert [user["id"] for user in users] == [4, 2, 1]
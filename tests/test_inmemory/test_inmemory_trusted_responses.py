@@ -0,0 +1,50 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from razorbill.crud import CRUD
+from razorbill.router import Router
+from razorbill.connectors.memory import MemoryConnector
+from tests.schemas import UserSchema
+
+
+def new_user(telegram_id: str, telegram_username: str, project_id: int = None):
+    return {
+        "telegram_id": telegram_id,
+        "telegram_username": telegram_username,
+        "project_id": project_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_trusted_responses():
+    connector = MemoryConnector(UserSchema)
+    for i in range(3):
+        await connector.create_one(new_user(str(i), f"test{i}", i or None))
+    crud = CRUD(connector)
+    apps = [FastAPI(), FastAPI()]
+    apps[0].include_router(Router(crud, total_count_header=True))
+    apps[1].include_router(Router(crud, total_count_header=True, trusted_responses=True))
+
+    responses = []
+    for app in apps:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            responses.append([
+                await client.get("/user_schema/", params={"limit": 2}),
+                await client.get("/user_schema/", params={"fields": "telegram_id"}),
+                await client.get("/user_schema/2"),
+                await client.put("/user_schema/2", json=new_user("1", "renamed", 1)),
+                await client.put("/user_schema/2", json=new_user("1", "test1", 1)),
+                await client.post("/user_schema/", json=new_user("4", "test4")),
+                await client.get("/user_schema/10"),
+            ])
+            await client.delete(f"/user_schema/{responses[-1][5].json()['id']}")
+        assert app.openapi() == apps[0].openapi()
+
+    default, trusted = responses
+    assert [response.status_code for response in trusted] == [200] * 6 + [404]
+    # ids are not reused, the created items differ by id only
+    assert trusted[5].json() == {**default[5].json(), "id": 5}
+    assert [response.json() for response in trusted[:5]] == [response.json() for response in default[:5]]
+    assert trusted[0].headers["content-type"] == "application/json"
+    assert trusted[0].headers["X-Total-Count"] == "3"
+    assert trusted[1].json()[0] == {"id": 1, "telegram_id": "0"}
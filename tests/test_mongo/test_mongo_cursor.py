@@ -0,0 +1,64 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from pydantic import BaseModel
+from razorbill.crud import CRUD
+from razorbill.router import Router
+from razorbill.connectors.mongo import client, mongo
+from razorbill.connectors.mongo.mongo import AsyncMongoConnector
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class TaskSchema(BaseModel):
+    name: str
+    rank: int | None = None
+
+
+@pytest.fixture
+def mongo_url(monkeypatch):
+    monkeypatch.setattr(client, "AsyncIOMotorClient", mongomock_motor.AsyncMongoMockClient)
+    monkeypatch.setattr(client, "_clients", {})
+    monkeypatch.setattr(client, "_pending_models", {})
+    monkeypatch.setattr(mongo, "_mongo_connectors", {})
+    return "mongodb://localhost/test"
+
+
+async def walk(connector: AsyncMongoConnector, sort_desc: bool, limit: int) -> list[str]:
+    names, cursor = [], None
+    while True:
+        page = await connector.get_many(skip=0, limit=limit, sorting=("rank", sort_desc), cursor=cursor)
+        names += [task.name for task in page]
+        if len(page) < limit:
+            return names
+        cursor = (page[-1].rank, str(page[-1].id))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort_desc", [False, True])
+async def test_cursor_pages_keep_nulls(mongo_url, sort_desc):
+    connector = AsyncMongoConnector(mongo_url, TaskSchema)
+    await client.init_mongo()
+    for i, rank in enumerate([2, None, 1, None, 3, 2]):
+        await connector.create_one({"name": f"task{i}", "rank": rank})
+
+    expected = ["task1", "task3", "task2", "task0", "task5", "task4"]
+    assert await walk(connector, sort_desc, 2) == (expected[::-1] if sort_desc else expected)
+
+
+@pytest.mark.asyncio
+async def test_router_next_cursor_from_documents(mongo_url):
+    connector = AsyncMongoConnector(mongo_url, TaskSchema)
+    await client.init_mongo()
+    for i in range(3):
+        await connector.create_one({"name": f"task{i}", "rank": i})
+    app = FastAPI()
+    app.include_router(Router(CRUD(connector), cursor_pagination=True))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as http:
+        response = await http.get("/task_schema/", params={"limit": 2, "sort_field": "rank"})
+        assert [task["name"] for task in response.json()] == ["task0", "task1"]
+
+        params = {"limit": 2, "sort_field": "rank", "cursor": response.headers["X-Next-Cursor"]}
+        response = await http.get("/task_schema/", params=params)
+        assert [task["name"] for task in response.json()] == ["task2"]
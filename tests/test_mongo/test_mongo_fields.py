@@ -0,0 +1,48 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from pydantic import BaseModel
+from razorbill.crud import CRUD
+from razorbill.router import Router
+from razorbill.connectors.mongo import client, mongo
+from razorbill.connectors.mongo.mongo import AsyncMongoConnector
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class TaskSchema(BaseModel):
+    name: str
+    rank: int | None = None
+
+
+@pytest.fixture
+def mongo_url(monkeypatch):
+    monkeypatch.setattr(client, "AsyncIOMotorClient", mongomock_motor.AsyncMongoMockClient)
+    monkeypatch.setattr(client, "_clients", {})
+    monkeypatch.setattr(client, "_pending_models", {})
+    monkeypatch.setattr(mongo, "_mongo_connectors", {})
+    return "mongodb://localhost/test"
+
+
+@pytest.mark.asyncio
+async def test_projection_keeps_id(mongo_url):
+    connector = AsyncMongoConnector(mongo_url, TaskSchema)
+    stages, _ = await connector._page_stages([], 0, 10, None, ["id"])
+    assert stages[-1] == {"$project": {"_id": 1}}
+
+
+@pytest.mark.asyncio
+async def test_router_fields_id_only(mongo_url):
+    connector = AsyncMongoConnector(mongo_url, TaskSchema)
+    await client.init_mongo()
+    task = await connector.create_one({"name": "task", "rank": 1})
+    app = FastAPI()
+    app.include_router(Router(CRUD(connector)))
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as http:
+        response = await http.get("/task_schema/", params={"fields": "id"})
+        assert response.status_code == 200
+        assert response.json() == [{"id": str(task.id)}]
+
+        response = await http.get(f"/task_schema/{task.id}", params={"fields": "id"})
+        assert response.json() == {"id": str(task.id)}
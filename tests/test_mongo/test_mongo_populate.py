@@ -0,0 +1,40 @@
+import pytest
+from pydantic import BaseModel
+from razorbill.connectors.mongo import client, mongo
+from razorbill.connectors.mongo.mongo import AsyncMongoConnector
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class ProjectSchema(BaseModel):
+    name: str
+
+
+class UserSchema(BaseModel):
+    telegram_id: str
+    project_id: str | None = None
+
+
+@pytest.fixture
+def mongo_url(monkeypatch):
+    monkeypatch.setattr(client, "AsyncIOMotorClient", mongomock_motor.AsyncMongoMockClient)
+    monkeypatch.setattr(client, "_clients", {})
+    monkeypatch.setattr(client, "_pending_models", {})
+    monkeypatch.setattr(mongo, "_mongo_connectors", {})
+    return "mongodb://localhost/test"
+
+
+@pytest.mark.asyncio
+async def test_populate_by_relationship_name(mongo_url):
+    projects = AsyncMongoConnector(mongo_url, ProjectSchema)
+    users = AsyncMongoConnector(mongo_url, UserSchema)
+    await client.init_mongo()
+
+    assert users.relations == {"project": ("project_id", "project", projects.schema)}
+    # mongomock has no $convert, the pipeline is checked instead of run
+    stages, joined = await users._page_stages([], 0, 10, ["project"], None)
+    assert joined == ["project"]
+    lookup = next(stage["$lookup"] for stage in stages if "$lookup" in stage)
+    assert lookup["from"] == projects.document_schema.get_motor_collection().name
+    # the foreign key stays next to the parent, as with the other connectors
+    assert {"$project": {"__project_id": 0}} in stages
@@ -0,0 +1,49 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from razorbill.crud import CRUD
+from razorbill.router import Router
+from razorbill.connectors.mongo import client, mongo
+from razorbill.connectors.mongo.mongo import AsyncMongoConnector
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class ProjectSchema(BaseModel):
+    name: str
+
+
+class TaskSchema(BaseModel):
+    name: str
+
+
+@pytest.fixture
+def mongo_url(monkeypatch):
+    monkeypatch.setattr(client, "AsyncIOMotorClient", mongomock_motor.AsyncMongoMockClient)
+    monkeypatch.setattr(client, "_clients", {})
+    monkeypatch.setattr(client, "_pending_models", {})
+    monkeypatch.setattr(mongo, "_mongo_connectors", {})
+    return "mongodb://localhost/test"
+
+
+def test_routers_initialize_beanie_once_on_startup(mongo_url, monkeypatch):
+    calls = []
+    init_beanie = client.init_beanie
+
+    async def counting_init_beanie(database, document_models):
+        calls.append([model.__name__ for model in document_models])
+        await init_beanie(database=database, document_models=document_models)
+
+    monkeypatch.setattr(client, "init_beanie", counting_init_beanie)
+    app = FastAPI()
+    app.include_router(Router(CRUD(AsyncMongoConnector(mongo_url, ProjectSchema))))
+    app.include_router(Router(CRUD(AsyncMongoConnector(mongo_url, TaskSchema))))
+    assert calls == []
+
+    with TestClient(app) as http:
+        assert http.post("/project_schema/", json={"name": "first"}).status_code == 200
+        assert http.post("/task_schema/", json={"name": "task"}).status_code == 200
+        assert http.get("/task_schema/count").json() == 1
+
+    assert calls == [["ProjectSchema", "TaskSchema"]]
@@ -0,0 +1,58 @@
+import datetime
+import decimal
+import enum
+import pytest
+from pydantic import BaseModel
+from razorbill.connectors.mongo import client, mongo
+from razorbill.connectors.mongo.mongo import AsyncMongoConnector
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class Status(enum.Enum):
+    open = "open"
+    closed = "closed"
+
+
+class InvoiceSchema(BaseModel):
+    number: str
+    due: datetime.date | None = None
+    total: decimal.Decimal | None = None
+    status: Status = Status.open
+
+
+@pytest.fixture
+def mongo_url(monkeypatch):
+    monkeypatch.setattr(client, "AsyncIOMotorClient", mongomock_motor.AsyncMongoMockClient)
+    monkeypatch.setattr(client, "_clients", {})
+    monkeypatch.setattr(client, "_pending_models", {})
+    monkeypatch.setattr(mongo, "_mongo_connectors", {})
+    return "mongodb://localhost/test"
+
+
+@pytest.mark.asyncio
+async def test_update_encodes_values(mongo_url):
+    connector = AsyncMongoConnector(mongo_url, InvoiceSchema)
+    await client.init_mongo()
+    invoice = (await connector.create_one({"number": "1", "due": None, "total": None, "status": Status.open})).model_dump()
+
+    old, new = await connector.update_one_with_old(invoice["id"], {"due": datetime.date(2024, 1, 2), "status": Status.closed})
+    assert old["status"] == "open"
+    assert new["due"] == datetime.datetime(2024, 1, 2)
+    assert new["status"] == "closed"
+    assert (await connector.get_one(invoice["id"])).status == Status.closed
+
+    updated = await connector.update_one(invoice["id"], {"total": decimal.Decimal("1.50"), "status": Status.open})
+    assert updated["status"] == "open"
+    assert updated["total"].to_decimal() == decimal.Decimal("1.50")
+
+
+@pytest.mark.asyncio
+async def test_update_missing_document(mongo_url):
+    connector = AsyncMongoConnector(mongo_url, InvoiceSchema)
+    await client.init_mongo()
+
+    assert await connector.update_one("not-an-id", {"number": "2"}) is None
+    assert await connector.update_one("65a000000000000000000000", {"number": "2"}) is None
+    assert await connector.update_one_with_old("65a000000000000000000000", {"number": "2"}) == (None, None)
+    assert await connector.count() == 0